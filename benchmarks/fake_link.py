@@ -0,0 +1,132 @@
+"""
+In-process stand-in for the parts of RNS that the server's Link layer uses.
+
+install() puts a minimal RNS module in sys.modules, so reticulum/ and http/ can
+be imported and driven without Reticulum or any network interface. FakeLink
+models a Link's MDU, bandwidth and one-way latency; wire time is computed rather
+than slept, so slow links can be simulated without slowing down the benchmark.
+"""
+
+import os
+import sys
+import types
+import threading
+
+
+class FakeLink:
+    """A Link whose packets are delivered by direct calls into the server callbacks."""
+
+    MDU = 431
+    PENDING = 0x00
+    ACTIVE = 0x02
+    CLOSED = 0x03
+
+    def __init__(self, mdu=MDU, bandwidth=0, latency=0.0):
+        """
+        Args:
+            mdu: Largest packet payload in bytes
+            bandwidth: Link speed in bits per second (0 = unlimited)
+            latency: One-way latency in seconds
+        """
+        self.link_id = os.urandom(16)
+        self.status = FakeLink.ACTIVE
+        self.mdu = mdu
+        self.bandwidth = bandwidth
+        self.latency = latency
+
+        self.packet_callback = None
+        self.closed_callback = None
+
+        self._responses = []
+        self._arrived = threading.Condition()
+
+    def set_packet_callback(self, callback):
+        self.packet_callback = callback
+
+    def set_link_closed_callback(self, callback):
+        self.closed_callback = callback
+
+    def wire_time(self, size):
+        """Seconds for size bytes to cross this Link."""
+        transmit = size * 8 / self.bandwidth if self.bandwidth else 0.0
+        return self.latency + transmit
+
+    def send(self, data):
+        """Send request bytes to the server, split into MDU-sized packets."""
+        for start in range(0, len(data), self.mdu):
+            packet = FakePacket(self, data[start:start + self.mdu])
+            self.packet_callback(packet.data, packet)
+
+    def wait_response(self, timeout=30):
+        """Wait for the next response; returns (size, status code)."""
+        with self._arrived:
+            if not self._arrived.wait_for(lambda: self._responses, timeout):
+                raise TimeoutError("No response from server")
+            return self._responses.pop(0)
+
+    def close(self):
+        self.status = FakeLink.CLOSED
+        if self.closed_callback is not None:
+            self.closed_callback(self)
+
+    # The server closes Links (idle, or evicted at the Link cap) with teardown()
+    teardown = close
+
+    def _receive(self, data, size=None):
+        # Only the size and status are kept, so large responses are not held in memory
+        status = int(bytes(data[9:12])) if len(data) >= 12 else 0
+        with self._arrived:
+            self._responses.append((len(data) if size is None else size, status))
+            self._arrived.notify()
+
+
+class FakePacket:
+    """A single packet on a FakeLink."""
+
+    def __init__(self, link, data):
+        self.link = link
+        self.data = data
+
+    def send(self):
+        self.link._receive(self.data)
+
+
+class FakeResource:
+    """A Resource that is delivered in full as soon as it is created."""
+
+    COMPLETE = 0x06
+    FAILED = 0x07
+    SEGMENT_SIZE = 1024 * 1024 - 1
+
+    def __init__(self, data, link, metadata=None, callback=None, progress_callback=None, auto_compress=True, **kwargs):
+        if hasattr(data, "read"):
+            # Read a file the way RNS does, one segment at a time, keeping only the start
+            head = metadata or b""
+            size = len(head)
+            with data:
+                for segment in iter(lambda: data.read(FakeResource.SEGMENT_SIZE), b""):
+                    if len(head) < 12:
+                        head += segment[:12]
+                    size += len(segment)
+            link._receive(head, size)
+        else:
+            size = len(data)
+            link._receive(data)
+
+        self.total_size = size
+        self.status = FakeResource.COMPLETE
+        if callback is not None:
+            callback(self)
+
+
+def install():
+    """Register the stand-in RNS module (must run before reticulum/ is imported)."""
+    module = types.ModuleType("RNS")
+    module.Link = FakeLink
+    module.Packet = FakePacket
+    module.Resource = FakeResource
+    module.log = lambda *args, **kwargs: None
+    module.hexrep = lambda data, delimit=True: (":" if delimit else "").join(f"{b:02x}" for b in data)
+    module.prettyhexrep = lambda data: "<" + data.hex() + ">"
+    sys.modules["RNS"] = module
+    return module
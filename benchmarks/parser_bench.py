@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: bytes-native request parser vs the original str-based parser.
+
+Run from the repository root:
+    python benchmarks/parser_bench.py
+"""
+
+import os
+import sys
+import timeit
+
+# Make the repository's http package win over the standard library's
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http.request_parser import parse_http_request, RequestAssembler
+
+
+REQUESTS = {
+    "minimal": b"GET / HTTP/1.1\r\nHost: a1b2c3d4\r\n\r\n",
+    "browser": (
+        b"GET /images/logo.png HTTP/1.1\r\n"
+        b"Host: a1b2c3d4e5f6789abcdef0123456789a\r\n"
+        b"User-Agent: MeshBrowser/1.0\r\n"
+        b"Accept: image/avif,image/webp,*/*\r\n"
+        b"Accept-Encoding: br, zstd, gzip\r\n"
+        b"If-None-Match: \"14ecabd907c1abf012ad9579e7677654\"\r\n"
+        b"Range: bytes=1024-\r\n"
+        b"\r\n"
+    ),
+    "post_4k": b"POST /api HTTP/1.1\r\nHost: a1b2c3d4\r\nContent-Length: 4096\r\n\r\n" + b"x" * 4096,
+}
+
+
+def legacy_parse_http_request(request_text):
+    """The original parser, kept here as the baseline (decode, split, re-join body)."""
+    lines = request_text.split('\r\n')
+
+    request_line = lines[0].split(' ')
+    if len(request_line) < 3:
+        raise ValueError("Invalid request line")
+
+    method, path, version = request_line[0], request_line[1], request_line[2]
+
+    headers = {}
+    body_start = len(lines)
+    for i, line in enumerate(lines[1:], 1):
+        if line == '':
+            body_start = i + 1
+            break
+        if ':' not in line:
+            continue
+        key, value = line.split(':', 1)
+        headers[key.strip().lower()] = value.strip()
+
+    body = '\r\n'.join(lines[body_start:]) if body_start < len(lines) else ''
+    return method, path, version, headers, body
+
+
+def split_packets(data, mdu):
+    """Split a request into Link-sized packets."""
+    return [data[i:i + mdu] for i in range(0, len(data), mdu)]
+
+
+def bench(label, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    print(f"  {label:<28} {seconds / number * 1e6:8.2f} µs/request")
+
+
+def main():
+    number = 20000
+
+    for name, data in REQUESTS.items():
+        print(f"{name} ({len(data)} bytes)")
+        bench("legacy (decode + str)", lambda: legacy_parse_http_request(data.decode('utf-8')), number)
+        bench("bytes one-shot", lambda: parse_http_request(data), number)
+
+        assembler = RequestAssembler(max_body_bytes=1024 * 1024)
+        bench("incremental, 1 packet", lambda: assembler.feed(data), number)
+
+        packets = split_packets(data, 383)
+        if len(packets) > 1:
+            def feed_packets():
+                for packet in packets:
+                    assembler.feed(packet)
+            bench(f"incremental, {len(packets)} packets", feed_packets, number)
+        print()
+
+
+if __name__ == "__main__":
+    main()
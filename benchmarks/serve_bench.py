@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+End-to-end serving benchmark over an in-process fake Link transport.
+
+Requests go through the real Link callbacks, dispatcher, worker pool and HTTP
+handler; only Reticulum itself is replaced (see fake_link.py). Reports
+requests/sec, p50/p99 latency and peak memory for each file size, request mix
+and concurrency level, and can write the results as JSON to compare commits.
+
+Run from the repository root:
+    python benchmarks/serve_bench.py
+    python benchmarks/serve_bench.py --sizes 1K,1M --concurrency 1,8 --json before.json
+    python benchmarks/serve_bench.py --json after.json --compare before.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+
+# Make the repository's http package win over the standard library's
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_link
+
+fake_link.install()
+
+import config
+from reticulum import start_link_server, stop_link_server
+from http import http_handler, http_busy_handler, new_http_session
+
+MIXES = ["hit", "directory", "not_found", "mixed"]
+
+# Ten requests of the "mixed" workload: mostly cached files, some directories and misses
+MIXED_PATTERN = ["hit"] * 8 + ["directory", "not_found"]
+
+
+class FakeDestination:
+    """Accepts the server's Link callback and opens Links on demand."""
+
+    def __init__(self):
+        self.link_established = None
+
+    def set_link_established_callback(self, callback):
+        self.link_established = callback
+
+    def connect(self, mdu, bandwidth, latency):
+        link = fake_link.FakeLink(mdu, bandwidth, latency)
+        self.link_established(link)
+        return link
+
+
+def parse_size(text):
+    """Parse sizes like 512, 1K, 64K, 1M or 50M into bytes."""
+    units = {"K": 1024, "M": 1024 * 1024, "G": 1024 * 1024 * 1024}
+    text = text.strip().upper()
+    if text[-1:] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def format_size(size):
+    for unit, scale in (("M", 1024 * 1024), ("K", 1024)):
+        if size >= scale and size % scale == 0:
+            return f"{size // scale}{unit}"
+    return str(size)
+
+
+def create_site(root, sizes):
+    """Create one file and one directory (with a default file) per size."""
+    for size in sizes:
+        content = os.urandom(size)
+        with open(os.path.join(root, f"file-{format_size(size)}.bin"), 'wb') as f:
+            f.write(content)
+        directory = os.path.join(root, f"dir-{format_size(size)}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "index.html"), 'wb') as f:
+            f.write(content)
+
+
+def configure(public_dir, args):
+    """Point the server at the benchmark site, without reading config/server.toml."""
+    config.apply({
+        "server": {"public_dir": public_dir, "scan_interval": 0},
+        "logging": {"access_log": ""},
+        "limits": {"request_rate": 0},
+        "workers": {"threads": args.workers, "queue_per_link": args.queue_per_link},
+        "cache": {"max_bytes": parse_size(args.cache_bytes), "max_file_bytes": parse_size(args.cache_file_bytes)},
+    })
+
+
+def request_paths(mix, size, count):
+    """Build the request paths for one workload."""
+    kinds = MIXED_PATTERN if mix == "mixed" else [mix]
+    paths = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        if kind == "hit":
+            paths.append(f"/file-{format_size(size)}.bin")
+        elif kind == "directory":
+            paths.append(f"/dir-{format_size(size)}/")
+        else:
+            paths.append(f"/missing-{i}.html")
+    return paths
+
+
+def run_clients(destination, paths, concurrency, args):
+    """Send paths from concurrency Links, one request at a time per Link.
+
+    Returns per-request latencies, per-client elapsed times, status counts and
+    response bytes. Latency is server time (measured) plus wire time both ways
+    (computed from the Link's bandwidth and latency).
+    """
+    latencies = []
+    clocks = []
+    statuses = {}
+    received = [0]
+    lock = threading.Lock()
+
+    def client(client_paths):
+        link = destination.connect(args.mdu, args.bandwidth, args.latency)
+        local_latencies = []
+        local_statuses = {}
+        local_bytes = 0
+
+        for path in client_paths:
+            request = f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode('utf-8')
+            start = time.perf_counter()
+            link.send(request)
+            size, status = link.wait_response()
+            server_time = time.perf_counter() - start
+
+            local_latencies.append(server_time + link.wire_time(len(request)) + link.wire_time(size))
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+            local_bytes += size
+
+        link.close()
+        with lock:
+            latencies.extend(local_latencies)
+            clocks.append(sum(local_latencies))
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+            received[0] += local_bytes
+
+    threads = [
+        threading.Thread(target=client, args=(paths[i::concurrency],), name=f"bench-client-{i}")
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return latencies, clocks, statuses, received[0]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_scenario(destination, mix, size, concurrency, args):
+    """Benchmark one workload; returns a result dict."""
+    count = args.requests
+    if mix != "not_found":
+        # Keep huge files from turning a run into gigabytes of copying
+        count = min(count, max(concurrency, parse_size(args.max_bytes) // size))
+    count = max(count, concurrency)
+    paths = request_paths(mix, size, count)
+
+    # Warm the index and file cache so "hit" means a cache hit
+    run_clients(destination, sorted(set(paths)), 1, args)
+
+    start = time.perf_counter()
+    latencies, clocks, statuses, received = run_clients(destination, paths, concurrency, args)
+    wall = time.perf_counter() - start
+
+    # Peak memory is measured on a separate, shorter run because tracing slows everything down
+    tracemalloc.start()
+    run_clients(destination, paths[:concurrency * 2], concurrency, args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # With a simulated slow link, the wire (not the server) bounds throughput
+    elapsed = max(wall, max(clocks))
+
+    return {
+        "mix": mix,
+        "size": 0 if mix == "not_found" else size,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mb_per_s": round(received / elapsed / 1e6, 2),
+        "peak_memory_bytes": peak,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def scenario_key(result):
+    return f"{result['mix']}/{format_size(result['size'])}/c{result['concurrency']}"
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result, baseline=None):
+    line = (
+        f"  {scenario_key(result):<24} {result['requests_per_s']:10.1f} req/s"
+        f"  p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms"
+        f"  peak {result['peak_memory_bytes'] / 1e6:8.2f} MB"
+    )
+    if baseline is not None and baseline["requests_per_s"]:
+        change = (result["requests_per_s"] / baseline["requests_per_s"] - 1) * 100
+        line += f"  ({change:+.1f}% req/s)"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RServer's serving path over a fake Link")
+    parser.add_argument('--sizes', default="1K,64K,1M,50M", help='File sizes (default: 1K,64K,1M,50M)')
+    parser.add_argument('--mixes', default=",".join(MIXES), help=f'Request mixes (default: {",".join(MIXES)})')
+    parser.add_argument('--concurrency', default="1,4,16", help='Concurrent Links (default: 1,4,16)')
+    parser.add_argument('--requests', type=int, default=400, help='Requests per workload (default: 400)')
+    parser.add_argument('--max-bytes', default="256M", help='Cap on response bytes per workload (default: 256M)')
+    parser.add_argument('--workers', type=int, default=4, help='Server worker threads (default: 4)')
+    parser.add_argument('--queue-per-link', type=int, default=8, help='Queued requests per Link (default: 8)')
+    parser.add_argument('--cache-bytes', default="8M", help='File cache size (default: 8M)')
+    parser.add_argument('--cache-file-bytes', default="1M", help='Largest cached file (default: 1M)')
+    parser.add_argument('--mdu', type=int, default=fake_link.FakeLink.MDU, help='Link MDU in bytes')
+    parser.add_argument('--bandwidth', type=float, default=0, help='Link bandwidth in bits/s (default: unlimited)')
+    parser.add_argument('--latency', type=float, default=0.0, help='One-way link latency in seconds')
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--compare', help='Show req/s change against a previous --json file')
+
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    mixes = [mix.strip() for mix in args.mixes.split(",")]
+    concurrency_levels = [int(level) for level in args.concurrency.split(",")]
+
+    unknown = set(mixes) - set(MIXES)
+    if unknown:
+        parser.error(f"unknown mix: {', '.join(sorted(unknown))}")
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = {scenario_key(result): result for result in json.load(f)["results"]}
+
+    public_dir = tempfile.mkdtemp(prefix="rserver-bench-")
+    results = []
+
+    try:
+        print(f"Creating benchmark site in {public_dir}...")
+        create_site(public_dir, sizes)
+        configure(public_dir, args)
+
+        destination = FakeDestination()
+        start_link_server(destination, http_handler, http_busy_handler, new_http_session)
+
+        for mix in mixes:
+            for size in (sizes[:1] if mix == "not_found" else sizes):
+                for concurrency in concurrency_levels:
+                    result = run_scenario(destination, mix, size, concurrency, args)
+                    results.append(result)
+                    print_result(result, baseline.get(scenario_key(result)))
+
+        stop_link_server()
+    finally:
+        shutil.rmtree(public_dir, ignore_errors=True)
+
+    if args.json:
+        report = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {
+                "workers": args.workers,
+                "mdu": args.mdu,
+                "bandwidth": args.bandwidth,
+                "latency": args.latency,
+                "cache_bytes": parse_size(args.cache_bytes),
+                "cache_file_bytes": parse_size(args.cache_file_bytes),
+            },
+            "results": results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""
+Client package for fetching from RServer over Reticulum.
+"""
+
+from .session import MeshSession, PendingRequest, parse_response_head
+from .connect import connect, find_path, establish_link
+from .mirror import asset_paths, output_path, split_bundle
+from .sync import parse_manifest, plan_sync, write_blob, remove_stale, load_state, save_state, state_entries, blob_path
+from .bench import load_mix, mix_entry, run_bench, format_report
@@ -0,0 +1,263 @@
+"""
+Load generation for meshcurl bench: many concurrent Links replaying a request mix.
+"""
+
+import RNS
+import json
+import math
+import time
+import threading
+
+from .session import parse_response_head
+
+
+class MixEntry:
+    """One request in a bench mix."""
+
+    __slots__ = ("method", "path", "headers", "body")
+
+    def __init__(self, method, path, headers=None, body=b""):
+        self.method = method
+        self.path = path
+        self.headers = headers or {}
+        self.body = body
+
+
+def load_mix(path):
+    """Load a request mix from a file.
+
+    Each line is either a JSON object with "path" and optionally "method",
+    "headers", "body" and "weight" (how many times it appears in the mix), or
+    plain text: "/path" or "METHOD /path". Blank lines, # comments and JSON
+    lines without a "path" are skipped.
+
+    Returns:
+        list: MixEntry for each request, repeated by weight, in file order
+
+    Raises:
+        ValueError: If the file has no requests or a line is invalid
+    """
+    mix = []
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            if line.startswith('{'):
+                try:
+                    fields = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{number}: {e}")
+                if "path" not in fields:
+                    continue
+                entry = mix_entry(fields.get("method", "GET"), fields["path"], fields.get("headers"), fields.get("body", ""))
+                weight = fields.get("weight", 1)
+            else:
+                parts = line.split()
+                if len(parts) > 2:
+                    raise ValueError(f"{path}:{number}: expected \"/path\" or \"METHOD /path\"")
+                entry = mix_entry(*parts) if len(parts) == 2 else mix_entry("GET", parts[0])
+                weight = 1
+
+            if not isinstance(weight, int) or weight < 1:
+                raise ValueError(f"{path}:{number}: weight must be a positive integer")
+            mix.extend([entry] * weight)
+
+    if not mix:
+        raise ValueError(f"{path} has no requests")
+    return mix
+
+
+def mix_entry(method, path, headers=None, body=""):
+    path = path if path.startswith('/') else '/' + path
+    body = body.encode('utf-8') if isinstance(body, str) else body
+    return MixEntry(method.upper(), path, headers, body)
+
+
+class BenchStats:
+    """What happened during a bench run, collected from every client thread."""
+
+    def __init__(self):
+        self.link_setup = []
+        self.link_failures = 0
+        self.first_byte = []
+        self.latency = []
+        self.statuses = {}
+        self.errors = {}
+        self.received = 0
+        self._lock = threading.Lock()
+
+    def link_opened(self, seconds):
+        with self._lock:
+            self.link_setup.append(seconds)
+
+    def link_failed(self, error):
+        with self._lock:
+            self.link_failures += 1
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def completed(self, pending):
+        with self._lock:
+            if pending.error is not None:
+                self.errors[pending.error] = self.errors.get(pending.error, 0) + 1
+                return
+            status_code, _ = parse_response_head(pending.response)
+            self.statuses[status_code] = self.statuses.get(status_code, 0) + 1
+            self.received += len(pending.response)
+            self.first_byte.append(pending.time_to_first_byte)
+            self.latency.append(pending.elapsed)
+
+    def requests(self):
+        return sum(self.statuses.values()) + sum(self.errors.values()) - self.link_failures
+
+    def report(self, elapsed):
+        """Summarize the run as a dict of plain numbers (times in milliseconds)."""
+        with self._lock:
+            requests = self.requests()
+            failed = requests - sum(self.statuses.values())
+            http_errors = sum(count for status, count in self.statuses.items() if status >= 400 or status == 0)
+            return {
+                "elapsed_s": round(elapsed, 3),
+                "links": len(self.link_setup),
+                "link_failures": self.link_failures,
+                "requests": requests,
+                "requests_per_s": round(requests / elapsed, 1) if elapsed else 0.0,
+                "received_bytes": self.received,
+                "received_bytes_per_s": round(self.received / elapsed) if elapsed else 0,
+                "link_setup_ms": summarize(self.link_setup),
+                "ttfb_ms": summarize(self.first_byte),
+                "latency_ms": summarize(self.latency),
+                "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+                "failed": failed,
+                "http_errors": http_errors,
+                "error_rate": round((failed + http_errors) / requests, 4) if requests else 0.0,
+                "errors": dict(self.errors),
+            }
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def summarize(seconds):
+    """Get min, p50, p90, p99 and max of a list of durations, in milliseconds."""
+    if not seconds:
+        return {}
+    values = sorted(seconds)
+    return {
+        "min": round(values[0] * 1000, 3),
+        "p50": round(percentile(values, 0.50) * 1000, 3),
+        "p90": round(percentile(values, 0.90) * 1000, 3),
+        "p99": round(percentile(values, 0.99) * 1000, 3),
+        "max": round(values[-1] * 1000, 3),
+    }
+
+
+class RequestSource:
+    """Hands out the mix's requests round-robin until a count or deadline is reached."""
+
+    def __init__(self, mix, total=None, deadline=None):
+        self.mix = mix
+        self.total = total
+        self.deadline = deadline
+        self.issued = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        """Get the next request to send, or None when the run is over."""
+        with self._lock:
+            if self.total is not None and self.issued >= self.total:
+                return None
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                return None
+            entry = self.mix[self.issued % len(self.mix)]
+            self.issued += 1
+            return entry
+
+
+def run_bench(open_session, mix, clients=1, total=None, duration=None, parallel=1, timeout=60, headers=None):
+    """Replay mix from clients concurrent Links until total requests were sent or duration passed.
+
+    open_session is called once per client (on its own thread) to open a Link
+    and return a MeshSession; it raises ConnectionError if that fails. Each
+    client keeps up to parallel requests in flight on its Link.
+
+    Returns:
+        dict: The BenchStats report
+    """
+    if total is None and duration is None:
+        total = len(mix)
+
+    stats = BenchStats()
+    started = time.monotonic()
+    source = RequestSource(mix, total, started + duration if duration is not None else None)
+
+    threads = [
+        threading.Thread(target=run_client, args=(open_session, source, stats, parallel, timeout, headers or {}),
+                         name=f"meshcurl-bench-{index}", daemon=True)
+        for index in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return stats.report(time.monotonic() - started)
+
+
+def run_client(open_session, source, stats, parallel, timeout, headers):
+    """One simulated client: open a Link, then send requests from source over it until it runs dry.
+
+    The requests go through MeshSession.fetch_all, like any other client's, and
+    each one is passed to stats as it completes.
+    """
+    link_started = time.monotonic()
+    try:
+        session = open_session()
+    except ConnectionError as e:
+        stats.link_failed(f"Link: {e}")
+        return
+    stats.link_opened(time.monotonic() - link_started)
+
+    # fetch_all sends what is added to requests while it runs: one more from source per completed request
+    requests = []
+
+    def take():
+        # A closed Link fails whatever is in flight, and nothing more can be sent on it
+        entry = source.next() if session.link.status != RNS.Link.CLOSED else None
+        if entry is not None:
+            requests.append((entry.method, entry.path, entry.headers, entry.body))
+        return entry is not None
+
+    try:
+        while len(requests) < parallel and take():
+            pass
+        for pending in session.fetch_all(requests, headers, parallel, timeout):
+            stats.completed(pending)
+            take()
+    finally:
+        session.close()
+
+
+def format_report(report):
+    """Render a bench report as lines of text."""
+    lines = [
+        f"  Duration            {report['elapsed_s']:10.3f}s",
+        f"  Links               {report['links']:10d}  ({report['link_failures']} failed)",
+        f"  Requests            {report['requests']:10d}  ({report['requests_per_s']} req/s)",
+        f"  Received            {report['received_bytes']:10d}  bytes ({report['received_bytes_per_s']} B/s)",
+    ]
+    for label, key in (("Link setup", "link_setup_ms"), ("Time to first byte", "ttfb_ms"), ("Latency", "latency_ms")):
+        times = report[key]
+        if times:
+            lines.append(f"  {label:<19} p50 {times['p50']:9.1f} ms  p90 {times['p90']:9.1f} ms  "
+                         f"p99 {times['p99']:9.1f} ms  max {times['max']:9.1f} ms")
+    statuses = ", ".join(f"{status}: {count}" for status, count in report["statuses"].items()) or "none"
+    lines.append(f"  Statuses            {statuses}")
+    lines.append(f"  Error rate          {report['error_rate'] * 100:9.2f}%  "
+                 f"({report['failed']} failed, {report['http_errors']} HTTP errors)")
+    for error, count in sorted(report["errors"].items(), key=lambda item: -item[1]):
+        lines.append(f"    {count:6d}  {error}")
+    return "\n".join(lines)
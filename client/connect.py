@@ -0,0 +1,113 @@
+"""
+Finding a path to an RServer destination and establishing a Link, driven by
+Reticulum callbacks instead of polling.
+"""
+
+import RNS
+import time
+import threading
+
+from .session import MeshSession
+
+
+class PathWaiter:
+    """Announce handler that fires when a path response for one destination arrives."""
+
+    receive_path_responses = True
+
+    def __init__(self, destination_hash, aspect_filter):
+        self.destination_hash = destination_hash
+        self.aspect_filter = aspect_filter
+        self.found = threading.Event()
+
+    def received_announce(self, destination_hash, announced_identity, app_data):
+        if destination_hash == self.destination_hash:
+            self.found.set()
+
+
+def find_path(destination_hash, app_name, aspect, timeout):
+    """Make sure Transport knows a path to a destination.
+
+    Returns:
+        bool: True once a path is known, False on timeout
+    """
+    if RNS.Transport.has_path(destination_hash):
+        return True
+
+    waiter = PathWaiter(destination_hash, f"{app_name}.{aspect}")
+    RNS.Transport.register_announce_handler(waiter)
+    try:
+        RNS.Transport.request_path(destination_hash)
+
+        # The path response arrives as an announce; has_path covers one that raced the handler
+        deadline = time.monotonic() + timeout
+        while not RNS.Transport.has_path(destination_hash):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            waiter.found.wait(min(remaining, 1.0))
+        return True
+    finally:
+        deregister = getattr(RNS.Transport, "deregister_announce_handler", None)
+        if deregister is not None:
+            deregister(waiter)
+
+
+def establish_link(destination, timeout):
+    """Open a Link and wait for it to become active.
+
+    Returns:
+        RNS.Link: The active Link, or None if it failed or timed out
+    """
+    changed = threading.Event()
+    link = RNS.Link(
+        destination,
+        established_callback=lambda link: changed.set(),
+        closed_callback=lambda link: changed.set()
+    )
+
+    if not changed.wait(timeout) or link.status != RNS.Link.ACTIVE:
+        link.teardown()
+        return None
+    return link
+
+
+def connect(destination_hash, app_name="rserver", aspect="web", timeout=30, log=print):
+    """Find a path to a server, open a Link and wrap it in a MeshSession.
+
+    Returns:
+        tuple: (MeshSession, timings) where timings has "path" and "link" seconds
+
+    Raises:
+        ConnectionError: No path, unknown identity or the Link could not be established
+    """
+    timings = {}
+
+    start = time.monotonic()
+    if not RNS.Transport.has_path(destination_hash):
+        log("✓ Requesting path to destination...")
+    if not find_path(destination_hash, app_name, aspect, timeout):
+        raise ConnectionError("Could not find path to destination")
+    timings["path"] = time.monotonic() - start
+    log("✓ Path to destination found")
+
+    server_identity = RNS.Identity.recall(destination_hash)
+    if server_identity is None:
+        raise ConnectionError("Could not recall server identity")
+
+    server_destination = RNS.Destination(
+        server_identity,
+        RNS.Destination.OUT,
+        RNS.Destination.SINGLE,
+        app_name, aspect
+    )
+
+    start = time.monotonic()
+    log("Establishing Link...")
+    link = establish_link(server_destination, timeout)
+    if link is None:
+        raise ConnectionError("Link establishment failed")
+    timings["link"] = time.monotonic() - start
+    log("✓ Link established!")
+
+    return MeshSession(link), timings
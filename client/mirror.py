@@ -0,0 +1,21 @@
+"""
+Finding the assets a page references and where to save them, for meshcurl --mirror.
+"""
+
+import os
+import posixpath
+
+# The parsing is shared with the server, which uses it for preload hints and bundles; re-exported for the client package
+from http.assets import asset_paths, split_bundle
+
+
+def output_path(output_dir, path):
+    """Map a URL path to a file under output_dir (directories get index.html)."""
+    relative = path.split("?", 1)[0].lstrip("/")
+    if not relative or relative.endswith("/"):
+        relative += "index.html"
+
+    relative = posixpath.normpath(relative)
+    if relative.startswith(".."):
+        raise ValueError(f"Path escapes the output directory: {path}")
+    return os.path.join(output_dir, *relative.split("/"))
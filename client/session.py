@@ -0,0 +1,247 @@
+"""
+Multiplexed HTTP requests over one Reticulum Link.
+
+Each request carries a Request-Id header that the server echoes in its response,
+so several requests can be in flight at once and complete in any order.
+"""
+
+import RNS
+import time
+import queue
+import threading
+
+
+class PendingRequest:
+    """A request sent on a MeshSession, completed when its response arrives."""
+
+    __slots__ = (
+        "request_id", "method", "path", "sent_at", "first_byte_at", "completed_at",
+        "response", "error", "on_complete", "_done"
+    )
+
+    def __init__(self, request_id, method, path, on_complete=None):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.sent_at = time.monotonic()
+        self.first_byte_at = None
+        self.completed_at = None
+        self.response = None
+        self.error = None
+        self.on_complete = on_complete
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def elapsed(self):
+        """Seconds from sending the request to its response (or until now)."""
+        return (self.completed_at or time.monotonic()) - self.sent_at
+
+    @property
+    def time_to_first_byte(self):
+        """Seconds until the response started arriving (None if it hasn't)."""
+        return None if self.first_byte_at is None else self.first_byte_at - self.sent_at
+
+    def wait(self, timeout=None):
+        """Wait for the response; returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def _complete(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self.completed_at = time.monotonic()
+        if self.first_byte_at is None:
+            self.first_byte_at = self.completed_at
+        self._done.set()
+        if self.on_complete is not None:
+            self.on_complete(self)
+
+
+class MeshSession:
+    """Sends HTTP requests over an established Link and matches responses to them."""
+
+    def __init__(self, link):
+        self.link = link
+        self._next_id = 1
+        self._pending = {}
+        self._lock = threading.Lock()
+
+        # Responses arrive as a packet or, when larger, as a Resource
+        link.set_packet_callback(self._on_packet)
+        link.set_resource_strategy(RNS.Link.ACCEPT_ALL)
+        link.set_resource_started_callback(self._on_resource_started)
+        link.set_resource_concluded_callback(self._on_resource_concluded)
+        link.set_link_closed_callback(self._on_link_closed)
+
+    def request(self, method, path, headers=None, body=b"", on_complete=None):
+        """Send a request without waiting for its response.
+
+        Returns:
+            PendingRequest: Completed (and passed to on_complete) when the matching response arrives
+        """
+        with self._lock:
+            request_id = str(self._next_id)
+            self._next_id += 1
+            pending = self._pending[request_id] = PendingRequest(request_id, method, path, on_complete)
+
+        lines = [f"{method} {path} HTTP/1.1", f"Request-Id: {request_id}"]
+        for key, value in (headers or {}).items():
+            lines.append(f"{key}: {value}")
+        if body:
+            lines.append(f"Content-Length: {len(body)}")
+
+        self._send(("\r\n".join(lines) + "\r\n\r\n").encode('utf-8') + body)
+        return pending
+
+    def fetch(self, method, path, headers=None, body=b"", timeout=60):
+        """Send a request and wait for its response, cancelling it on timeout.
+
+        Returns:
+            bytes: The raw HTTP response
+
+        Raises:
+            TimeoutError: No response within timeout seconds
+            ConnectionError: The Link closed or the transfer failed
+        """
+        pending = self.request(method, path, headers, body)
+        if not pending.wait(timeout):
+            self.cancel(pending)
+            raise TimeoutError(f"No response for {path} within {timeout}s")
+        if pending.error is not None:
+            raise ConnectionError(pending.error)
+        return pending.response
+
+    def fetch_all(self, paths, headers=None, parallel=4, timeout=60, method="GET"):
+        """Fetch paths with at most parallel requests in flight, yielding each as it completes.
+
+        An item of paths can also be a (method, path, headers, body) tuple for a
+        request of its own, whose headers are added to headers. paths may grow
+        while it is being consumed (e.g. with assets found in earlier responses).
+        Requests that time out are cancelled and yielded with their error set.
+        """
+        completed = queue.Queue()
+        in_flight = {}
+        next_index = 0
+
+        while next_index < len(paths) or in_flight:
+            while next_index < len(paths) and len(in_flight) < parallel:
+                item = paths[next_index]
+                if isinstance(item, tuple):
+                    item_method, path, item_headers, body = item
+                    pending = self.request(item_method, path, {**(headers or {}), **item_headers}, body,
+                                           on_complete=completed.put)
+                else:
+                    pending = self.request(method, item, headers, on_complete=completed.put)
+                in_flight[pending.request_id] = pending
+                next_index += 1
+
+            # Wake up at the earliest deadline among the requests in flight
+            oldest = min(pending.sent_at for pending in in_flight.values())
+            try:
+                pending = completed.get(timeout=max(0.0, oldest + timeout - time.monotonic()))
+            except queue.Empty:
+                for pending in list(in_flight.values()):
+                    if pending.sent_at + timeout <= time.monotonic():
+                        self.cancel(pending, f"Timed out after {timeout}s")
+                continue
+
+            if in_flight.pop(pending.request_id, None) is not None:
+                yield pending
+
+    def cancel(self, pending, error="Cancelled"):
+        """Give up on a request; the server drops its response if it hasn't been sent."""
+        with self._lock:
+            if self._pending.pop(pending.request_id, None) is None:
+                return
+
+        pending._complete(error=error)
+        if self.link.status == RNS.Link.ACTIVE:
+            self._send(f"CANCEL {pending.path} HTTP/1.1\r\nRequest-Id: {pending.request_id}\r\n\r\n".encode('utf-8'))
+
+    def in_flight(self):
+        """Get the number of requests still waiting for a response."""
+        with self._lock:
+            return len(self._pending)
+
+    def close(self):
+        """Tear down the Link, failing any requests still in flight."""
+        self.link.teardown()
+        self._fail_all("Link closed")
+
+    def _send(self, data):
+        # A request larger than one packet is reassembled by the server
+        mdu = getattr(self.link, "mdu", None) or RNS.Link.MDU
+        for start in range(0, len(data), mdu):
+            RNS.Packet(self.link, data[start:start + mdu]).send()
+
+    def _on_packet(self, data, packet):
+        self._deliver(data)
+
+    def _on_resource_started(self, resource):
+        # The Request-Id is inside the Resource's data; credit the oldest request still waiting
+        now = time.monotonic()
+        with self._lock:
+            for pending in self._pending.values():
+                if pending.first_byte_at is None:
+                    pending.first_byte_at = now
+                    break
+
+    def _on_resource_concluded(self, resource):
+        if resource.status == RNS.Resource.COMPLETE:
+            # Large files are streamed with the response head as the Resource's metadata
+            head = getattr(resource, "metadata", None)
+            body = resource.data.read()
+            self._deliver(head + body if isinstance(head, bytes) else body)
+        else:
+            # Which request it belonged to is unknown until its data arrives; fail the oldest
+            with self._lock:
+                request_id = next(iter(self._pending), None)
+                pending = self._pending.pop(request_id, None)
+            if pending is not None:
+                pending._complete(error="Resource transfer failed")
+
+    def _on_link_closed(self, link):
+        self._fail_all("Link closed")
+
+    def _deliver(self, data):
+        """Complete the request a response belongs to."""
+        _, headers = parse_response_head(data)
+        request_id = headers.get("request-id")
+
+        with self._lock:
+            if request_id is None:
+                # Untagged responses (e.g. to an unparseable request) come back in order
+                request_id = next(iter(self._pending), None)
+            pending = self._pending.pop(request_id, None)
+
+        if pending is not None:
+            pending._complete(response=data)
+
+    def _fail_all(self, error):
+        with self._lock:
+            pending_requests = list(self._pending.values())
+            self._pending.clear()
+
+        for pending in pending_requests:
+            pending._complete(error=error)
+
+
+def parse_response_head(data):
+    """Get the status code and headers (lowercase names) of a raw HTTP response."""
+    head_end = data.find(b"\r\n\r\n")
+    head = bytes(data[:head_end] if head_end >= 0 else data)
+    lines = head.decode('latin-1').split("\r\n")
+
+    parts = lines[0].split(" ", 2)
+    status_code = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+
+    headers = {}
+    for line in lines[1:]:
+        key, separator, value = line.partition(":")
+        if separator:
+            headers[key.strip().lower()] = value.strip()
+
+    return status_code, headers
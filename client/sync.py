@@ -0,0 +1,134 @@
+"""
+Keeping a local mirror in sync with an RServer site, for meshcurl --sync.
+
+The server's manifest lists every file with its SHA-256; only files whose hash
+differs from the local copy are fetched, each by hash from the blob endpoint,
+and a blob shared by several paths is fetched once.
+"""
+
+import os
+import json
+import hashlib
+
+from http.manifest import BLOB_PREFIX, file_digest
+from .mirror import output_path
+
+# Written in the mirror directory: the manifest ETag and what each synced file looked like
+STATE_FILE = ".rserver-sync.json"
+
+
+def parse_manifest(body):
+    """Get the (path, size, sha256) entries of a manifest response body."""
+    manifest = json.loads(body)
+    columns = [manifest["fields"].index(name) for name in ("path", "size", "sha256")]
+    return [tuple(entry[column] for column in columns) for entry in manifest["files"]]
+
+
+def load_state(output_dir):
+    """Load the previous sync's state, or an empty one."""
+    try:
+        with open(os.path.join(output_dir, STATE_FILE), encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {"etag": None, "files": {}}
+    state.setdefault("etag", None)
+    state.setdefault("files", {})
+    return state
+
+
+def save_state(output_dir, state):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, STATE_FILE)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+def state_entries(state):
+    """Rebuild the manifest entries from the last sync (for a 304 manifest response)."""
+    return [(path, size, digest) for path, (size, _, digest) in state["files"].items()]
+
+
+def plan_sync(entries, output_dir, state):
+    """Work out which blobs to fetch and which synced files no longer exist on the server.
+
+    A local file whose size and mtime match the last sync is trusted without
+    rehashing; anything else is hashed, so local edits are repaired too.
+
+    Returns:
+        tuple: ({sha256: [paths]} to fetch, {path: [size, mtime_ns, sha256]} already current,
+            [paths] to remove)
+    """
+    known = state["files"]
+    fetch = {}
+    current = {}
+
+    for path, size, digest in entries:
+        local = output_path(output_dir, path)
+        try:
+            stat = os.stat(local)
+        except OSError:
+            fetch.setdefault(digest, []).append(path)
+            continue
+
+        record = [stat.st_size, stat.st_mtime_ns, digest]
+        if known.get(path) == record or (stat.st_size == size and file_digest(local) == digest):
+            current[path] = record
+        else:
+            fetch.setdefault(digest, []).append(path)
+
+    listed = {entry[0] for entry in entries}
+    stale = [path for path in known if path not in listed]
+    return fetch, current, stale
+
+
+def blob_path(digest):
+    return BLOB_PREFIX + digest
+
+
+def write_blob(body, digest, paths, output_dir):
+    """Check a fetched blob against its hash and write it to each path.
+
+    Returns:
+        dict: path -> [size, mtime_ns, sha256] for the state file
+
+    Raises:
+        ValueError: If the content doesn't match the hash
+    """
+    if hashlib.sha256(body).hexdigest() != digest:
+        raise ValueError(f"Blob {digest[:12]}... does not match its hash")
+
+    written = {}
+    for path in paths:
+        local = output_path(output_dir, path)
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        # Write next to the target and rename, so an interrupted sync never leaves a torn file
+        with open(local + ".part", 'wb') as f:
+            f.write(body)
+        os.replace(local + ".part", local)
+        stat = os.stat(local)
+        written[path] = [stat.st_size, stat.st_mtime_ns, digest]
+    return written
+
+
+def remove_stale(output_dir, paths):
+    """Delete files an earlier sync wrote that the server no longer has, and any emptied directories."""
+    removed = 0
+    for path in paths:
+        local = output_path(output_dir, path)
+        try:
+            os.remove(local)
+            removed += 1
+        except FileNotFoundError:
+            continue
+
+        directory = os.path.dirname(local)
+        root = os.path.abspath(output_dir)
+        while os.path.abspath(directory) != root:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+    return removed
+
@@ -3,56 +3,427 @@ RServer configuration management.
 """
 
 import os
+import time
+import types
+import logging
 import tomllib
+import importlib
+import threading
+from dataclasses import make_dataclass, fields
 
 # Fixed path (only this one needs to be constant to bootstrap config loading)
 CONFIG_PATH = "config/server.toml"
 
+# MIME types that compress well (images, archives and media are already compressed)
+DEFAULT_COMPRESSIBLE_TYPES = [
+    "text/*",
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "application/xhtml+xml",
+    "image/svg+xml",
+]
+
+LOG_LEVELS = ("debug", "info", "warning", "error", "critical")
+
+
+def _text(value):
+    if not isinstance(value, str):
+        raise ValueError("must be a string")
+    return value
+
+def _flag(value):
+    if not isinstance(value, bool):
+        raise ValueError("must be true or false")
+    return value
+
+def _count(value):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError("must be a whole number >= 0")
+    return value
+
+def _positive(value):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ValueError("must be a whole number >= 1")
+    return value
+
+def _seconds(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError("must be a number of seconds >= 0")
+    return value
+
+def _rate(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError("must be a number >= 0")
+    return value
+
+def _fraction(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value < 1:
+        raise ValueError("must be a fraction between 0 and 1")
+    return value
+
+def _level(value):
+    if not isinstance(value, str) or value.lower() not in LOG_LEVELS:
+        raise ValueError(f"must be one of {', '.join(LOG_LEVELS)}")
+    return value.lower()
+
+def _text_list(value):
+    if not isinstance(value, (list, tuple)) or not all(isinstance(item, str) for item in value):
+        raise ValueError("must be a list of strings")
+    return tuple(value)
+
+def _rules(value):
+    if not isinstance(value, (list, tuple)):
+        raise ValueError("must be a list of { pattern, max_age } tables")
+    rules = []
+    for rule in value:
+        if not isinstance(rule, dict) or not isinstance(rule.get("pattern"), str):
+            raise ValueError("each rule needs a string pattern")
+        if "max_age" in rule:
+            _count(rule["max_age"])
+        rules.append(types.MappingProxyType(dict(rule)))
+    return tuple(rules)
+
+
+def _handler(value):
+    """Import a "module:function" reference to a route handler."""
+    if not isinstance(value, str) or value.count(":") != 1:
+        raise ValueError(f"handler {value!r} must be \"module:function\"")
+    module_name, _, name = value.partition(":")
+    try:
+        handler = getattr(importlib.import_module(module_name), name)
+    except Exception as e:
+        raise ValueError(f"can't load handler {value}: {e}")
+    if not callable(handler):
+        raise ValueError(f"handler {value} is not callable")
+    return handler
+
+def _routes(value):
+    if not isinstance(value, (list, tuple)):
+        raise ValueError("must be a list of [[router.routes]] tables")
+    routes = []
+    seen = set()
+    for route in value:
+        if not isinstance(route, dict) or not isinstance(route.get("path"), str) or not route["path"].startswith("/"):
+            raise ValueError("each route needs a path starting with /")
+        path = route["path"]
+        segments = path.strip("/").split("/")
+        if "*" in segments[:-1]:
+            raise ValueError(f"* must be the last segment of route {path}")
+        if ("handler" in route) == ("body" in route):
+            raise ValueError(f"route {path} needs either a handler or a body")
+
+        entry = {"path": path, "methods": tuple(method.upper() for method in _text_list(route.get("methods", ["GET"])))}
+        if "handler" in route:
+            entry["handler"] = _handler(route["handler"])
+        else:
+            entry["body"] = _text(route["body"])
+            entry["content_type"] = _text(route.get("content_type", "text/plain; charset=utf-8"))
+
+        for method in entry["methods"]:
+            if (method, path.strip("/")) in seen:
+                raise ValueError(f"route {method} {path} is defined twice")
+            seen.add((method, path.strip("/")))
+        routes.append(types.MappingProxyType(entry))
+    return tuple(routes)
+
+
+# Every setting: (snapshot field, TOML section, TOML key, default, validator)
+SETTINGS = (
+    ("identity_path", "server", "identity_path", "config/identity", _text),
+    ("public_dir", "server", "public_dir", "public/", _text),
+    ("index_scan_interval", "server", "scan_interval", 2, _seconds),
+    ("server_name", "server", "name", "RServer Demo", _text),
+    ("default_file", "server", "default_file", "index.html", _text),
+    ("reload_interval", "server", "reload_interval", 2, _seconds),
+    ("directory_listings", "server", "directory_listings", True, _flag),
+    ("listing_page_size", "server", "listing_page_size", 200, _positive),
+    ("manifest_enabled", "server", "manifest", True, _flag),
+    ("app_name", "network", "app_name", "rserver", _text),
+    ("aspect", "network", "aspect", "web", _text),
+    ("announce_interval", "network", "announce_interval", 300, _seconds),
+    ("announce_jitter", "network", "announce_jitter", 0.1, _fraction),
+    ("cache_max_bytes", "cache", "max_bytes", 8 * 1024 * 1024, _count),
+    ("cache_max_file_bytes", "cache", "max_file_bytes", 1024 * 1024, _count),
+    ("compression_enabled", "compression", "enabled", True, _flag),
+    ("compression_level", "compression", "level", 6, _count),
+    ("compression_min_size", "compression", "min_size", 256, _count),
+    ("compression_max_size", "compression", "max_size", 1024 * 1024, _count),
+    ("compression_mime_types", "compression", "mime_types", DEFAULT_COMPRESSIBLE_TYPES, _text_list),
+    ("preload_hints", "assets", "preload_hints", True, _flag),
+    ("bundles_enabled", "assets", "bundles", True, _flag),
+    ("bundle_max_bytes", "assets", "bundle_max_bytes", 512 * 1024, _positive),
+    ("optimize_enabled", "optimize", "enabled", False, _flag),
+    ("optimize_cache_dir", "optimize", "cache_dir", "cache/optimized", _text),
+    ("routes", "router", "routes", [], _routes),
+    ("cache_control_default_max_age", "cache_control", "default_max_age", 0, _count),
+    ("cache_control_rules", "cache_control", "rules", [], _rules),
+    ("max_header_bytes", "limits", "max_header_bytes", 8192, _positive),
+    ("max_body_bytes", "limits", "max_body_bytes", 65536, _count),
+    ("request_rate", "limits", "request_rate", 20, _rate),
+    ("request_burst", "limits", "request_burst", 40, _positive),
+    ("transmit_rate", "transmit", "rate", 0, _rate),
+    ("transmit_burst", "transmit", "burst", 65536, _positive),
+    ("transmit_link_rate", "transmit", "link_rate", 0, _rate),
+    ("transmit_link_burst", "transmit", "link_burst", 16384, _positive),
+    ("transmit_small_bytes", "transmit", "small_response_bytes", 2048, _count),
+    ("worker_threads", "workers", "threads", 4, _positive),
+    ("worker_queue_per_link", "workers", "queue_per_link", 8, _positive),
+    ("worker_parallel_per_link", "workers", "parallel_per_link", 2, _positive),
+    ("worker_retry_after", "workers", "retry_after", 5, _count),
+    ("max_links", "links", "max_links", 256, _count),
+    ("link_idle_timeout", "links", "idle_timeout", 600, _seconds),
+    ("link_drain_timeout", "links", "drain_timeout", 30, _seconds),
+    ("log_level", "logging", "level", "info", _level),
+    ("access_log", "logging", "access_log", "-", _text),
+    ("stats_file", "metrics", "stats_file", "", _text),
+    ("stats_interval", "metrics", "stats_interval", 30, _seconds),
+    ("stats_endpoint", "metrics", "stats_endpoint", False, _flag),
+    ("profiler_interval", "metrics", "profile_interval", 0, _seconds),
+)
+
+# Settings that are only read at startup; changing them needs a restart
+RESTART_SETTINGS = {
+    "identity_path", "app_name", "aspect", "worker_threads",
+    "access_log", "stats_file", "stats_interval", "profiler_interval",
+    "sites",
+}
+
+# Sections a [[sites]] entry may override; the others (workers, cache, limits,
+# transmit, logging, metrics) are shared by every site in the process
+SITE_SECTIONS = ("server", "network", "assets", "compression", "cache_control", "router")
+
+# (section, key) of every per-site setting
+SITE_SETTINGS = {
+    (section, key) for _, section, key, _, _ in SETTINGS
+    if section in SITE_SECTIONS and (section, key) != ("server", "reload_interval")
+}
+
+# Section of each [server]/[network] key, which a site sets directly in its [[sites]] table
+SITE_KEYS = {key: section for section, key in SITE_SETTINGS if section in ("server", "network")}
+
+# An immutable, validated view of the whole config; replaced as a unit on reload
+ConfigSnapshot = make_dataclass(
+    "ConfigSnapshot",
+    [setting[0] for setting in SETTINGS],
+    frozen=True,
+    slots=True
+)
+
 def identity_path():
     """Get the identity file path."""
-    config = load_config()
-    return config.get("server", {}).get("identity_path", "config/identity")
+    return current().identity_path
 
 def public_dir():
     """Get the public directory path."""
-    config = load_config()
-    return config.get("server", {}).get("public_dir", "public/")
+    return current().public_dir
+
+def index_scan_interval():
+    """Get how often (seconds) the public directory is rescanned for changes."""
+    return current().index_scan_interval
 
 def server_name():
     """Get the server display name."""
-    config = load_config()
-    return config.get("server", {}).get("name", "RServer Demo")
+    return current().server_name
 
 def default_file():
     """Get the default file name (e.g., index.html)."""
-    config = load_config()
-    return config.get("server", {}).get("default_file", "index.html")
+    return current().default_file
+
+def directory_listings():
+    """Check if folders without a default file are listed."""
+    return current().directory_listings
+
+def listing_page_size():
+    """Get the number of entries per directory listing page."""
+    return current().listing_page_size
+
+def manifest_enabled():
+    """Check if the site manifest and content-addressed blobs are served."""
+    return current().manifest_enabled
 
 def announce_interval():
     """Get the announcement interval in seconds."""
-    config = load_config()
-    return config.get("network", {}).get("announce_interval", 300)
+    return current().announce_interval
+
+def announce_jitter():
+    """Get the announce interval jitter, as a fraction of the interval."""
+    return current().announce_jitter
+
+def cache_max_bytes():
+    """Get the total byte budget for the in-memory file cache."""
+    return current().cache_max_bytes
+
+def cache_max_file_bytes():
+    """Get the largest file size that will be kept in the file cache."""
+    return current().cache_max_file_bytes
+
+def preload_hints():
+    """Check if HTML pages get Link preload headers for their assets."""
+    return current().preload_hints
+
+def bundles_enabled():
+    """Check if pages can be requested as a bundle with their assets."""
+    return current().bundles_enabled
+
+def bundle_max_bytes():
+    """Get the largest total content of one page bundle."""
+    return current().bundle_max_bytes
+
+def optimize_enabled():
+    """Check if files are optimized at startup and served from the optimized cache."""
+    return current().optimize_enabled
+
+def optimize_cache_dir():
+    """Get the directory minified and precompressed copies of files are kept in."""
+    return current().optimize_cache_dir
+
+def compression_enabled():
+    """Check if on-the-fly response compression is enabled."""
+    return current().compression_enabled
+
+def compression_level():
+    """Get the compression level used for on-the-fly compression."""
+    return current().compression_level
+
+def compression_min_size():
+    """Get the smallest file size worth compressing."""
+    return current().compression_min_size
+
+def compression_max_size():
+    """Get the largest file size that will be compressed on the fly."""
+    return current().compression_max_size
+
+def compression_mime_types():
+    """Get the MIME type patterns that are compressed (others are sent as-is)."""
+    return current().compression_mime_types
+
+def routes():
+    """Get the configured routes: {path, methods, and handler or body and content_type} tables."""
+    return current().routes
+
+def cache_control_default_max_age():
+    """Get the Cache-Control max-age for files not matched by any rule."""
+    return current().cache_control_default_max_age
+
+def cache_control_rules():
+    """Get the Cache-Control rules as a list of {pattern, max_age} tables."""
+    return current().cache_control_rules
+
+def max_header_bytes():
+    """Get the largest accepted request line plus headers, in bytes."""
+    return current().max_header_bytes
+
+def max_body_bytes():
+    """Get the largest accepted request body, in bytes."""
+    return current().max_body_bytes
+
+def request_rate():
+    """Get the per-Link request rate limit, 0 for unlimited."""
+    return current().request_rate
+
+def request_burst():
+    """Get how many requests a Link may send at once before the rate limit applies."""
+    return current().request_burst
+
+def transmit_limits():
+    """Get (rate, burst, link_rate, link_burst, small_response_bytes) for the transmit scheduler."""
+    settings = current()
+    return (settings.transmit_rate, settings.transmit_burst, settings.transmit_link_rate,
+            settings.transmit_link_burst, settings.transmit_small_bytes)
+
+def worker_threads():
+    """Get the number of worker threads that handle requests."""
+    return current().worker_threads
+
+def worker_queue_per_link():
+    """Get the maximum number of requests queued per Link before shedding load."""
+    return current().worker_queue_per_link
+
+def worker_parallel_per_link():
+    """Get how many requests with a Request-Id one Link may have running at once."""
+    return current().worker_parallel_per_link
+
+def worker_retry_after():
+    """Get the Retry-After seconds sent with 503 responses when overloaded."""
+    return current().worker_retry_after
+
+def link_limits():
+    """Get (max_links, idle_timeout, drain_timeout) for the Link registry."""
+    settings = current()
+    return settings.max_links, settings.link_idle_timeout, settings.link_drain_timeout
+
+def log_level():
+    """Get the event log level (debug, info, warning, error)."""
+    return current().log_level
+
+def access_log():
+    """Get the access log target: "-" for the console, a file path, or "" to disable."""
+    return current().access_log
+
+def stats_file():
+    """Get the path of the periodically written stats file ("" to disable)."""
+    return current().stats_file
+
+def stats_interval():
+    """Get how often (seconds) the stats file is rewritten."""
+    return current().stats_interval
+
+def stats_endpoint():
+    """Check if metrics are served at /.well-known/rserver-stats."""
+    return current().stats_endpoint
+
+def profiler_interval():
+    """Get the sampling profiler interval in seconds (0 disables the profiler)."""
+    return current().profiler_interval
 
 def app_context():
     """Get the application context (app_name, aspect)."""
-    config = load_config()
-    network = config.get("network", {})
-    return network.get("app_name", "rserver"), network.get("aspect", "web")
+    settings = current()
+    return settings.app_name, settings.aspect
+
+
+# Current snapshot, one snapshot per site, and the listeners told when they are replaced
+_snapshot = None
+_sites = ()
+_snapshot_mtime = None
+_listeners = []
+_lock = threading.Lock()
+_watcher = None
+
 
+def current():
+    """Get the current config snapshot (read it once and use it for a whole request)."""
+    snapshot = _snapshot
+    if snapshot is None:
+        reload()
+        snapshot = _snapshot
+    return snapshot
 
-# Cache for loaded config
-_config_cache = None
+
+def sites():
+    """Get the snapshot of every site served, in config order (just current() without [[sites]])."""
+    current()
+    return _sites
+
+
+def site(key=None):
+    """Get the current snapshot of the site with this identity path (the first site for None).
+
+    Returns None for a site that is no longer configured.
+    """
+    configured = sites()
+    if key is None:
+        return configured[0]
+    for snapshot in configured:
+        if snapshot.identity_path == key:
+            return snapshot
+    return None
 
 
 def load_config():
-    """Load configuration from TOML file with defaults."""
+    """Read the TOML config file, creating the default one if it doesn't exist."""
 
-    global _config_cache
-    
-    # Return cached config if already loaded
-    if _config_cache is not None:
-        return _config_cache
-    
     # Create default config file if it doesn't exist
     if not os.path.exists(CONFIG_PATH):
         create_default_config()
@@ -60,12 +431,200 @@ def load_config():
     # Now read the config file
     try:
         with open(CONFIG_PATH, 'rb') as f:
-            _config_cache = tomllib.load(f)
-        return _config_cache
+            return tomllib.load(f)
     except Exception as e:
         raise ValueError(f"Error reading config file {CONFIG_PATH}: {e}")
 
 
+def build_snapshot(raw):
+    """Validate a parsed config and fill in defaults.
+
+    Raises:
+        ValueError: Listing every invalid setting
+    """
+    values = {}
+    problems = []
+
+    for name, section, key, default, validate in SETTINGS:
+        value = raw.get(section, {}).get(key, default)
+        try:
+            values[name] = validate(value)
+        except ValueError as e:
+            problems.append(f"[{section}] {key} {e}")
+
+    if problems:
+        raise ValueError(f"Invalid config {CONFIG_PATH}: " + "; ".join(problems))
+    return ConfigSnapshot(**values)
+
+
+def build_sites(raw):
+    """Build a snapshot for each [[sites]] entry, on top of the top-level settings.
+
+    A site's scalar keys are [server]/[network] settings; its subtables override
+    the other per-site sections.
+
+    Returns:
+        tuple: ConfigSnapshot per site, or None if no sites are configured
+
+    Raises:
+        ValueError: If an entry is invalid, sets a process-wide setting or
+            shares its identity with another site
+    """
+    entries = raw.get("sites")
+    if entries is None:
+        return None
+    if not isinstance(entries, list) or not entries or not all(isinstance(entry, dict) for entry in entries):
+        raise ValueError(f"Invalid config {CONFIG_PATH}: sites must be one or more [[sites]] tables")
+
+    snapshots = []
+    for number, entry in enumerate(entries, 1):
+        site_raw = {section: dict(values) for section, values in raw.items() if isinstance(values, dict)}
+        problems = []
+
+        for key, value in entry.items():
+            if isinstance(value, dict):
+                if key not in SITE_SECTIONS:
+                    problems.append(f"[{key}] is shared by all sites")
+                    continue
+                for name in value:
+                    if (key, name) not in SITE_SETTINGS and any(setting[1:3] == (key, name) for setting in SETTINGS):
+                        problems.append(f"[{key}] {name} is shared by all sites")
+                site_raw.setdefault(key, {}).update(value)
+            elif key in SITE_KEYS:
+                site_raw.setdefault(SITE_KEYS[key], {})[key] = value
+            else:
+                problems.append(f"{key} is not a site setting")
+
+        if problems:
+            raise ValueError(f"Invalid config {CONFIG_PATH}: site {number}: " + "; ".join(problems))
+        try:
+            snapshots.append(build_snapshot(site_raw))
+        except ValueError as e:
+            raise ValueError(f"{e} (site {number})")
+
+    # Each site is its own destination, so no two may share an identity
+    paths = [snapshot.identity_path for snapshot in snapshots]
+    for number, path in enumerate(paths, 1):
+        if paths.index(path) + 1 != number:
+            raise ValueError(f"Invalid config {CONFIG_PATH}: sites {paths.index(path) + 1} and {number} share identity_path {path}")
+
+    return tuple(snapshots)
+
+
+def reload():
+    """Re-read the config file and swap in the new snapshot.
+
+    Returns:
+        set: Names of the settings that changed
+
+    Raises:
+        ValueError: The file is unreadable or invalid; the current snapshot is kept
+    """
+    global _snapshot_mtime
+    mtime = config_mtime()
+    changed = apply(load_config())
+    _snapshot_mtime = mtime
+    return changed
+
+
+def apply(raw):
+    """Validate a parsed config and install it as the current snapshot, with its sites.
+
+    Listeners registered with on_change are called with (old, new) when any
+    setting changed, including a site's; they find the sites' new snapshots with
+    sites(). Returns the names of the settings that changed.
+    """
+    global _snapshot, _sites
+    snapshot = build_snapshot(raw)
+    site_snapshots = build_sites(raw) or (snapshot,)
+
+    with _lock:
+        old, _snapshot = _snapshot, snapshot
+        old_sites, _sites = _sites, site_snapshots
+        listeners = list(_listeners)
+
+    if old is None or (old == snapshot and old_sites == site_snapshots):
+        return set()
+
+    for listener in listeners:
+        try:
+            listener(old, snapshot)
+        except Exception as e:
+            logging.getLogger("rserver").error(f"✗ Error applying config change: {e}")
+
+    changed = changed_settings(old, snapshot)
+    if old_sites != (old,) or site_snapshots != (snapshot,):
+        changed |= changed_site_settings(old_sites, site_snapshots)
+    return changed
+
+
+def on_change(listener):
+    """Call listener(old, new) whenever a reload changes the config."""
+    with _lock:
+        _listeners.append(listener)
+
+
+def changed_settings(old, new, names=None):
+    """Get the names of the settings (optionally among names) that differ between snapshots."""
+    names = names or [field.name for field in fields(new)]
+    return {name for name in names if getattr(old, name) != getattr(new, name)}
+
+
+def changed_site_settings(old_sites, new_sites):
+    """Name what changed between two sets of sites: "sites" if any were added or
+    removed, otherwise "<site name>: <setting>" for each changed setting."""
+    if [site.identity_path for site in old_sites] != [site.identity_path for site in new_sites]:
+        return {"sites"}
+
+    changed = set()
+    for old, new in zip(old_sites, new_sites):
+        changed.update(f"{new.server_name}: {name}" for name in changed_settings(old, new))
+    return changed
+
+
+def try_reload(reason):
+    """Reload and log the outcome, keeping the current config if the new one is invalid."""
+    logger = logging.getLogger("rserver")
+    try:
+        changed = reload()
+    except ValueError as e:
+        logger.warning(f"✗ Config not reloaded ({reason}): {e}")
+        return
+
+    if not changed:
+        logger.info(f"✓ Config reloaded ({reason}), nothing changed")
+        return
+
+    logger.info(f"✓ Config reloaded ({reason}): {', '.join(sorted(changed))}")
+    needs_restart = {name for name in changed if name.rpartition(": ")[2] in RESTART_SETTINGS}
+    if needs_restart:
+        logger.warning(f"✗ Restart RServer to apply: {', '.join(sorted(needs_restart))}")
+
+
+def watch():
+    """Reload the config whenever the file changes, checking every reload_interval seconds."""
+    global _watcher
+
+    if _watcher is not None:
+        return
+
+    def watch_loop():
+        while True:
+            time.sleep(current().reload_interval or 1)
+            if current().reload_interval and config_mtime() != _snapshot_mtime:
+                try_reload("file changed")
+
+    _watcher = threading.Thread(target=watch_loop, name="rserver-config", daemon=True)
+    _watcher.start()
+
+
+def config_mtime():
+    try:
+        return os.stat(CONFIG_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+
 def create_default_config():
     """Create a default server.toml file."""
     
@@ -83,15 +642,126 @@ identity_path = "config/identity"
 # File serving settings
 public_dir = "public/"        # Directory to serve static content from
 directory_listings = true     # Enable directory listings for folders without default file
+listing_page_size = 200       # Entries per listing page (?page=N, ?format=json for JSON)
+manifest = true               # Serve /.well-known/rserver-manifest and /.well-known/blob/<sha256> for mirrors
 default_file = "index.html"   # Default file to serve (e.g., index.html, home.html)
+scan_interval = 2             # Seconds between scans of public_dir for changed files (0 = never)
+reload_interval = 2           # Seconds between checks of this file for changes (0 = only on SIGHUP)
 
 [network]
 # Application context for destination (should not normally be changed)
 app_name = "rserver"
 aspect = "web"
 
-# Server announcement interval in seconds
+# Server announcement interval in seconds (0 = only at startup)
 announce_interval = 300
+announce_jitter = 0.1         # Randomize each interval by +/- this fraction
+
+[logging]
+level = "info"                # Event log level: debug, info, warning, error
+access_log = "-"              # Access log: "-" for console, a file path, or "" to disable
+
+[metrics]
+stats_file = ""               # Write metrics JSON here periodically (e.g. "stats.json"), "" to disable
+stats_interval = 30           # Seconds between stats file writes
+stats_endpoint = false        # Serve metrics at /.well-known/rserver-stats
+profile_interval = 0          # Sampling profiler interval in seconds for worker threads (0 = off)
+
+[limits]
+# Requests may span several packets; these cap what is buffered per Link
+max_header_bytes = 8192       # Request line plus headers (larger requests get 431)
+max_body_bytes = 65536        # Request body (larger requests get 413)
+request_rate = 20             # Requests per second per Link before they are dropped with a 429 (0 = unlimited)
+request_burst = 40            # Requests a Link may send at once before request_rate applies
+
+[transmit]
+# Sharing the interface's bandwidth between Links (0 = unlimited)
+rate = 0                      # Bytes per second for all Links together
+burst = 65536                 # Bytes that may go out at once before rate applies
+link_rate = 0                 # Bytes per second for each Link
+link_burst = 16384            # Bytes one Link may send at once before link_rate applies
+small_response_bytes = 2048   # Responses up to this size go ahead of bulk transfers
+
+[workers]
+# Request handling runs on a worker pool, not the Reticulum callback thread
+threads = 4                   # Worker threads shared by all Links
+queue_per_link = 8            # Queued requests per Link before answering 503
+parallel_per_link = 2         # Requests with a Request-Id handled concurrently per Link
+retry_after = 5               # Retry-After seconds sent with 503 responses
+
+[links]
+# Open Links cost memory and keepalive traffic; these bound how many and for how long
+max_links = 256               # Links open at once; the least recently used idle one is closed to admit another (0 = unlimited)
+idle_timeout = 600            # Seconds without requests before a Link is closed (0 = never)
+drain_timeout = 30            # Seconds a closing Link may go without sending anything before it is torn down
+
+[cache]
+# In-memory file cache (set max_bytes = 0 to disable)
+max_bytes = 8388608           # Total bytes of file content kept in memory
+max_file_bytes = 1048576      # Files larger than this are always read from disk
+
+[assets]
+# Cutting round trips for pages that reference stylesheets, scripts and images
+preload_hints = true          # Add Link: rel=preload headers for the assets an HTML page references
+bundles = true                # Send a page and its assets as one multipart response on ?bundle=1 or "Prefer: bundle"
+bundle_max_bytes = 524288     # Most content in one bundle; assets that don't fit are left out
+
+[optimize]
+# Minified, precompressed copies of HTML, CSS, JS and SVG (the files in public_dir are never changed)
+enabled = false               # Build them at startup (or with optimize.py) and serve them instead of the originals
+cache_dir = "cache/optimized" # Where they are kept, named by the SHA-256 of the original content
+
+[compression]
+# Content-Encoding negotiation (gzip always, brotli/zstd when installed)
+enabled = true                # Compress responses on the fly when the client accepts it
+level = 6                     # Compression level
+min_size = 256                # Don't bother compressing files smaller than this
+max_size = 1048576            # Larger files are only served precompressed (.gz/.br/.zst siblings)
+mime_types = ["text/*", "application/javascript", "application/json", "application/xml", "application/xhtml+xml", "image/svg+xml"]
+
+[cache_control]
+# Cache-Control max-age (seconds) sent with files; first matching glob wins
+default_max_age = 0           # Clients revalidate (cheap 304) before reusing other files
+rules = [
+    { pattern = "*.css", max_age = 86400 },
+    { pattern = "*.js", max_age = 86400 },
+    { pattern = "/images/*", max_age = 604800 },
+]
+
+[router]
+# Extra routes, answered from memory without touching public_dir. A route's path
+# may use {name} for one segment and a final * for the rest; anything no route
+# matches is served from public_dir. Handlers are "module:function" and are
+# called with (request, params); edits to their module need a restart.
+#
+# [[router.routes]]
+# path = "/status"
+# body = "OK"
+# content_type = "text/plain"
+#
+# [[router.routes]]
+# path = "/api/items/{id}"
+# methods = ["GET", "POST"]
+# handler = "handlers:item"
+
+# Serve several sites from this process, each with its own identity and destination.
+# A site's keys override [server] and [network]; [sites.assets], [sites.compression],
+# [sites.cache_control] and [[sites.router.routes]] override those sections.
+# Without [[sites]], the settings above are the one site. Adding or removing a
+# site needs a restart.
+#
+# [[sites]]
+# name = "Docs"
+# identity_path = "config/docs_identity"
+# public_dir = "docs/"
+#
+# [[sites]]
+# name = "Blog"
+# identity_path = "config/blog_identity"
+# public_dir = "blog/"
+#
+# [sites.cache_control]
+# default_max_age = 600
 """
     
     with open(CONFIG_PATH, 'w') as f:
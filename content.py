@@ -6,15 +6,16 @@ import os
 import config
 
 
-def ensure_public_directory():
-    """Create public directory and default index.html if directory didn't exist. Returns True if created."""
+def ensure_public_directory(settings=None):
+    """Create a site's public directory and default index.html if directory didn't exist. Returns True if created."""
     
-    public_dir = config.public_dir()
+    settings = settings or config.current()
+    public_dir = settings.public_dir
     
     # Create the public directory and index.html if they don't exist
     if not os.path.exists(public_dir):
         create_public_directory(public_dir)        
-        create_default_index(public_dir)
+        create_default_index(public_dir, settings.default_file)
         return True
     
     return False
@@ -26,10 +27,10 @@ def create_public_directory(public_dir):
     os.makedirs(public_dir, exist_ok=True)
 
 
-def create_default_index(public_dir):
+def create_default_index(public_dir, default_filename=None):
     """Create the default file."""
     
-    default_filename = config.default_file()
+    default_filename = default_filename or config.default_file()
     index_path = os.path.join(public_dir, default_filename)
     html_content = """<!DOCTYPE html>
 <html lang="en">
@@ -2,6 +2,7 @@
 HTTP handling package for RServer.
 """
 
-from .http import http_handler
-from .request_parser import parse_http_request
-from .response_builder import build_response
\ No newline at end of file
+from .http import http_handler, http_busy_handler, http_rate_limited_handler, new_http_session, file_cache, public_index, site_router
+from .request_parser import parse_http_request, HttpRequest, RequestAssembler, RequestError
+from .response_builder import build_response
+from .optimize import optimize_sites, format_report
\ No newline at end of file
@@ -0,0 +1,204 @@
+"""
+Finding the assets an HTML page or stylesheet references, and bundling a page
+with its assets into one multipart response.
+"""
+
+import re
+import hashlib
+import posixpath
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+# Attributes that load an asset (as opposed to <a href>, which links to another page)
+ASSET_ATTRIBUTES = {
+    "img": ("src", "srcset"),
+    "script": ("src",),
+    "source": ("src", "srcset"),
+    "video": ("src", "poster"),
+    "audio": ("src",),
+    "track": ("src",),
+    "iframe": ("src",),
+    "embed": ("src",),
+    "object": ("data",),
+    "input": ("src",),
+}
+
+# <link rel=...> values that load something the page needs
+ASSET_LINK_RELS = {"stylesheet", "icon", "shortcut", "apple-touch-icon", "preload", "modulepreload", "manifest"}
+
+CSS_URL = re.compile(rb"""url\(\s*['"]?([^'")\s]+)['"]?\s*\)|@import\s+['"]([^'"]+)['"]""")
+
+# Types whose references are followed
+ASSET_SOURCE_TYPES = ("text/html", "text/css")
+
+# Preload destination ("as") for each kind of asset; others get no hint
+PRELOAD_DESTINATIONS = {
+    "text/css": "style",
+    "text/javascript": "script",
+    "application/javascript": "script",
+}
+PRELOAD_PREFIXES = {"image/": "image", "font/": "font"}
+
+BUNDLE_TYPE = "multipart/mixed"
+
+
+class AssetParser(HTMLParser):
+    """Collects the asset URLs referenced by an HTML document."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.urls = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+
+        if tag == "link":
+            rels = set((attrs.get("rel") or "").lower().split())
+            if rels & ASSET_LINK_RELS and attrs.get("href"):
+                self.urls.append(attrs["href"])
+            return
+
+        for name in ASSET_ATTRIBUTES.get(tag, ()):
+            value = attrs.get(name)
+            if not value:
+                continue
+            if name == "srcset":
+                # "a.png 1x, b.png 2x": the URL is the first word of each candidate
+                self.urls.extend(candidate.split()[0] for candidate in value.split(",") if candidate.strip())
+            else:
+                self.urls.append(value)
+
+        # Inline style attributes can reference images too
+        style = attrs.get("style")
+        if style:
+            self.urls.extend(css_urls(style.encode('utf-8')))
+
+
+def css_urls(css):
+    """Get the url(...) and @import references in a stylesheet."""
+    return [(match.group(1) or match.group(2)).decode('utf-8', 'replace') for match in CSS_URL.finditer(css)]
+
+
+def media_type(content_type):
+    return content_type.split(";")[0].strip().lower()
+
+
+def asset_paths(body, content_type, base_path):
+    """Get the server-local paths of the assets an HTML page or stylesheet references.
+
+    Absolute URLs to other hosts, data: URIs and fragments are skipped.
+    """
+    kind = media_type(content_type)
+
+    if kind == "text/html":
+        parser = AssetParser()
+        parser.feed(bytes(body).decode('utf-8', 'replace'))
+        urls = parser.urls
+    elif kind == "text/css":
+        urls = css_urls(bytes(body))
+    else:
+        return []
+
+    paths = []
+    for url in urls:
+        path = local_path(url, base_path)
+        if path is not None and path not in paths:
+            paths.append(path)
+    return paths
+
+
+def local_path(url, base_path):
+    """Resolve a reference against the page's path; None if it points elsewhere."""
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+
+    path = urljoin(base_path, parts.path)
+    normalized = posixpath.normpath(path)
+    if path.endswith("/") and normalized != "/":
+        normalized += "/"
+    return normalized if normalized.startswith("/") else None
+
+
+def preload_destination(content_type):
+    """Get the Link preload "as" value for an asset type, or None if it can't be preloaded."""
+    kind = media_type(content_type)
+    if kind in PRELOAD_DESTINATIONS:
+        return PRELOAD_DESTINATIONS[kind]
+    for prefix, destination in PRELOAD_PREFIXES.items():
+        if kind.startswith(prefix):
+            return destination
+    return None
+
+
+def preload_header(assets):
+    """Build a Link header preloading (url_path, content_type) assets, or None if there are none."""
+    links = []
+    for url_path, content_type in assets:
+        destination = preload_destination(content_type)
+        if destination is None:
+            continue
+        link = f"<{url_path}>; rel=preload; as={destination}"
+        if destination == "font":
+            # Fonts are always fetched in CORS mode, so the preload must be too
+            link += "; crossorigin"
+        links.append(link)
+    return ", ".join(links) or None
+
+
+def render_bundle(parts):
+    """Render (url_path, content_type, etag, content) parts as one multipart/mixed body.
+
+    Each part carries its Content-Location, so clients can store it as if it had
+    been requested on its own.
+
+    Returns:
+        tuple: (body, content type with boundary)
+    """
+    # Derived from the parts' ETags, so an unchanged bundle renders identically
+    boundary = "rserver-" + hashlib.sha256("".join(part[2] for part in parts).encode('utf-8')).hexdigest()[:32]
+
+    chunks = []
+    for url_path, content_type, etag, content in parts:
+        chunks.append(
+            f"--{boundary}\r\n"
+            f"Content-Location: {url_path}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(content)}\r\n"
+            f"ETag: {etag}\r\n\r\n".encode('utf-8')
+        )
+        chunks.append(bytes(content))
+        chunks.append(b"\r\n")
+    chunks.append(f"--{boundary}--\r\n".encode('utf-8'))
+
+    return b"".join(chunks), f"{BUNDLE_TYPE}; boundary={boundary}"
+
+
+def split_bundle(body, content_type):
+    """Split a multipart/mixed bundle into (headers with lowercase names, content) parts."""
+    boundary = None
+    for parameter in content_type.split(";")[1:]:
+        name, _, value = parameter.strip().partition("=")
+        if name.lower() == "boundary":
+            boundary = value.strip('"')
+    if boundary is None:
+        raise ValueError("Bundle has no boundary")
+
+    parts = []
+    delimiter = f"--{boundary}\r\n".encode('utf-8')
+    position = 0
+
+    while body.startswith(delimiter, position):
+        head_end = body.index(b"\r\n\r\n", position)
+        headers = {}
+        for line in body[position + len(delimiter):head_end].decode('utf-8', 'replace').split("\r\n"):
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        # Content-Length says where the part ends, so the content is never scanned for the boundary
+        start = head_end + 4
+        end = start + int(headers["content-length"])
+        parts.append((headers, body[start:end]))
+        position = end + 2
+
+    return parts
@@ -0,0 +1,131 @@
+"""
+In-memory content cache for files served by RServer.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class CachedFile:
+    """A file's content plus everything needed to serve it without touching disk."""
+
+    __slots__ = (
+        "path", "mtime", "size", "content", "content_type", "headers",
+        "etag", "common_headers", "compressible", "variants", "optimized",
+    )
+
+    def __init__(self, path, mtime, size, content, content_type, headers,
+                 etag=None, common_headers=None, compressible=False, variants=None, optimized=False):
+        self.path = path
+        self.mtime = mtime
+        # Size of the file on disk, which with mtime identifies its version (content may be an optimized copy)
+        self.size = size
+        self.content = content
+        self.content_type = content_type
+        self.headers = headers
+        self.etag = etag
+        # Headers shared by every representation (Last-Modified, Cache-Control, Vary)
+        self.common_headers = common_headers if common_headers is not None else {}
+        self.compressible = compressible
+        # Content-Encoding -> (headers, content, etag), or None when compression didn't help
+        self.variants = variants if variants is not None else {}
+        # True when content is a minified copy rather than the file's own bytes
+        self.optimized = optimized
+
+    @property
+    def cost(self):
+        """Bytes this entry holds in memory, including compressed variants."""
+        return len(self.content) + sum(len(variant[1]) for variant in self.variants.values() if variant is not None)
+
+    def matches(self, mtime_ns, size):
+        """Check if this entry is still fresh for the file's current mtime and size."""
+        return self.mtime == mtime_ns and self.size == size
+
+
+class FileCache:
+    """Byte-budgeted LRU cache of CachedFile entries keyed by (site, resolved path)."""
+
+    def __init__(self, max_bytes, max_file_bytes):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, path, mtime_ns, size):
+        """Return the fresh cached entry for path, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(path)
+
+            if entry is not None and entry.matches(mtime_ns, size):
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+
+            # Drop stale entries so they stop counting against the budget
+            if entry is not None:
+                self._remove(path)
+
+            self.misses += 1
+            return None
+
+    def store(self, entry):
+        """Add an entry, evicting least recently used entries to stay within budget."""
+        if entry.size > self.max_file_bytes or entry.cost > self.max_bytes:
+            return
+
+        with self._lock:
+            if entry.path in self._entries:
+                self._remove(entry.path)
+
+            self._evict_for(entry.cost)
+
+            self._entries[entry.path] = entry
+            self.total_bytes += entry.cost
+
+    def store_variant(self, entry, encoding, variant):
+        """Attach a compressed variant to an entry, charging it against the budget."""
+        with self._lock:
+            cached = self._entries.get(entry.path) is entry
+            if cached:
+                self._remove(entry.path)
+
+            entry.variants[encoding] = variant
+
+            if cached and entry.cost <= self.max_bytes:
+                self._evict_for(entry.cost)
+                self._entries[entry.path] = entry
+                self.total_bytes += entry.cost
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Return hit/miss counters and current usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _evict_for(self, cost):
+        while self._entries and self.total_bytes + cost > self.max_bytes:
+            oldest_path = next(iter(self._entries))
+            self._remove(oldest_path)
+            self.evictions += 1
+
+    def _remove(self, path):
+        entry = self._entries.pop(path)
+        self.total_bytes -= entry.cost
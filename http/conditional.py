@@ -0,0 +1,124 @@
+"""
+Validators and conditional request handling for RServer (ETag, Last-Modified, Cache-Control).
+"""
+
+import hashlib
+import fnmatch
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+# ETags of files hashed from disk, keyed by path and valid for one (mtime, size)
+_etag_memo = OrderedDict()
+_etag_memo_lock = threading.Lock()
+ETAG_MEMO_SIZE = 1024
+
+# Read size used when hashing files that are not held in memory
+HASH_CHUNK_SIZE = 256 * 1024
+
+
+def compute_etag(content):
+    """Compute a strong ETag from file content."""
+    return '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+
+
+def file_etag(file_path, mtime_ns, size):
+    """Get the ETag of a file on disk without holding it in memory.
+
+    The hash is computed once per file version and remembered until mtime or size change.
+    """
+    with _etag_memo_lock:
+        memo = _etag_memo.get(file_path)
+        if memo is not None and memo[0] == mtime_ns and memo[1] == size:
+            _etag_memo.move_to_end(file_path)
+            return memo[2]
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    etag = '"' + digest.hexdigest()[:32] + '"'
+
+    with _etag_memo_lock:
+        _etag_memo[file_path] = (mtime_ns, size, etag)
+        _etag_memo.move_to_end(file_path)
+        if len(_etag_memo) > ETAG_MEMO_SIZE:
+            _etag_memo.popitem(last=False)
+
+    return etag
+
+
+def variant_etag(etag, encoding):
+    """Derive the ETag of a Content-Encoding variant (each representation needs its own)."""
+    return etag[:-1] + '-' + encoding + '"'
+
+
+def http_date(timestamp):
+    """Format a POSIX timestamp as an HTTP date."""
+    return formatdate(timestamp, usegmt=True)
+
+
+def parse_http_date(value):
+    """Parse an HTTP date into a POSIX timestamp, or None if it is malformed."""
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def is_not_modified(request_headers, etags, mtime):
+    """Check If-None-Match / If-Modified-Since against the current validators.
+
+    Args:
+        request_headers: Parsed request headers (lowercase keys)
+        etags: ETags that identify the current content (any representation)
+        mtime: File modification time as a POSIX timestamp
+
+    Returns:
+        bool: True if the client's copy is current and a 304 can be sent
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence; it uses weak comparison
+        if if_none_match.strip() == '*':
+            return True
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(',')}
+        return not candidates.isdisjoint(etags)
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since is not None:
+        since = parse_http_date(if_modified_since)
+        # HTTP dates only have one second resolution
+        return since is not None and int(mtime) <= since
+
+    return False
+
+
+def if_range_matches(if_range, etag, mtime):
+    """Check an If-Range validator; a Range is only honored when it still matches.
+
+    If-Range requires strong comparison, so weak ETags never match.
+    """
+    if_range = if_range.strip()
+
+    if if_range.startswith('"'):
+        return if_range == etag
+    if if_range.startswith('W/'):
+        return False
+
+    since = parse_http_date(if_range)
+    return since is not None and int(mtime) == int(since)
+
+
+def cache_control_for(path, rules, default_max_age):
+    """Get the Cache-Control value for a public path from the first matching glob rule."""
+    max_age = default_max_age
+
+    for rule in rules:
+        if fnmatch.fnmatch(path, rule.get("pattern", "")):
+            max_age = rule.get("max_age", default_max_age)
+            break
+
+    if max_age is None:
+        return None
+    return f"max-age={max_age}"
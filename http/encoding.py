@@ -0,0 +1,118 @@
+"""
+HTTP Content-Encoding negotiation and compression for RServer.
+"""
+
+import gzip
+import fnmatch
+
+# Optional encoders, used only when their libraries are installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Server preference order, best compression ratio first
+ENCODING_PREFERENCE = ["br", "zstd", "gzip"]
+
+# File suffixes of precompressed siblings in the public directory
+PRECOMPRESSED_SUFFIXES = {
+    "br": ".br",
+    "zstd": ".zst",
+    "gzip": ".gz",
+}
+
+
+def available_encodings():
+    """Get the encodings this process can compress and decompress, in preference order."""
+    available = {"gzip"}
+    if brotli is not None:
+        available.add("br")
+    if zstandard is not None:
+        available.add("zstd")
+    return [encoding for encoding in ENCODING_PREFERENCE if encoding in available]
+
+
+def accept_encoding_header():
+    """Build an Accept-Encoding header value for the encodings available locally."""
+    return ", ".join(available_encodings())
+
+
+def parse_accept_encoding(header_value):
+    """Parse an Accept-Encoding header into a dict of encoding -> quality."""
+    qualities = {}
+
+    for item in header_value.split(','):
+        parts = item.strip().split(';')
+        encoding = parts[0].strip().lower()
+        if not encoding:
+            continue
+
+        quality = 1.0
+        for param in parts[1:]:
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        qualities[encoding] = quality
+
+    return qualities
+
+
+def negotiate_encoding(header_value, offered):
+    """Pick the best offered encoding the client accepts, or None for identity."""
+    if not header_value or not offered:
+        return None
+
+    qualities = parse_accept_encoding(header_value)
+    wildcard = qualities.get('*', 0.0)
+
+    best_encoding = None
+    best_quality = 0.0
+    for encoding in ENCODING_PREFERENCE:
+        if encoding not in offered:
+            continue
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+
+    return best_encoding
+
+
+def is_compressible(content_type, mime_patterns):
+    """Check if a MIME type matches the compression allowlist."""
+    return any(fnmatch.fnmatch(content_type, pattern) for pattern in mime_patterns)
+
+
+def compress(data, encoding, level=6):
+    """Compress data with the given encoding."""
+    if encoding == "gzip":
+        # Fixed mtime keeps the output (and anything derived from it) deterministic
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(data, quality=min(level, 11))
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def decompress(data, encoding):
+    """Decompress data encoded with the given Content-Encoding."""
+    encoding = encoding.strip().lower()
+    if encoding in ("", "identity"):
+        return data
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "br" and brotli is not None:
+        return brotli.decompress(data)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
@@ -0,0 +1,278 @@
+"""
+In-memory index of the public directory for RServer.
+Maps URL paths to files so serving a request needs no filesystem lookups.
+"""
+
+import os
+import threading
+from urllib.parse import unquote
+
+from log import event_logger
+from .manifest import build_manifest
+
+
+class IndexedFile:
+    """A servable file found under the public directory."""
+
+    __slots__ = ("url_path", "real_path", "size", "mtime_ns", "content_type", "digest", "assets", "bundle")
+
+    def __init__(self, url_path, real_path, size, mtime_ns, content_type):
+        self.url_path = url_path
+        self.real_path = real_path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.content_type = content_type
+        # SHA-256 of the content, computed when the manifest first needs it
+        self.digest = None
+        # URL paths this page or stylesheet references, found when first served
+        self.assets = None
+        # (members and settings it was built with, generated response) of this page's bundle
+        self.bundle = None
+
+    @property
+    def mtime(self):
+        """Modification time as a POSIX timestamp."""
+        return self.mtime_ns / 1e9
+
+
+class IndexedDirectory:
+    """A directory under the public directory, with its files and subdirectories sorted by name.
+
+    A new object replaces it whenever anything it lists changes, so rendered
+    listings can be cached on it for exactly as long as they are current.
+    """
+
+    __slots__ = ("url_path", "mtime_ns", "files", "subdirectories", "listings")
+
+    def __init__(self, url_path, mtime_ns, files, subdirectories):
+        self.url_path = url_path
+        self.mtime_ns = mtime_ns
+        self.files = files
+        # (name, mtime_ns) pairs
+        self.subdirectories = subdirectories
+        self.listings = {}
+
+    @property
+    def mtime(self):
+        """Modification time as a POSIX timestamp."""
+        return self.mtime_ns / 1e9
+
+    def entry_count(self):
+        return len(self.subdirectories) + len(self.files)
+
+    def same_contents(self, other):
+        """Check if other lists exactly the same entries (unchanged files are shared objects)."""
+        return (
+            self.mtime_ns == other.mtime_ns
+            and self.subdirectories == other.subdirectories
+            and len(self.files) == len(other.files)
+            and all(a is b for a, b in zip(self.files, other.files))
+        )
+
+
+class PublicIndex:
+    """Index of every file under a public directory, refreshed by a periodic mtime scan.
+
+    Only files inside the public directory ever enter the index, so a URL that
+    escapes it (via "..", encoded separators or symlinks) simply isn't found.
+    """
+
+    def __init__(self, public_dir, default_file, detect_mime_type):
+        self.public_dir = public_dir
+        self.default_file = default_file
+        self.detect_mime_type = detect_mime_type
+        self.root = os.path.realpath(public_dir)
+        self.scans = 0
+        self._files = {}
+        self._routes = {}
+        self._directories = {}
+        self._manifest = None
+        self._manifest_lock = threading.Lock()
+        self._scanner = None
+        self._stop = threading.Event()
+
+    def lookup(self, url_path):
+        """Get the IndexedFile a URL path resolves to (including default files), or None."""
+        return self._routes.get(normalize_url_path(url_path))
+
+    def lookup_file(self, url_path):
+        """Get the IndexedFile at exactly this URL path, without default file resolution."""
+        return self._files.get(url_path)
+
+    def lookup_directory(self, url_path):
+        """Get the IndexedDirectory at a URL path (with or without trailing slash), or None."""
+        path = normalize_url_path(url_path)
+        return self._directories.get(path if path.endswith('/') else path + '/')
+
+    def manifest(self):
+        """Get the SiteManifest of the current files, rebuilding it if any file changed."""
+        manifest = self._manifest
+        if manifest is not None and manifest.files is self._files:
+            return manifest
+
+        with self._manifest_lock:
+            files = self._files
+            if self._manifest is None or self._manifest.files is not files:
+                self._manifest = build_manifest(files)
+            return self._manifest
+
+    def clear_responses(self):
+        """Drop the listing pages, bundles and manifest responses rendered with earlier settings."""
+        for directory in list(self._directories.values()):
+            directory.listings.clear()
+        for indexed in list(self._files.values()):
+            indexed.bundle = None
+        manifest = self._manifest
+        if manifest is not None:
+            manifest.responses.clear()
+
+    def file_count(self):
+        """Get the number of indexed files."""
+        return len(self._files)
+
+    def refresh(self):
+        """Rescan the public directory, reusing entries for files that haven't changed.
+
+        Returns:
+            bool: True if anything was added, removed or modified
+        """
+        old_files = self._files
+        files = {}
+        scanned = {}
+
+        for directory_mtime, url_dir, entries in self._walk():
+            directory_files = []
+            subdirectories = []
+
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.name)
+                    continue
+                indexed = self._index_entry(entry, url_dir, old_files)
+                if indexed is not None:
+                    files[indexed.url_path] = indexed
+                    directory_files.append(indexed)
+
+            scanned[url_dir] = (directory_mtime, directory_files, subdirectories)
+
+        directories = self._build_directories(scanned)
+
+        changed = files.keys() != old_files.keys() or any(
+            files[url_path] is not old_files[url_path] for url_path in files
+        )
+
+        if changed or not self._routes:
+            routes = dict(files)
+            for url_dir in directories:
+                default = files.get(url_dir.rstrip('/') + '/' + self.default_file)
+                if default is not None:
+                    routes[url_dir] = default
+                    routes[url_dir.rstrip('/') or '/'] = default
+
+            # Swap in complete dicts so lookups never see a half-built index
+            self._files, self._routes = files, routes
+
+        self._directories = directories
+        self.scans += 1
+        return changed
+
+    def start(self, interval):
+        """Build the index and keep it current with a background scan every interval seconds."""
+        self.refresh()
+
+        if interval and self._scanner is None:
+            self._scanner = threading.Thread(target=self._scan_loop, args=(interval,), name="rserver-index", daemon=True)
+            self._scanner.start()
+
+    def stop(self):
+        """Stop the background scan."""
+        self._stop.set()
+
+    def _scan_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                if self.refresh():
+                    event_logger.info(f"✓ Public index updated ({self.file_count()} files)")
+                    # Once the manifest has been asked for, hash changed files here rather than in a request
+                    if self._manifest is not None:
+                        self.manifest()
+            except Exception as e:
+                event_logger.error(f"✗ Index scan error: {e}")
+
+    def _build_directories(self, scanned):
+        """Build IndexedDirectory objects, keeping the old object (and its cached listings) if unchanged."""
+        old_directories = self._directories
+        directories = {}
+
+        for url_dir, (directory_mtime, directory_files, subdirectory_names) in scanned.items():
+            subdirectories = []
+            for name in sorted(subdirectory_names):
+                child = scanned.get(url_dir + name + '/')
+                if child is not None:
+                    subdirectories.append((name, child[0]))
+
+            directory_files.sort(key=lambda indexed: indexed.url_path)
+            directory = IndexedDirectory(url_dir, directory_mtime, directory_files, subdirectories)
+
+            old = old_directories.get(url_dir)
+            directories[url_dir] = old if old is not None and old.same_contents(directory) else directory
+
+        return directories
+
+    def _walk(self):
+        """Yield (mtime_ns, URL directory, entries) for every directory inside the public root."""
+        pending = [(self.root, '/')]
+
+        while pending:
+            directory_path, url_dir = pending.pop()
+
+            try:
+                directory_mtime = os.stat(directory_path).st_mtime_ns
+                entries = list(os.scandir(directory_path))
+            except OSError:
+                continue
+
+            yield directory_mtime, url_dir, entries
+
+            for entry in entries:
+                # Symlinked directories are not followed, so the walk can't leave the root
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append((entry.path, url_dir + entry.name + '/'))
+
+    def _index_entry(self, entry, url_dir, old_files):
+        """Build (or reuse) the IndexedFile for a directory entry, or None if it isn't servable."""
+        try:
+            if not entry.is_file():
+                return None
+            stat = entry.stat()
+        except OSError:
+            return None
+
+        url_path = url_dir + entry.name
+        old = old_files.get(url_path)
+        if old is not None and old.mtime_ns == stat.st_mtime_ns and old.size == stat.st_size:
+            return old
+
+        real_path = entry.path
+        if entry.is_symlink():
+            # Only serve symlinks whose target is still inside the public root
+            real_path = os.path.realpath(entry.path)
+            if os.path.commonpath([self.root, real_path]) != self.root:
+                return None
+
+        return IndexedFile(url_path, real_path, stat.st_size, stat.st_mtime_ns, self.detect_mime_type(real_path))
+
+
+def normalize_url_path(url_path):
+    """Normalize a request path: drop query and fragment, percent-decode and collapse slashes."""
+    path = url_path.split('?', 1)[0].split('#', 1)[0]
+    path = unquote(path)
+
+    if not path.startswith('/'):
+        path = '/' + path
+
+    while '//' in path:
+        path = path.replace('//', '/')
+
+    return path
+
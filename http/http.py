@@ -3,86 +3,897 @@ RServer HTTP-like request handling.
 """
 
 import os
+import json
+import time
+import hashlib
+import threading
 import mimetypes
+from urllib.parse import parse_qs, urlsplit
 import config
-from .request_parser import parse_http_request
-from .response_builder import build_response
+import metrics
+from log import event_logger, log_access
+from .request_parser import parse_http_request, parse_range_header, resolve_byte_range, find_request_id, is_valid_request_id, RequestAssembler, RequestFramer, RequestError
+from .response_builder import HttpResponse, build_response, build_file_response, build_headers, static_response, status_text
+from .router import Router
+from .cache import CachedFile, FileCache
+from .file_index import PublicIndex
+from .listing import page_count, render_html, render_json
+from .manifest import MANIFEST_PATH, BLOB_PREFIX, is_valid_digest
+from .assets import asset_paths, media_type, preload_header, render_bundle, ASSET_SOURCE_TYPES
+from .optimize import optimized_kind, load_optimized
+from .encoding import available_encodings, negotiate_encoding, is_compressible, compress, PRECOMPRESSED_SUFFIXES, ENCODING_PREFERENCE
+from .conditional import compute_etag, file_etag, variant_etag, http_date, is_not_modified, if_range_matches, cache_control_for
 
+# Path of the optional metrics endpoint
+STATS_PATH = "/.well-known/rserver-stats"
 
-def http_handler(data):
-    """Handle incoming data from Link layer."""
+# Blobs are addressed by content hash, so a cached copy never goes stale
+BLOB_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
-    try:
-        # Decode the request
-        request_data = data.decode('utf-8')
-        print(f"✓ Received:")
-        print(request_data)
-        
-        # Parse and handle the HTTP request
-        response = handle_request(request_data)
-        
-        # Return response (already bytes)
-        return response
-        
-    except Exception as e:
-        print(f"✗ Error: {e}")
-        return response_500_internal_error(str(e))
+# Shared content cache and each site's public index and routes, created on first use so config is loaded lazily
+_file_cache = None
+# Site identity path -> (settings the routes were compiled or last checked with, Router)
+_routers = {}
+# Site identity path -> (settings the index was built or last updated with, PublicIndex)
+_public_indexes = {}
+_shared_lock = threading.Lock()
+
+# Settings whose change means rebuilding the index, replacing or clearing the cache
+INDEX_SETTINGS = ("public_dir", "default_file", "index_scan_interval")
+CACHE_SIZE_SETTINGS = ("cache_max_bytes", "cache_max_file_bytes")
+ROUTE_SETTINGS = ("routes", "stats_endpoint", "manifest_enabled", "compression_enabled", "compression_level", "compression_min_size")
+CACHED_RESPONSE_SETTINGS = (
+    "compression_enabled", "compression_level", "compression_min_size", "compression_max_size",
+    "compression_mime_types", "cache_control_rules", "cache_control_default_max_age", "preload_hints",
+    "optimize_enabled", "optimize_cache_dir",
+)
+
+
+class HttpSession:
+    """Per-link HTTP state: the incremental request parser, the link id used in logs,
+    the site the Link arrived on and the Request-Ids currently being handled (so
+    they can be cancelled)."""
+
+    __slots__ = ("link_id", "assembler", "framer", "site", "in_flight", "cancelled", "lock")
+
+    def __init__(self, link_id, assembler, site=None):
+        self.link_id = link_id
+        self.assembler = assembler
+        # Lets the dispatcher rate-limit and queue whole requests rather than packets
+        self.framer = RequestFramer(assembler.max_header_bytes)
+        # Identity path of the site, None for the first (or only) one
+        self.site = site
+        self.in_flight = set()
+        self.cancelled = set()
+        self.lock = threading.Lock()
+
+    def begin(self, request_id):
+        """Track a new request; False if the id is already in flight."""
+        with self.lock:
+            if request_id in self.in_flight:
+                return False
+            self.in_flight.add(request_id)
+            return True
+
+    def cancel(self, request_id):
+        """Mark an in-flight request as cancelled so its response is never sent."""
+        with self.lock:
+            if request_id in self.in_flight:
+                self.cancelled.add(request_id)
+
+    def is_cancelled(self, request_id):
+        with self.lock:
+            return request_id in self.cancelled
 
+    def finish(self, request_id):
+        """Stop tracking a request; returns True if it was cancelled meanwhile."""
+        with self.lock:
+            self.in_flight.discard(request_id)
+            if request_id in self.cancelled:
+                self.cancelled.discard(request_id)
+                return True
+            return False
 
-def handle_request(request_data):
-    """Parse HTTP-like request and generate response."""
 
+def http_handler(data, session=None):
+    """Handle incoming data from Link layer.
+    
+    Without a session, data is one complete request. With a per-link
+    HttpSession, data may be part of a request or several pipelined
+    requests.
+    
+    Requests carrying a Request-Id header are independent of each other: they
+    are returned as callables that build the response (tagged with the same
+    Request-Id) and may run concurrently and complete in any order. A CANCEL
+    request with a Request-Id drops that request's response.
+    
+    Returns:
+        list: HttpResponse objects in request order (empty while a request is
+            incomplete), and callables for requests with a Request-Id
+    """
+
+    link_id = session.link_id if session is not None else None
+    site = session.site if session is not None else None
+    start = time.perf_counter()
+    
+    # Parse the request(s) straight from the received bytes
     try:
-        method, path, version, headers, body = parse_http_request(request_data)
+        if session is None:
+            requests = [parse_http_request(data)]
+        else:
+            requests = session.assembler.feed(data)
+    except RequestError as e:
+        metrics.increment("requests_rejected")
+        return [tag_request_id(response_error(e.status_code, e.status_text, str(e)), find_request_id(data))]
     except ValueError as e:
-        return response_400_bad_request(str(e))
+        metrics.increment("requests_malformed")
+        return [tag_request_id(response_400_bad_request(str(e)), find_request_id(data))]
+    finally:
+        metrics.observe("parse", time.perf_counter() - start)
     
-    print(f"✓ {method} {path}")
+    responses = []
+    for request in requests:
+        request_id = request.headers.get("request-id")
+        
+        if request_id is None or session is None:
+            responses.append(respond(request, link_id, site))
+        elif not is_valid_request_id(request_id):
+            responses.append(response_400_bad_request("Invalid Request-Id"))
+        elif request.method == "CANCEL":
+            metrics.increment("requests_cancelled")
+            session.cancel(request_id)
+        elif not session.begin(request_id):
+            responses.append(tag_request_id(response_400_bad_request("Duplicate Request-Id"), request_id))
+        else:
+            responses.append(deferred_response(request, request_id, session))
     
-    # For now, just return a simple response
-    if method == "GET":
-        return handle_get_request(path, headers)
-    else:
-        return response_405_method_not_allowed("Method Not Supported")
+    return responses
+
+
+def respond(request, link_id, site=None):
+    """Handle one parsed request for a site, recording its metrics and access log line."""
+    start = time.perf_counter()
+
+    try:
+        response = handle_request(request, site)
+    except Exception as e:
+        event_logger.error(f"✗ Error: {e}")
+        response = response_500_internal_error(str(e))
+
+    duration = time.perf_counter() - start
+    metrics.observe("handle", duration)
+    metrics.increment(f"status_{response.status_code}")
+    log_access(request.method, request.path, response.status_code, len(response), link_id, duration)
+    return response
+
 
+def deferred_response(request, request_id, session):
+    """Wrap a request with a Request-Id as work the dispatcher can run on its own."""
 
-def handle_get_request(path, headers):
-    """Handle GET requests by serving files from public directory."""
-    # Resolve path to actual file
-    file_path = resolve_file_path(path)
+    def work():
+        if session.is_cancelled(request_id):
+            session.finish(request_id)
+            return None
+
+        try:
+            response = respond(request, session.link_id, session.site)
+        finally:
+            cancelled = session.finish(request_id)
+
+        return None if cancelled else tag_request_id(response, request_id)
+
+    return work
+
+
+def tag_request_id(response, request_id):
+    """Echo the request's Request-Id in its response so the client can match them up."""
+    if request_id is None:
+        return response
+    return response.with_header("Request-Id", request_id)
+
+
+def new_http_session(link_id=None, site=None):
+    """Create the HTTP state for a new Link to a site."""
+    return HttpSession(link_id, RequestAssembler(config.max_header_bytes(), config.max_body_bytes()), site)
+
+
+def http_busy_handler(data):
+    """Build the response for a request that was shed because the server is overloaded."""
+    return tag_request_id(response_503_service_unavailable(config.worker_retry_after()), find_request_id(data))
+
+
+def http_rate_limited_handler(data):
+    """Build the response for a Link that is sending requests faster than its rate limit."""
+    return tag_request_id(response_429_too_many_requests(), find_request_id(data))
+
+
+def handle_request(request, site=None):
+    """Generate the response for a parsed HTTP request to a site, using its compiled routes."""
+
+    metrics.increment("requests")
+    
+    # One consistent view of the site's config for the whole request, even if it is reloaded meanwhile
+    settings = config.site(site)
+    if settings is None:
+        # Removed from the config; its destination goes away on restart
+        return response_404_not_found("No such site")
     
     # Security check - block paths with .. 
-    if not is_safe_path(path):
+    if not is_safe_path(request.path):
         return response_403_forbidden("Access denied")
     
-    # Check if file exists
-    if not os.path.exists(file_path):
+    handler, params = site_router(settings).resolve(request.method, request.path)
+    if handler is None:
+        # params lists the methods the path does have routes for
+        if not params:
+            return response_404_not_found("Not found")
+        return response_405_method_not_allowed("Method Not Supported", params)
+    return handler(request, params, settings)
+
+
+def site_router(settings):
+    """Get a site's compiled routes, compiling them on first use or when their settings changed."""
+    entry = _routers.get(settings.identity_path)
+    if entry is not None and entry[0] is settings:
+        return entry[1]
+    
+    if entry is None or config.changed_settings(entry[0], settings, ROUTE_SETTINGS):
+        router = build_router(settings)
+    else:
+        router = entry[1]
+    _routers[settings.identity_path] = (settings, router)
+    return router
+
+
+def build_router(settings):
+    """Compile a site's routes: built-in endpoints, then configured routes (which replace
+    built-in ones at the same path), with static files for every GET nothing else matches."""
+    router = Router()
+    router.add(["GET"], "/*", route_static)
+    
+    if settings.stats_endpoint:
+        router.add(["GET"], STATS_PATH, lambda request, params, settings: response_stats())
+    if settings.manifest_enabled:
+        router.add(["GET"], MANIFEST_PATH, lambda request, params, settings: handle_manifest(request.headers, settings))
+        router.add(["GET"], BLOB_PREFIX + "{digest}", route_blob)
+    
+    # Bodies are built (and compressed) once, when the routes are compiled
+    compiled_at = time.time()
+    for route in settings.routes:
+        if "handler" in route:
+            handler = route_callable(route["handler"])
+        else:
+            generated = build_generated(route["body"].encode('utf-8'), route["content_type"], compiled_at, "Accept-Encoding", settings)
+            handler = route_generated(generated)
+        router.add(route["methods"], route["path"], handler)
+    
+    return router
+
+
+def route_static(request, params, settings):
+    return handle_get_request(request.path, request.headers, settings)
+
+
+def route_blob(request, params, settings):
+    return handle_blob(params["digest"], request.headers, settings)
+
+
+def route_generated(generated):
+    """Make a route handler answering with a response built in memory by build_generated."""
+    return lambda request, params, settings: serve_generated(generated, request.headers)
+
+
+def route_callable(function):
+    """Make a route handler calling function(request, params) and converting what it returns.
+    
+    A function may return an HttpResponse; a (status, content type, body) or
+    (status, content type, body, headers) tuple; a dict or list (sent as JSON);
+    a str (plain text) or bytes; or None for 204 No Content.
+    """
+    def handler(request, params, settings):
+        metrics.increment("requests_routed")
+        return to_response(function(request, params))
+    return handler
+
+
+def to_response(result):
+    """Convert what a route function returned into an HttpResponse."""
+    if isinstance(result, HttpResponse):
+        return result
+    if result is None:
+        return HttpResponse(204, build_headers(204, "No Content", None, None))
+    if isinstance(result, tuple):
+        status_code, content_type, body, *headers = result
+        body = body.encode('utf-8') if isinstance(body, str) else body
+        return build_response(status_code, status_text(status_code), body, content_type, headers[0] if headers else None)
+    if isinstance(result, (dict, list)):
+        return build_response(200, "OK", json.dumps(result).encode('utf-8'), "application/json")
+    if isinstance(result, str):
+        return build_response(200, "OK", result.encode('utf-8'), "text/plain; charset=utf-8")
+    return build_response(200, "OK", result, "application/octet-stream")
+
+
+def handle_get_request(path, headers, settings):
+    """Handle GET requests by serving files from the site's public directory."""
+    # Resolve path to an indexed file; anything not in the index is never served
+    with metrics.timed("resolve"):
+        indexed = public_index(settings).lookup(path)
+    if indexed is None:
+        # Folders without a default file get a listing instead
+        if settings.directory_listings:
+            directory = public_index(settings).lookup_directory(path)
+            if directory is not None:
+                return handle_directory_listing(directory, path, headers, settings)
         return response_404_not_found("File not found")
     
-    # Read and serve the file
+    # Load the file, from the content cache when it is still fresh
     try:
-        content_type = detect_mime_type(file_path)
+        # A page and its assets in one response, for clients that ask for it
+        if settings.bundles_enabled and wants_bundle(path, headers) and is_bundleable(indexed, settings):
+            return handle_bundle(indexed, headers, settings)
         
-        # Read all files as binary
-        with open(file_path, 'rb') as f:
-            content = f.read()
+        # Partial content for resumed downloads; None means send the whole file
+        if "range" in headers:
+            response = handle_range_request(indexed, headers, settings)
+            if response is not None:
+                return response
         
-        return response_200_ok(content, content_type)
+        # Files too large to cache are sent straight from disk
+        if indexed.size > settings.cache_max_file_bytes:
+            return handle_large_file(indexed, headers, settings)
+        
+        entry = load_file(indexed, settings)
+    except (FileNotFoundError, NotADirectoryError):
+        return response_404_not_found("File not found")
     except Exception as e:
         return response_500_internal_error(f"Error reading file: {e}")
+    
+    # Serve a compressed variant if the client accepts one
+    response_headers, content, etag = entry.headers, entry.content, entry.etag
+    with metrics.timed("build"):
+        variant = select_variant(entry, headers.get("accept-encoding", ""), settings)
+    if variant is not None:
+        response_headers, content, etag = variant
+    
+    # Revalidation of a copy the client already has costs a body-less 304
+    if is_not_modified(headers, representation_etags(entry.etag), entry.mtime / 1e9):
+        return response_304_not_modified({"ETag": etag, **entry.common_headers})
+    
+    # Prebuilt headers and the cached body go out as separate buffers
+    return HttpResponse(200, response_headers, content)
+
+
+def handle_directory_listing(directory, path, headers, settings):
+    """Serve one page of a directory listing as HTML, or JSON with ?format=json.
+    
+    Each page is rendered (and compressed) once and kept on the directory's index
+    entry, which is replaced when the directory's contents change.
+    """
+    query = parse_qs(urlsplit(path).query)
+    wants_json = query.get("format") == ["json"] or "application/json" in headers.get("accept", "")
+    
+    page_text = query.get("page", ["1"])[0]
+    if not page_text.isdigit():
+        return response_400_bad_request("Invalid page")
+    page = int(page_text)
+    if not 1 <= page <= page_count(directory, settings.listing_page_size):
+        return response_404_not_found("No such page")
+    
+    key = ("json" if wants_json else "html", page, settings.listing_page_size)
+    listing = directory.listings.get(key)
+    if listing is None:
+        metrics.increment("listings_rendered")
+        with metrics.timed("build"):
+            listing = directory.listings[key] = build_listing(directory, page, wants_json, settings)
+    
+    return serve_generated(listing, headers)
+
 
+def build_listing(directory, page, wants_json, settings):
+    """Render a listing page with its headers and compressed variants."""
+    if wants_json:
+        content, content_type = render_json(directory, page, settings.listing_page_size), "application/json"
+    else:
+        content, content_type = render_html(directory, page, settings.listing_page_size), "text/html; charset=utf-8"
+    
+    newest = max([directory.mtime_ns, *(mtime_ns for _, mtime_ns in directory.subdirectories),
+                  *(indexed.mtime_ns for indexed in directory.files)]) / 1e9
+    return build_generated(content, content_type, newest, "Accept, Accept-Encoding", settings)
 
-def resolve_file_path(url_path):
-    """Resolve URL path to filesystem path."""
 
-    # Find path relative to public directory
-    file_path = os.path.join(config.public_dir(), url_path.lstrip('/'))
+def handle_manifest(headers, settings):
+    """Serve the site manifest, rebuilt (hashing only changed files) when the index changes."""
+    manifest = public_index(settings).manifest()
     
-    # If path is a directory append default file
-    if os.path.exists(file_path) and os.path.isdir(file_path):
-        file_path = os.path.join(file_path, config.default_file())
+    generated = manifest.responses.get("json")
+    if generated is None:
+        with metrics.timed("build"):
+            generated = manifest.responses["json"] = build_generated(
+                manifest.content, "application/json", manifest.newest, "Accept-Encoding", settings
+            )
     
-    return file_path
+    return serve_generated(generated, headers)
+
+
+def handle_blob(digest, headers, settings):
+    """Serve a file by the SHA-256 of its content, as an immutable response.
+    
+    Identical files are one blob. A file changed on disk since it was hashed is
+    not served under its old hash, even before the next index scan notices.
+    """
+    if not is_valid_digest(digest):
+        return response_404_not_found("Blob not found")
+    
+    indexed = public_index(settings).manifest().lookup_blob(digest)
+    if indexed is None:
+        return response_404_not_found("Blob not found")
+    
+    try:
+        stat = os.stat(indexed.real_path)
+    except OSError:
+        return response_404_not_found("Blob not found")
+    if stat.st_mtime_ns != indexed.mtime_ns or stat.st_size != indexed.size:
+        return response_404_not_found("Blob not found")
+    
+    etag = f'"{digest}"'
+    blob_headers = {"Cache-Control": BLOB_CACHE_CONTROL}
+    
+    if is_not_modified(headers, representation_etags(etag), indexed.mtime):
+        return response_304_not_modified({"ETag": etag, **blob_headers})
+    
+    # Small blobs come from the content cache, compressed like the file itself would be. The
+    # cache may hold an optimized copy, though, and a blob is always the bytes its digest is of
+    entry = load_file(indexed, settings) if indexed.size <= settings.cache_max_file_bytes else None
+    if entry is None or entry.optimized:
+        return build_file_response(200, "OK", indexed.real_path, 0, indexed.size, indexed.content_type,
+                                   {"ETag": etag, **blob_headers})
+    
+    variant = select_variant(entry, headers.get("accept-encoding", ""), settings)
+    if entry.compressible or entry.variants:
+        blob_headers["Vary"] = "Accept-Encoding"
+    
+    if variant is None:
+        return build_response(200, "OK", entry.content, entry.content_type, {"ETag": etag, **blob_headers})
+    
+    # select_variant gives the cached variant itself; find which encoding it is
+    _, content, _ = variant
+    encoding = next(encoding for encoding, other in entry.variants.items() if other is variant)
+    return build_response(200, "OK", content, entry.content_type, {
+        "Content-Encoding": encoding,
+        "ETag": variant_etag(etag, encoding),
+        **blob_headers,
+    })
+
+
+def wants_bundle(path, headers):
+    """Check if the client asked for a page bundle, with ?bundle=1 or "Prefer: bundle"."""
+    if "bundle" in headers.get("prefer", "").lower():
+        return True
+    return "bundle=" in path and parse_qs(urlsplit(path).query).get("bundle") == ["1"]
+
+
+def is_bundleable(indexed, settings):
+    return media_type(indexed.content_type) == "text/html" and indexed.size <= settings.cache_max_file_bytes
+
+
+def handle_bundle(indexed, headers, settings):
+    """Serve an HTML page followed by the assets it needs as one multipart/mixed response.
+    
+    Stylesheets' own references are included too, as long as everything fits in
+    bundle_max_bytes. The rendered (and compressed) bundle is kept on the page's
+    index entry until the page, an asset or a relevant setting changes.
+    """
+    members = bundle_members(indexed, settings)
+    key = (members, settings.bundle_max_bytes, settings.compression_enabled, settings.compression_level)
+    
+    if indexed.bundle is not None and indexed.bundle[0] == key:
+        metrics.increment("bundles_cached")
+        generated = indexed.bundle[1]
+    else:
+        metrics.increment("bundles_rendered")
+        with metrics.timed("build"):
+            parts = []
+            for member in members:
+                entry = load_file(member, settings)
+                parts.append((member.url_path, member.content_type, entry.etag, entry.content))
+            content, content_type = render_bundle(parts)
+            newest = max(member.mtime_ns for member in members) / 1e9
+            generated = build_generated(content, content_type, newest, "Accept-Encoding, Prefer", settings)
+        indexed.bundle = (key, generated)
+    
+    return serve_generated(generated, headers)
+
+
+def bundle_members(page, settings):
+    """Get the page and the indexed assets it (or its stylesheets) reference, in order, within the size cap."""
+    members = [page]
+    seen = {page.url_path}
+    total = page.size
+    pending = page_assets(page, settings)
+    
+    while pending:
+        asset = pending.pop(0)
+        if asset.url_path in seen:
+            continue
+        seen.add(asset.url_path)
+        
+        if asset.size > settings.cache_max_file_bytes or total + asset.size > settings.bundle_max_bytes:
+            continue
+        members.append(asset)
+        total += asset.size
+        
+        if media_type(asset.content_type) == "text/css":
+            pending.extend(page_assets(asset, settings))
+    
+    return tuple(members)
+
+
+def page_assets(indexed, settings, content=None):
+    """Get the same-site assets an HTML page or stylesheet references.
+    
+    The references are found once per file version and kept on its index entry;
+    they are resolved against the current index on every call.
+    
+    Returns:
+        list: IndexedFile for each referenced file that exists
+    """
+    if indexed.assets is None:
+        paths = []
+        if media_type(indexed.content_type) in ASSET_SOURCE_TYPES:
+            if content is None:
+                with open(indexed.real_path, 'rb') as f:
+                    content = f.read()
+            paths = asset_paths(content, indexed.content_type, indexed.url_path)
+        indexed.assets = paths
+    
+    index = public_index(settings)
+    assets = []
+    for path in indexed.assets:
+        asset = index.lookup(path)
+        if asset is not None and asset is not indexed:
+            assets.append(asset)
+    return assets
+
+
+def build_generated(content, content_type, newest, vary, settings):
+    """Build the headers and compressed variants of a generated response, once.
+    
+    Returns:
+        tuple: ({encoding or None: (headers, content)}, etag, newest mtime, vary)
+    """
+    etag = compute_etag(content)
+    common_headers = {"Last-Modified": http_date(newest), "Vary": vary, "Cache-Control": "no-cache"}
+    
+    variants = {None: (build_headers(200, "OK", len(content), content_type, {"ETag": etag, **common_headers}), content)}
+    
+    if settings.compression_enabled and len(content) >= settings.compression_min_size:
+        for encoding in available_encodings():
+            compressed = compress(content, encoding, settings.compression_level)
+            if len(compressed) < len(content):
+                encoded_etag = variant_etag(etag, encoding)
+                variants[encoding] = (build_headers(200, "OK", len(compressed), content_type, {
+                    "Content-Encoding": encoding,
+                    "ETag": encoded_etag,
+                    **common_headers,
+                }), compressed)
+    
+    return variants, etag, newest, vary
+
+
+def serve_generated(generated, headers):
+    """Serve a response made by build_generated, as a 304 if the client's copy is current."""
+    variants, etag, newest, vary = generated
+    encoding = negotiate_encoding(headers.get("accept-encoding", ""), set(variants) - {None})
+    response_etag = variant_etag(etag, encoding) if encoding else etag
+    
+    if is_not_modified(headers, {etag, response_etag}, newest):
+        return response_304_not_modified({"ETag": response_etag, "Vary": vary})
+    
+    response_headers, content = variants[encoding]
+    return HttpResponse(200, response_headers, content)
+
+
+def handle_large_file(indexed, headers, settings):
+    """Serve a file that is too large for the cache with a body read from disk when sent.
+    
+    Such files are never compressed on the fly, but precompressed siblings are used.
+    """
+    etag = file_etag(indexed.real_path, indexed.mtime_ns, indexed.size)
+    common_headers = file_headers(indexed, settings)
+    
+    siblings = precompressed_siblings(indexed, settings)
+    if siblings:
+        common_headers["Vary"] = "Accept-Encoding"
+    
+    encoding = negotiate_encoding(headers.get("accept-encoding", ""), set(siblings))
+    response_etag = variant_etag(etag, encoding) if encoding else etag
+    
+    if is_not_modified(headers, representation_etags(etag), indexed.mtime):
+        return response_304_not_modified({"ETag": response_etag, **common_headers})
+    
+    body_file = siblings[encoding] if encoding else indexed
+    response_headers = {"ETag": response_etag, **common_headers}
+    if encoding:
+        response_headers["Content-Encoding"] = encoding
+    
+    return build_file_response(200, "OK", body_file.real_path, 0, body_file.size, indexed.content_type, response_headers)
+
+
+def handle_range_request(indexed, headers, settings):
+    """Serve a single byte range of a file: sliced from its cache entry, or for a file too
+    large to cache, read as just that span from disk.
+    
+    Returns:
+        HttpResponse: 206, 304 or 416 response, or None if the Range should be ignored
+    """
+    try:
+        byte_range = parse_range_header(headers["range"])
+    except ValueError:
+        return None
+    
+    # Cacheable files are always served as what load_file gives (possibly an optimized copy), with
+    # its validators, so ranges and ETags don't depend on whether the file happened to be cached
+    entry = load_file(indexed, settings) if indexed.size <= settings.cache_max_file_bytes else None
+    if entry is not None:
+        etag, common_headers, size = entry.etag, entry.common_headers, len(entry.content)
+    else:
+        etag, common_headers, size = file_etag(indexed.real_path, indexed.mtime_ns, indexed.size), file_headers(indexed, settings), indexed.size
+    
+    # A stale If-Range means the client's partial copy is outdated: send it all again
+    if "if-range" in headers and not if_range_matches(headers["if-range"], etag, indexed.mtime):
+        return None
+    
+    if is_not_modified(headers, {etag}, indexed.mtime):
+        return response_304_not_modified({"ETag": etag, **common_headers})
+    
+    span = resolve_byte_range(byte_range, size)
+    if span is None:
+        return response_416_range_not_satisfiable(size)
+    
+    first, last = span
+    range_headers = {
+        "Content-Range": f"bytes {first}-{last}/{size}",
+        "ETag": etag,
+        **common_headers,
+    }
+    
+    # Slice the cached copy without copying it, or read just the span when sent
+    if entry is not None:
+        return response_206_partial_content(memoryview(entry.content)[first:last + 1], indexed.content_type, range_headers)
+    return build_file_response(206, "Partial Content", indexed.real_path, first, last - first + 1, indexed.content_type, range_headers)
+
+
+def load_file(indexed, settings):
+    """Load an indexed file with its 200 OK headers, using the content cache."""
+
+    cache = file_cache()
+    
+    entry = cache.lookup(cache_key(indexed, settings), indexed.mtime_ns, indexed.size)
+    if entry is not None:
+        return entry
+    
+    # Read all files as binary
+    with metrics.timed("read"), open(indexed.real_path, 'rb') as f:
+        source = f.read()
+    
+    content_type = indexed.content_type
+    content, siblings, optimized = source, None, None
+    
+    # The minified, precompressed copy built for exactly this content replaces it, if there is one
+    if settings.optimize_enabled and optimized_kind(content_type) is not None:
+        optimized = load_optimized(settings.optimize_cache_dir, hashlib.sha256(source).hexdigest(), content_type)
+        if optimized is not None:
+            metrics.increment("files_optimized")
+            content, siblings = optimized
+    
+    compressible = (
+        settings.compression_enabled
+        and settings.compression_min_size <= len(content) <= settings.compression_max_size
+        and is_compressible(content_type, settings.compression_mime_types)
+    )
+    
+    # Validators and caching headers, computed once per file version
+    etag = compute_etag(content)
+    common_headers = file_headers(indexed, settings)
+    
+    # Let the client start fetching the page's assets before it has parsed the page
+    if settings.preload_hints and media_type(content_type) == "text/html":
+        links = preload_header(
+            (asset.url_path, asset.content_type) for asset in page_assets(indexed, settings, source)
+        )
+        if links is not None:
+            common_headers["Link"] = links
+    
+    if siblings is None:
+        siblings = load_precompressed_siblings(indexed, settings)
+    if compressible or siblings:
+        common_headers["Vary"] = "Accept-Encoding"
+    
+    variants = {
+        encoding: build_variant(sibling_content, content_type, encoding, etag, common_headers)
+        for encoding, sibling_content in siblings.items()
+    }
+    
+    headers = build_headers(200, "OK", len(content), content_type, {"ETag": etag, **common_headers})
+    
+    entry = CachedFile(cache_key(indexed, settings), indexed.mtime_ns, len(source), content, content_type, headers,
+                       etag, common_headers, compressible, variants, optimized is not None)
+    cache.store(entry)
+    return entry
+
+
+def cache_key(indexed, settings):
+    """Key a file's cache entry by site too: its headers depend on the site's URL path and settings."""
+    return settings.identity_path, indexed.real_path
+
+
+def load_precompressed_siblings(indexed, settings):
+    """Load the content of a file's precompressed siblings.
+    
+    Returns:
+        dict: Content-Encoding -> sibling content
+    """
+
+    siblings = {}
+    
+    for encoding, sibling in precompressed_siblings(indexed, settings).items():
+        with open(sibling.real_path, 'rb') as f:
+            siblings[encoding] = f.read()
+    
+    return siblings
+
+
+def precompressed_siblings(indexed, settings):
+    """Find .br/.zst/.gz siblings of a file that are at least as new as the file itself.
+    
+    Returns:
+        dict: Content-Encoding -> IndexedFile
+    """
+
+    siblings = {}
+    index = public_index(settings)
+    
+    for encoding in available_encodings():
+        sibling = index.lookup_file(indexed.url_path + PRECOMPRESSED_SUFFIXES[encoding])
+        
+        # Ignore siblings left over from an older version of the file
+        if sibling is None or sibling.mtime_ns < indexed.mtime_ns:
+            continue
+        
+        siblings[encoding] = sibling
+    
+    return siblings
+
+
+def select_variant(entry, accept_encoding, settings):
+    """Pick (and if needed create) the compressed variant to serve, or None for identity."""
+
+    offered = set(entry.variants)
+    if entry.compressible:
+        offered.update(available_encodings())
+    
+    encoding = negotiate_encoding(accept_encoding, offered)
+    if encoding is None:
+        return None
+    
+    # Compress each file at most once per encoding; None records that it didn't help
+    if encoding not in entry.variants:
+        content = compress(entry.content, encoding, settings.compression_level)
+        variant = None
+        if len(content) < len(entry.content):
+            variant = build_variant(content, entry.content_type, encoding, entry.etag, entry.common_headers)
+        file_cache().store_variant(entry, encoding, variant)
+    
+    return entry.variants[encoding]
+
+
+def build_variant(content, content_type, encoding, etag, common_headers):
+    """Build the (headers, content, etag) triple for a compressed variant."""
+    encoded_etag = variant_etag(etag, encoding)
+    headers = build_headers(200, "OK", len(content), content_type, {
+        "Content-Encoding": encoding,
+        "ETag": encoded_etag,
+        **common_headers,
+    })
+    return headers, content, encoded_etag
+
+
+def representation_etags(etag):
+    """Get every ETag that identifies the current content of a file."""
+    return {etag, *(variant_etag(etag, encoding) for encoding in ENCODING_PREFERENCE)}
+
+
+def file_headers(indexed, settings):
+    """Build the headers shared by every response for a file (Last-Modified, Cache-Control, Accept-Ranges)."""
+    
+    headers = {"Last-Modified": http_date(indexed.mtime), "Accept-Ranges": "bytes"}
+    
+    cache_control = cache_control_for(indexed.url_path, settings.cache_control_rules, settings.cache_control_default_max_age)
+    if cache_control is not None:
+        headers["Cache-Control"] = cache_control
+    
+    return headers
+
+
+def public_index(settings=None):
+    """Get a site's public directory index (the first site's by default), building it on first use."""
+    settings = settings or config.site()
+    entry = _public_indexes.get(settings.identity_path)
+    
+    if entry is None:
+        with _shared_lock:
+            entry = _public_indexes.get(settings.identity_path)
+            if entry is None:
+                # Only publish the index once its first scan is done, as workers may be waiting on it
+                entry = _public_indexes[settings.identity_path] = (settings, build_public_index(settings))
+    
+    return entry[1]
+
+
+def build_public_index(settings):
+    """Scan a site's public directory into a new index and keep it current."""
+    index = PublicIndex(settings.public_dir, settings.default_file, detect_mime_type)
+    index.start(settings.index_scan_interval)
+    metrics.register_gauge("index", index_stats)
+    return index
+
+
+def index_stats():
+    indexes = [index for _, index in list(_public_indexes.values())]
+    return {"sites": len(indexes), "files": sum(index.file_count() for index in indexes),
+            "scans": sum(index.scans for index in indexes)}
+
+
+def file_cache():
+    """Get the shared file content cache."""
+    global _file_cache
+    
+    if _file_cache is None:
+        with _shared_lock:
+            if _file_cache is None:
+                settings = config.current()
+                cache = FileCache(settings.cache_max_bytes, settings.cache_max_file_bytes)
+                metrics.register_gauge("cache", cache.stats)
+                _file_cache = cache
+    
+    return _file_cache
+
+
+def apply_config_change(old, new):
+    """Rebuild a site's index or clear the cached responses, but only when settings they depend on changed."""
+    global _file_cache
+    clear_cache = False
+    
+    for site in config.sites():
+        entry = _public_indexes.get(site.identity_path)
+        if entry is None:
+            continue
+        
+        indexed_with, index = entry
+        responses_changed = config.changed_settings(indexed_with, site, CACHED_RESPONSE_SETTINGS)
+        if responses_changed:
+            clear_cache = True
+        
+        if config.changed_settings(indexed_with, site, INDEX_SETTINGS):
+            # Requests keep using the old index until the new one has been scanned
+            replacement = build_public_index(site)
+            with _shared_lock:
+                _public_indexes[site.identity_path] = (site, replacement)
+            index.stop()
+            event_logger.info(f"✓ Re-indexed {site.public_dir}")
+        else:
+            # Listings, bundles and the manifest are generated responses cached on the index itself
+            if responses_changed:
+                index.clear_responses()
+            with _shared_lock:
+                _public_indexes[site.identity_path] = (site, index)
+    
+    if config.changed_settings(old, new, CACHE_SIZE_SETTINGS):
+        with _shared_lock:
+            _file_cache = None
+    elif _file_cache is not None and clear_cache:
+        # Cached entries hold prebuilt headers and compressed variants made with the old settings
+        _file_cache.clear()
 
 
 def is_safe_path(path):
@@ -109,6 +920,22 @@ def response_200_ok(content, content_type, headers=None):
     return build_response(200, "OK", content, content_type, headers)
 
 
+def response_206_partial_content(content, content_type, headers):
+    """Return a 206 Partial Content response."""
+    return build_response(206, "Partial Content", content, content_type, headers)
+
+
+def response_304_not_modified(headers):
+    """Return a body-less 304 Not Modified response."""
+    return HttpResponse(304, build_headers(304, "Not Modified", None, None, headers))
+
+
+def response_stats():
+    """Return the current metrics snapshot as JSON."""
+    content = json.dumps(metrics.snapshot()).encode('utf-8')
+    return build_response(200, "OK", content, "application/json", {"Cache-Control": "no-store"})
+
+
 def response_400_bad_request(message):
     """Return a 400 Bad Request response."""
     return build_response(400, "Bad Request", message.encode('utf-8'), "text/plain")
@@ -116,17 +943,32 @@ def response_400_bad_request(message):
 
 def response_403_forbidden(message):
     """Return a 403 Forbidden response."""
-    return build_response(403, "Forbidden", message.encode('utf-8'), "text/plain")
+    return static_response(403, "Forbidden", message)
 
 
 def response_404_not_found(message):
     """Return a 404 Not Found response."""
-    return build_response(404, "Not Found", message.encode('utf-8'), "text/plain")
+    return static_response(404, "Not Found", message)
+
+
+def response_405_method_not_allowed(message, allowed=()):
+    """Return a 405 Method Not Allowed response, listing the methods that are allowed."""
+    return build_response(405, "Method Not Allowed", message.encode('utf-8'), "text/plain", {"Allow": ", ".join(allowed)})
 
 
-def response_405_method_not_allowed(message):
-    """Return a 405 Method Not Allowed response."""
-    return build_response(405, "Method Not Allowed", message.encode('utf-8'), "text/plain")
+def response_416_range_not_satisfiable(size):
+    """Return a 416 Range Not Satisfiable response."""
+    return build_response(416, "Range Not Satisfiable", b"", "text/plain", {"Content-Range": f"bytes */{size}"})
+
+
+def response_429_too_many_requests():
+    """Return a 429 Too Many Requests response."""
+    return static_response(429, "Too Many Requests", "Too many requests", 1)
+
+
+def response_error(status_code, status_text, message):
+    """Return a plain text error response with any status."""
+    return static_response(status_code, status_text, message)
 
 
 def response_500_internal_error(message):
@@ -134,3 +976,9 @@ def response_500_internal_error(message):
     return build_response(500, "Internal Server Error", message.encode('utf-8'), "text/plain")
 
 
+def response_503_service_unavailable(retry_after):
+    """Return a 503 Service Unavailable response."""
+    return static_response(503, "Service Unavailable", "Server busy", retry_after)
+
+
+config.on_change(apply_config_change)
@@ -0,0 +1,106 @@
+"""
+Directory listings for folders without a default file.
+Rendered as compact HTML for browsers or JSON for tools, one page at a time.
+"""
+
+import json
+import math
+import time
+from html import escape
+from urllib.parse import quote
+
+# Column names of each JSON entry (entries are arrays to keep listings small)
+JSON_FIELDS = ["name", "size", "mtime", "type"]
+
+
+def page_count(directory, page_size):
+    """Get the number of pages a directory's listing has (at least 1)."""
+    return max(1, math.ceil(directory.entry_count() / page_size))
+
+
+def page_entries(directory, page, page_size):
+    """Get the (name, size, mtime, type) rows on one page: subdirectories first, then files.
+
+    Directories have a trailing slash on their name, no size and type "directory".
+    """
+    start = (page - 1) * page_size
+    end = start + page_size
+    rows = []
+
+    subdirectory_count = len(directory.subdirectories)
+    for name, mtime_ns in directory.subdirectories[start:end]:
+        rows.append((name + '/', None, mtime_ns // 1_000_000_000, "directory"))
+
+    file_start = max(0, start - subdirectory_count)
+    file_end = max(0, end - subdirectory_count)
+    for indexed in directory.files[file_start:file_end]:
+        name = indexed.url_path.rsplit('/', 1)[1]
+        rows.append((name, indexed.size, indexed.mtime_ns // 1_000_000_000, indexed.content_type))
+
+    return rows
+
+
+def render_json(directory, page, page_size):
+    """Render one page of a listing as compact JSON."""
+    listing = {
+        "path": directory.url_path,
+        "page": page,
+        "pages": page_count(directory, page_size),
+        "total": directory.entry_count(),
+        "fields": JSON_FIELDS,
+        "entries": page_entries(directory, page, page_size),
+    }
+    return json.dumps(listing, separators=(",", ":")).encode('utf-8')
+
+
+def render_html(directory, page, page_size):
+    """Render one page of a listing as a small HTML table."""
+    url_dir = directory.url_path
+    pages = page_count(directory, page_size)
+    title = escape(url_dir)
+
+    lines = [
+        "<!DOCTYPE html>",
+        f"<html><head><meta charset=\"utf-8\"><title>Index of {title}</title>",
+        "<style>body{font-family:monospace}td{padding:0 1em 0 0}td.n{text-align:right}</style></head>",
+        f"<body><h1>Index of {title}</h1>",
+        "<table><tr><th>Name</th><th>Size</th><th>Modified</th><th>Type</th></tr>",
+    ]
+
+    if url_dir != '/':
+        parent = url_dir.rstrip('/').rsplit('/', 1)[0] + '/'
+        lines.append(f"<tr><td><a href=\"{quote(parent)}\">../</a></td><td></td><td></td><td></td></tr>")
+
+    for name, size, mtime, content_type in page_entries(directory, page, page_size):
+        href = quote(url_dir + name)
+        size_text = "-" if size is None else format_size(size)
+        modified = time.strftime("%Y-%m-%d %H:%M", time.gmtime(mtime))
+        lines.append(
+            f"<tr><td><a href=\"{href}\">{escape(name)}</a></td>"
+            f"<td class=\"n\">{size_text}</td><td>{modified}</td><td>{escape(content_type)}</td></tr>"
+        )
+
+    lines.append("</table>")
+
+    if pages > 1:
+        links = []
+        if page > 1:
+            links.append(f"<a href=\"{quote(url_dir)}?page={page - 1}\">&laquo; prev</a>")
+        links.append(f"page {page} of {pages} ({directory.entry_count()} entries)")
+        if page < pages:
+            links.append(f"<a href=\"{quote(url_dir)}?page={page + 1}\">next &raquo;</a>")
+        lines.append(f"<p>{' | '.join(links)}</p>")
+
+    lines.append("</body></html>")
+    return "\n".join(lines).encode('utf-8')
+
+
+def format_size(size):
+    """Format a byte count compactly (e.g. 512, 1.5K, 20M)."""
+    if size < 1024:
+        return str(size)
+
+    for unit in ("K", "M", "G", "T"):
+        size /= 1024
+        if size < 1024 or unit == "T":
+            return f"{size:.1f}{unit}" if size < 10 else f"{size:.0f}{unit}"
@@ -0,0 +1,87 @@
+"""
+Site manifest for RServer: every servable file with its size, SHA-256 and MIME type.
+Lets mirrors find what changed with one request and fetch files by content hash.
+"""
+
+import json
+import hashlib
+
+# Where the manifest and content-addressed blobs are served
+MANIFEST_PATH = "/.well-known/rserver-manifest"
+BLOB_PREFIX = "/.well-known/blob/"
+
+# Column names of each manifest entry (entries are arrays to keep the manifest small)
+MANIFEST_FIELDS = ["path", "size", "sha256", "type"]
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class SiteManifest:
+    """The manifest of one version of the public index.
+
+    Identical files share one blob, found by the SHA-256 of their content.
+    Rendered responses are cached on it like directory listings, for as long
+    as it is current.
+    """
+
+    __slots__ = ("files", "blobs", "content", "newest", "responses")
+
+    def __init__(self, files, blobs, content, newest):
+        # The index's url_path -> IndexedFile dict this manifest was built from
+        self.files = files
+        # sha256 hex -> IndexedFile with that content
+        self.blobs = blobs
+        self.content = content
+        self.newest = newest
+        self.responses = {}
+
+    def lookup_blob(self, digest):
+        """Get an IndexedFile whose content has this SHA-256, or None."""
+        return self.blobs.get(digest)
+
+
+def build_manifest(files):
+    """Build a SiteManifest from an index's files, hashing only those not hashed before.
+
+    Unchanged files keep their IndexedFile across scans, and with it their digest.
+    Files that vanish before they can be hashed are left out until the next scan.
+    """
+    entries = []
+    blobs = {}
+    newest = 0
+
+    for url_path in sorted(files):
+        indexed = files[url_path]
+        if indexed.digest is None:
+            try:
+                indexed.digest = file_digest(indexed.real_path)
+            except OSError:
+                continue
+
+        entries.append((url_path, indexed.size, indexed.digest, indexed.content_type))
+        blobs.setdefault(indexed.digest, indexed)
+        newest = max(newest, indexed.mtime_ns)
+
+    manifest = {
+        "fields": MANIFEST_FIELDS,
+        "total": len(entries),
+        "bytes": sum(entry[1] for entry in entries),
+        "blob_path": BLOB_PREFIX,
+        "files": entries,
+    }
+    content = json.dumps(manifest, separators=(",", ":")).encode('utf-8')
+    return SiteManifest(files, blobs, content, newest / 1e9)
+
+
+def file_digest(path):
+    """Get the SHA-256 (hex) of a file's content, reading it in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_valid_digest(text):
+    """Check if text is a lowercase hex SHA-256 digest."""
+    return len(text) == 64 and all(c in "0123456789abcdef" for c in text)
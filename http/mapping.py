@@ -0,0 +1,92 @@
+"""
+Shared read-only memory maps of large files for RServer.
+Every response reading the same version of a file uses one mapping, so file
+bodies are sent from the page cache instead of being copied into the Python heap.
+"""
+
+import os
+import mmap
+import threading
+
+# Bytes copied per step when a body is streamed or spooled
+CHUNK_SIZE = 1024 * 1024
+
+_mappings = {}
+_lock = threading.Lock()
+
+
+class SharedMapping:
+    """A read-only mmap of one version of a file, shared by every reader of it."""
+
+    __slots__ = ("key", "path", "size", "map", "readers")
+
+    def __init__(self, key, path, size, file_map):
+        self.key = key
+        self.path = path
+        self.size = size
+        self.map = file_map
+        self.readers = 0
+
+    def view(self, offset, length):
+        """Get a zero-copy view of a span of the file.
+
+        Raises:
+            IOError: If the file has shrunk below the span since it was mapped
+        """
+        # Touching mapped pages past the end of a truncated file would crash the process
+        if os.stat(self.path).st_size < offset + length:
+            raise IOError(f"{self.path} shrank while being sent")
+        return memoryview(self.map)[offset:offset + length]
+
+    def chunks(self, offset, length, chunk_size=CHUNK_SIZE):
+        """Yield zero-copy views of a span of the file, chunk_size bytes at a time."""
+        end = offset + length
+        while offset < end:
+            step = min(chunk_size, end - offset)
+            yield self.view(offset, step)
+            offset += step
+
+
+def acquire(path):
+    """Get the shared mapping of a file's current version, mapping it if no one else has.
+
+    Returns None for an empty file, which can't be mapped. Every mapping that is
+    acquired must be released.
+    """
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            return None
+        key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        with _lock:
+            mapping = _mappings.get(key)
+            if mapping is None:
+                mapping = _mappings[key] = SharedMapping(key, path, stat.st_size,
+                                                         mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            mapping.readers += 1
+            return mapping
+
+
+def release(mapping):
+    """Stop using a mapping; it is unmapped once its last reader is done."""
+    if mapping is None:
+        return
+
+    with _lock:
+        mapping.readers -= 1
+        if mapping.readers > 0:
+            return
+        del _mappings[mapping.key]
+
+    try:
+        mapping.map.close()
+    except BufferError:
+        # A view is still exported; the mapping is freed when the last view is
+        pass
+
+
+def mapped_count():
+    """Get the number of files currently mapped."""
+    with _lock:
+        return len(_mappings)
@@ -0,0 +1,261 @@
+"""
+Conservative, dependency-free minifiers for HTML, CSS, JavaScript and SVG.
+
+Only comments and redundant whitespace are removed; strings, template
+literals, regular expressions and whitespace-sensitive elements are copied
+unchanged, so minified files behave exactly like the originals.
+"""
+
+import re
+
+# Kept as-is inside HTML: their whitespace is significant (or they get their own minifier)
+HTML_RAW_TEXT = re.compile(r"<(script|style|pre|textarea)\b(?:\"[^\"]*\"|'[^']*'|[^'\">])*>.*?</\1\s*>", re.S | re.I)
+
+HTML_TOKEN = re.compile(
+    r"(?P<comment><!--.*?-->)"
+    r"|(?P<cdata><!\[CDATA\[.*?\]\]>)"
+    r"|(?P<tag></?[a-zA-Z!?](?:\"[^\"]*\"|'[^']*'|[^'\">])*>)"
+    r"|(?P<text>[^<]+|<)",
+    re.S
+)
+
+TAG_PART = re.compile(r"\"[^\"]*\"|'[^']*'|[^\"']+")
+# Whitespace before a tag's closing > (but not in "/ >", where it ends an unquoted value)
+TAG_END_SPACE = re.compile(r"(?<=[^/\s])\s+>$")
+
+# <script type=...> values that are JavaScript (anything else, e.g. JSON or templates, is kept as-is)
+SCRIPT_TYPES = {"", "text/javascript", "application/javascript", "module"}
+SCRIPT_TYPE = re.compile(r"""\btype\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.I)
+
+CSS_TOKEN = re.compile(r""""(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|/\*.*?(?:\*/|$)|[^"'/]+|/""", re.S)
+CSS_PUNCTUATION = re.compile(r" ?([{};,>]) ?")
+
+JS_SIMPLE = re.compile(r""""(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|//[^\n]*|/\*.*?(?:\*/|$)|\s+|[^"'`/\s]+|.""", re.S)
+JS_REGEX = re.compile(r"/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[a-z]*")
+JS_WORD_END = re.compile(r"[\w$]+$")
+
+# A / after these keywords starts a regular expression, not a division
+JS_REGEX_KEYWORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void",
+    "throw", "case", "do", "else", "yield", "await",
+}
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def collapse(text):
+    """Replace each run of whitespace with one newline (if it had one) or one space."""
+    return WHITESPACE.sub(lambda match: "\n" if "\n" in match.group() else " ", text)
+
+
+def minify_html(text):
+    """Drop comments and collapse whitespace in an HTML document.
+
+    Inline <script> and <style> contents are minified as JavaScript and CSS;
+    <pre> and <textarea> are copied unchanged.
+    """
+    parts = []
+    position = 0
+
+    for match in HTML_RAW_TEXT.finditer(text):
+        parts.append(minify_markup(text[position:match.start()]))
+        parts.append(minify_raw_text(match.group(0), match.group(1).lower()))
+        position = match.end()
+    parts.append(minify_markup(text[position:]))
+
+    return "".join(parts).strip()
+
+
+def minify_svg(text):
+    """Drop comments and collapse whitespace in an SVG document."""
+    return minify_markup(text).strip()
+
+
+def minify_markup(text):
+    parts = []
+    # Text on both sides of a dropped comment is collapsed as one run
+    pending = []
+
+    for match in HTML_TOKEN.finditer(text):
+        kind, token = match.lastgroup, match.group()
+        if kind == "text":
+            pending.append(token)
+            continue
+        # Conditional comments still mean something to old browsers
+        if kind == "comment" and not token.startswith(("<!--[if", "<!--<![endif]")):
+            continue
+
+        parts.append(collapse("".join(pending)))
+        pending = []
+        parts.append(minify_tag(token) if kind == "tag" else token)
+
+    parts.append(collapse("".join(pending)))
+    return "".join(parts)
+
+
+def minify_tag(tag):
+    """Collapse the whitespace between a tag's attributes, leaving quoted values alone."""
+    parts = [part if part[0] in "\"'" else collapse(part) for part in TAG_PART.findall(tag)]
+    return TAG_END_SPACE.sub(">", "".join(parts))
+
+
+def minify_raw_text(element, name):
+    """Minify the contents of an inline <script> or <style>; other raw text elements are kept."""
+    open_end = element.index(">") + 1
+    close_start = element.rindex("</")
+    open_tag, content, close_tag = element[:open_end], element[open_end:close_start], element[close_start:]
+
+    if name == "style":
+        content = minify_css(content)
+    elif name == "script":
+        match = SCRIPT_TYPE.search(open_tag)
+        script_type = next((group for group in match.groups() if group is not None), "") if match else ""
+        if script_type.strip().lower() not in SCRIPT_TYPES:
+            return element
+        content = minify_js(content)
+    else:
+        return element
+
+    return minify_tag(open_tag) + content + close_tag
+
+
+def minify_css(text):
+    """Drop comments (but not /*! notices) and redundant whitespace from a stylesheet."""
+    parts = []
+    for token in CSS_TOKEN.findall(text):
+        if token[0] in "\"'":
+            parts.append(token)
+        elif token.startswith("/*"):
+            if token.startswith("/*!"):
+                parts.append(token)
+            else:
+                # A comment still separates what's on either side of it
+                parts.append(" ")
+        else:
+            parts.append(token)
+
+    # Whitespace is only touched outside strings, so join the code and split strings back out
+    output = []
+    for token in CSS_TOKEN.findall("".join(parts)):
+        if token[0] in "\"'" or token.startswith("/*"):
+            output.append(token)
+            continue
+        code = WHITESPACE.sub(" ", token)
+        code = CSS_PUNCTUATION.sub(r"\1", code)
+        code = code.replace(": ", ":").replace("( ", "(").replace(" )", ")").replace(";}", "}")
+        output.append(code)
+
+    return "".join(output).strip()
+
+
+def minify_js(text):
+    """Drop comments (but not /*! notices) and indentation from JavaScript.
+
+    Line breaks are kept, so automatic semicolon insertion works as before, and
+    runs of spaces within a line become one space.
+    """
+    output = []
+    position = 0
+    # Last significant token, to tell a regular expression from a division
+    previous = ""
+
+    while position < len(text):
+        char = text[position]
+
+        if char == "`":
+            end = template_end(text, position)
+            token = text[position:end]
+            output.append(token)
+            previous, position = token, end
+            continue
+
+        if char == "/" and not text.startswith(("//", "/*"), position) and regex_allowed(previous):
+            match = JS_REGEX.match(text, position)
+            if match is not None:
+                output.append(match.group())
+                previous, position = match.group(), match.end()
+                continue
+
+        token = JS_SIMPLE.match(text, position).group()
+        position += len(token)
+
+        if token.startswith("//"):
+            continue
+        if token.startswith("/*"):
+            if token.startswith("/*!"):
+                output.append(token)
+            else:
+                append_space(output, "\n" if "\n" in token else " ")
+            continue
+        if token.isspace():
+            append_space(output, "\n" if "\n" in token else " ")
+            continue
+
+        output.append(token)
+        previous = token
+
+    return "".join(output).strip()
+
+
+def append_space(output, space):
+    """Add whitespace to the output, merging it with whitespace already there."""
+    if output and output[-1] in (" ", "\n"):
+        if space == "\n":
+            output[-1] = "\n"
+    else:
+        output.append(space)
+
+
+def regex_allowed(previous):
+    """Check if a / after the previous token would start a regular expression."""
+    if not previous:
+        return True
+    if previous[0] in "\"'`" or (previous[0] == "/" and len(previous) > 1):
+        return False
+
+    last = previous[-1]
+    if last in ")]":
+        return False
+    word = JS_WORD_END.search(previous)
+    if word is not None:
+        return word.group() in JS_REGEX_KEYWORDS
+    return True
+
+
+def template_end(text, position):
+    """Find the end of the template literal starting at position, including nested ${...} expressions."""
+    index = position + 1
+    while index < len(text):
+        char = text[index]
+        if char == "\\":
+            index += 2
+        elif char == "`":
+            return index + 1
+        elif text.startswith("${", index):
+            index = expression_end(text, index + 2)
+        else:
+            index += 1
+    return len(text)
+
+
+def expression_end(text, position):
+    """Find the end of a template literal's ${...} expression, skipping strings and nested templates."""
+    depth = 1
+    index = position
+    while index < len(text):
+        char = text[index]
+        if char in "\"'":
+            match = JS_SIMPLE.match(text, index)
+            index += len(match.group())
+            continue
+        if char == "`":
+            index = template_end(text, index)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return index + 1
+        index += 1
+    return len(text)
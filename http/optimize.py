@@ -0,0 +1,215 @@
+"""
+Build-time optimization of a site's HTML, CSS, JavaScript and SVG for RServer.
+
+Each file is minified and precompressed with every available encoding into a
+cache directory, under the SHA-256 of its original content. The public
+directory is never modified: a file is served optimized while the cache has an
+entry for its current content, and as written otherwise. Only files whose
+content changed since the last run are rebuilt.
+"""
+
+import os
+import json
+import hashlib
+import mimetypes
+
+from .minify import minify_html, minify_css, minify_js, minify_svg
+from .encoding import available_encodings, compress, PRECOMPRESSED_SUFFIXES
+from .manifest import file_digest, is_valid_digest
+
+# Bumped whenever the minifiers' output changes, so every file is rebuilt
+OPTIMIZER_VERSION = 1
+
+# Written in the cache directory: what each optimized file looked like when it was hashed
+STATE_FILE = "optimize.json"
+
+# Media type -> suffix of its optimized files
+OPTIMIZED_KINDS = {
+    "text/html": "html",
+    "text/css": "css",
+    "text/javascript": "js",
+    "application/javascript": "js",
+    "image/svg+xml": "svg",
+}
+
+MINIFIERS = {"html": minify_html, "css": minify_css, "js": minify_js, "svg": minify_svg}
+
+# Compression levels for precompressed variants: the slowest, as each is made once
+BUILD_LEVELS = {"gzip": 9, "br": 11, "zstd": 19}
+
+
+def optimized_kind(content_type):
+    """Get the optimized file suffix for a content type, or None if it isn't optimized."""
+    return OPTIMIZED_KINDS.get(content_type.split(";")[0].strip().lower())
+
+
+def optimized_path(cache_dir, digest, kind, encoding=None):
+    """Get where the optimized (and optionally compressed) copy of some content is stored."""
+    suffix = PRECOMPRESSED_SUFFIXES[encoding] if encoding else ""
+    return os.path.join(cache_dir, f"{digest}.{kind}{suffix}")
+
+
+def load_optimized(cache_dir, digest, content_type):
+    """Load the optimized copy of a file's content and its precompressed variants.
+
+    Returns:
+        tuple: (content, {Content-Encoding: content}), or None if there is no optimized copy
+    """
+    kind = optimized_kind(content_type)
+    if kind is None:
+        return None
+
+    path = optimized_path(cache_dir, digest, kind)
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None
+
+    variants = {}
+    for encoding in available_encodings():
+        try:
+            with open(optimized_path(cache_dir, digest, kind, encoding), 'rb') as f:
+                variants[encoding] = f.read()
+        except FileNotFoundError:
+            continue
+    return content, variants
+
+
+def source_files(public_dir, cache_dir):
+    """Get (path, minifier kind) for every file under public_dir that can be optimized.
+
+    Only types known by their extension are optimized; precompressed siblings
+    (e.g. app.js.gz) and the cache directory itself are skipped.
+    """
+    cache_root = os.path.realpath(cache_dir)
+    sources = []
+    for directory, subdirectories, names in os.walk(public_dir):
+        subdirectories[:] = [name for name in subdirectories
+                             if os.path.realpath(os.path.join(directory, name)) != cache_root]
+        for name in names:
+            content_type, encoding = mimetypes.guess_type(name)
+            kind = optimized_kind(content_type) if content_type is not None and encoding is None else None
+            if kind is not None:
+                sources.append((os.path.join(directory, name), kind))
+    return sources
+
+
+def load_state(cache_dir):
+    """Load the last run's state, or an empty one if there is none or the optimizer changed."""
+    try:
+        with open(os.path.join(cache_dir, STATE_FILE), encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    if state.get("version") != OPTIMIZER_VERSION:
+        return {"version": OPTIMIZER_VERSION, "files": {}}
+    state.setdefault("files", {})
+    return state
+
+
+def save_state(cache_dir, state):
+    path = os.path.join(cache_dir, STATE_FILE)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(state, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+def optimize_sites(public_dirs, cache_dir, rebuild=False):
+    """Optimize every site's changed files (or all of them) into cache_dir and remove what no file uses any more.
+
+    The cache directory may be shared by several sites, so public_dirs must
+    list all of them: optimized copies of any other site's files are removed.
+
+    Returns:
+        dict: files, built, unchanged, failed, bytes (as written), optimized_bytes, removed
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    state = load_state(cache_dir)
+    known = state["files"]
+    files = {}
+    report = {"files": 0, "built": 0, "unchanged": 0, "failed": 0, "bytes": 0, "optimized_bytes": 0, "removed": 0}
+
+    for public_dir in public_dirs:
+        for path, kind in source_files(public_dir, cache_dir):
+            try:
+                stat = os.stat(path)
+                record = known.get(path)
+                # A file whose size and mtime are unchanged is trusted without rehashing
+                if record is None or record[:2] != [stat.st_size, stat.st_mtime_ns]:
+                    record = [stat.st_size, stat.st_mtime_ns, file_digest(path)]
+                digest = record[2]
+
+                output = optimized_path(cache_dir, digest, kind)
+                if os.path.exists(output) and not rebuild:
+                    report["unchanged"] += 1
+                else:
+                    build_optimized(path, kind, digest, cache_dir)
+                    report["built"] += 1
+            except (OSError, UnicodeDecodeError):
+                report["failed"] += 1
+                continue
+
+            files[path] = record
+            report["files"] += 1
+            report["bytes"] += stat.st_size
+            report["optimized_bytes"] += os.path.getsize(output)
+
+    state["files"] = files
+    save_state(cache_dir, state)
+    report["removed"] = remove_unused(cache_dir, {record[2] for record in files.values()})
+    return report
+
+
+def build_optimized(path, kind, digest, cache_dir):
+    """Minify one file and write it with its precompressed variants.
+
+    Raises:
+        UnicodeDecodeError: If the file isn't UTF-8 text
+    """
+    with open(path, 'rb') as f:
+        original = f.read()
+    # A file changed since it was hashed is left for the next run
+    if hashlib.sha256(original).hexdigest() != digest:
+        raise OSError(f"{path} changed while being optimized")
+
+    content = MINIFIERS[kind](original.decode('utf-8')).encode('utf-8')
+    if len(content) >= len(original):
+        content = original
+
+    # The uncompressed copy is written last: once it exists, the entry is complete
+    for encoding in available_encodings():
+        compressed = compress(content, encoding, BUILD_LEVELS[encoding])
+        if len(compressed) < len(content):
+            write_atomic(optimized_path(cache_dir, digest, kind, encoding), compressed)
+    write_atomic(optimized_path(cache_dir, digest, kind), content)
+
+
+def write_atomic(path, content):
+    with open(path + ".tmp", 'wb') as f:
+        f.write(content)
+    os.replace(path + ".tmp", path)
+
+
+def remove_unused(cache_dir, digests):
+    """Delete optimized files whose content no source file has any more."""
+    removed = 0
+    for name in os.listdir(cache_dir):
+        digest = name.split(".")[0]
+        if not is_valid_digest(digest) or digest in digests:
+            continue
+        try:
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def format_report(report):
+    """Summarize an optimize_sites report in one line."""
+    line = (f"Optimized {report['files']} files: {report['bytes']} -> {report['optimized_bytes']} bytes "
+            f"({report['built']} rebuilt, {report['unchanged']} unchanged")
+    if report["failed"]:
+        line += f", {report['failed']} failed"
+    return line + ")"
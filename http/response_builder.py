@@ -2,37 +2,179 @@
 HTTP response building for RServer.
 """
 
+import os
+import tempfile
+from functools import lru_cache
+
+from . import mapping
+
+
+class HttpResponse:
+    """An HTTP response kept as a header block plus a separate body.
+
+    The body is bytes, a memoryview slice (e.g. of a cached file) or a span of a
+    file on disk, so it is never copied just to put the headers in front of it.
+    """
+
+    __slots__ = ("status_code", "head", "body", "body_file", "body_offset", "body_length")
+
+    def __init__(self, status_code, head, body=b"", body_file=None, body_offset=0, body_length=None):
+        self.status_code = status_code
+        self.head = head
+        self.body = body
+        self.body_file = body_file
+        self.body_offset = body_offset
+        self.body_length = len(body) if body_length is None else body_length
+
+    def __len__(self):
+        return len(self.head) + self.body_length
+
+    def with_header(self, name, value):
+        """Get a copy of this response with one more header; the body is shared, not copied."""
+        # The head ends with the blank line, so insert the header just before it
+        head = b"".join((self.head[:-2], f"{name}: {value}\r\n\r\n".encode('utf-8')))
+        return HttpResponse(self.status_code, head, self.body, self.body_file, self.body_offset, self.body_length)
+
+    def buffers(self, chunk_size=mapping.CHUNK_SIZE):
+        """Yield the response as a sequence of buffers (head, then body), without joining them.
+
+        A file body is yielded as views of the file's shared memory map, so it is
+        never copied into the heap.
+        """
+        yield self.head
+
+        if self.body_file is None:
+            if self.body_length:
+                yield memoryview(self.body)
+            return
+
+        if not self.body_length:
+            return
+
+        shared = mapping.acquire(self.body_file)
+        try:
+            if shared is None:
+                raise IOError(f"{self.body_file} shrank while being sent")
+            yield from shared.chunks(self.body_offset, self.body_length, chunk_size)
+        finally:
+            mapping.release(shared)
+
+    def is_whole_file(self):
+        """Check if the body is an entire file on disk, as it is now."""
+        if self.body_file is None or self.body_offset:
+            return False
+        try:
+            return os.stat(self.body_file).st_size == self.body_length
+        except OSError:
+            return False
+
+    def spool(self):
+        """Write the whole response to an anonymous temporary file, a chunk at a time.
+
+        For transports that need a file but can't send the head and a file span
+        separately. Memory use doesn't grow with the body size.
+
+        Returns:
+            file: Open temporary file positioned at the start
+        """
+        spooled = tempfile.TemporaryFile()
+        try:
+            for buffer in self.buffers():
+                spooled.write(buffer)
+            spooled.seek(0)
+        except Exception:
+            spooled.close()
+            raise
+        return spooled
+
+    def to_bytes(self):
+        """Get the whole response as one bytes-like object, copying the body only once."""
+        if self.body_file is None:
+            return b"".join((self.head, self.body))
+
+        # Read the file straight into its place after the headers
+        buffer = bytearray(len(self))
+        buffer[:len(self.head)] = self.head
+        with open(self.body_file, 'rb') as f:
+            f.seek(self.body_offset)
+            if f.readinto(memoryview(buffer)[len(self.head):]) != self.body_length:
+                raise IOError(f"{self.body_file} shrank while being sent")
+        return buffer
+
+
+# Reason phrases for the status codes route handlers may answer with
+STATUS_TEXTS = {
+    200: "OK", 201: "Created", 202: "Accepted", 204: "No Content",
+    301: "Moved Permanently", 302: "Found", 303: "See Other", 304: "Not Modified",
+    307: "Temporary Redirect", 308: "Permanent Redirect",
+    400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+    405: "Method Not Allowed", 409: "Conflict", 410: "Gone", 413: "Content Too Large",
+    415: "Unsupported Media Type", 422: "Unprocessable Content", 429: "Too Many Requests",
+    500: "Internal Server Error", 501: "Not Implemented", 503: "Service Unavailable",
+}
+
+
+def status_text(status_code):
+    """Get the reason phrase for a status code."""
+    return STATUS_TEXTS.get(status_code, "Unknown")
+
 
 def build_response(status_code, status_text, content, content_type, headers=None):
     """Build a complete HTTP response.
-    
+
     Args:
         status_code: HTTP status code (200, 404, etc.)
         status_text: HTTP status text ("OK", "Not Found", etc.)
-        content: Response body content as bytes
+        content: Response body content as bytes (or a memoryview)
         content_type: MIME type for Content-Type header
         headers: Additional headers as dict
-    
+
     Returns:
-        bytes: Complete HTTP response as bytes
+        HttpResponse: Header block and body
+    """
+    headers_bytes = build_headers(status_code, status_text, len(content), content_type, headers)
+    return HttpResponse(status_code, headers_bytes, content)
+
+
+def build_file_response(status_code, status_text, file_path, offset, length, content_type, headers=None):
+    """Build a response whose body is read from a span of a file only when it is sent."""
+    headers_bytes = build_headers(status_code, status_text, length, content_type, headers)
+    return HttpResponse(status_code, headers_bytes, body_file=file_path, body_offset=offset, body_length=length)
+
+
+@lru_cache(maxsize=128)
+def static_response(status_code, status_text, message, retry_after=None):
+    """Build (once) a plain text response whose content never changes, such as a 404."""
+    headers = {"Retry-After": retry_after} if retry_after is not None else None
+    return build_response(status_code, status_text, message.encode('utf-8'), "text/plain", headers)
+
+
+def build_headers(status_code, status_text, content_length, content_type, headers=None):
+    """Build the status line and header section of an HTTP response.
+
+    Content-Type and Content-Length are omitted when None (e.g. for 304 Not Modified).
+
+    Returns:
+        bytes: Header block including the blank line that separates it from the body
     """
     if headers is None:
         headers = {}
-    
+
     # Start with status line
     response_lines = [f"HTTP/1.1 {status_code} {status_text}"]
-    
+
     # Add Content-Type and Content-Length
-    response_lines.append(f"Content-Type: {content_type}")
-    response_lines.append(f"Content-Length: {len(content)}")
-    
+    if content_type is not None:
+        response_lines.append(f"Content-Type: {content_type}")
+    if content_length is not None:
+        response_lines.append(f"Content-Length: {content_length}")
+
     # Add additional headers
     for key, value in headers.items():
         response_lines.append(f"{key}: {value}")
-    
+
     # Headers section as bytes
     headers_bytes = "\r\n".join(response_lines).encode('utf-8')
     headers_bytes += b"\r\n\r\n"  # Empty line + body separator
-    
-    # Combine headers + body
-    return headers_bytes + content
+
+    return headers_bytes
@@ -0,0 +1,115 @@
+"""
+Request routing for RServer.
+Routes are compiled into a trie over path segments, so finding a request's
+handler costs a dict lookup per segment however many routes there are.
+"""
+
+import re
+from urllib.parse import unquote
+
+# A {name} segment matches any one segment and passes it to the handler as params[name]
+PARAMETER = re.compile(r"^\{(\w+)\}$")
+
+# A final * segment matches the rest of the path (possibly nothing), passed as params["*"]
+WILDCARD = "*"
+
+
+class RouteNode:
+    """One path segment of the route trie."""
+
+    __slots__ = ("children", "parameter", "wildcard", "handlers")
+
+    def __init__(self):
+        # Literal segment -> RouteNode
+        self.children = {}
+        # RouteNode for a {name} segment, and for a final *
+        self.parameter = None
+        self.wildcard = None
+        # Method -> (handler, parameter names in path order)
+        self.handlers = {}
+
+
+class Router:
+    """Maps (method, path) to a handler and the parameters its pattern captured.
+
+    Literal segments win over {name} segments, which win over a *, so a
+    catch-all route like "/*" only gets what no other route matches.
+    """
+
+    def __init__(self):
+        self.root = RouteNode()
+        self.count = 0
+
+    def add(self, methods, pattern, handler):
+        """Route methods on a path pattern to handler, replacing any route already there.
+
+        Raises:
+            ValueError: If * is not the pattern's last segment
+        """
+        node = self.root
+        names = []
+        segments = split_path(pattern)
+
+        for index, segment in enumerate(segments):
+            if segment == WILDCARD:
+                if index != len(segments) - 1:
+                    raise ValueError(f"* must be the last segment of route {pattern}")
+                node.wildcard = node.wildcard or RouteNode()
+                node = node.wildcard
+                names.append(WILDCARD)
+                continue
+
+            match = PARAMETER.match(segment)
+            if match is not None:
+                node.parameter = node.parameter or RouteNode()
+                node = node.parameter
+                names.append(match.group(1))
+            else:
+                node = node.children.setdefault(segment, RouteNode())
+
+        for method in methods:
+            if method not in node.handlers:
+                self.count += 1
+            node.handlers[method] = (handler, tuple(names))
+
+    def resolve(self, method, path):
+        """Find the handler for a request.
+
+        Returns:
+            tuple: (handler, params), or (None, methods allowed on the path) if no
+                route matches this method (no methods if no route matches at all)
+        """
+        allowed = None
+        for node, values in self._matches(self.root, split_path(path), 0, ()):
+            route = node.handlers.get(method)
+            if route is not None:
+                handler, names = route
+                return handler, dict(zip(names, values))
+            if allowed is None:
+                allowed = sorted(node.handlers)
+        return None, allowed or []
+
+    def _matches(self, node, segments, index, values):
+        """Yield (node, captured values) for each route matching segments[index:], most specific first."""
+        if index == len(segments):
+            if node.handlers:
+                yield node, values
+        else:
+            segment = segments[index]
+            child = node.children.get(segment)
+            if child is not None:
+                yield from self._matches(child, segments, index + 1, values)
+            if node.parameter is not None:
+                yield from self._matches(node.parameter, segments, index + 1, values + (segment,))
+
+        if node.wildcard is not None and node.wildcard.handlers:
+            yield node.wildcard, values + ("/".join(segments[index:]),)
+
+
+def split_path(path):
+    """Split a request path (without query or fragment) into percent-decoded segments.
+
+    Leading and trailing slashes don't count: "/" has no segments and "/docs/" is ["docs"].
+    """
+    path = path.split('?', 1)[0].split('#', 1)[0].strip('/')
+    return [unquote(segment) for segment in path.split('/')] if path else []
@@ -0,0 +1,81 @@
+"""
+RServer logging: a buffered access log and a level-controlled event log.
+
+Records are queued on the calling thread and written by a background
+listener, so request handling never waits on console or disk I/O.
+"""
+
+import sys
+import queue
+import atexit
+import logging
+import logging.handlers
+
+import config
+
+access_logger = logging.getLogger("rserver.access")
+event_logger = logging.getLogger("rserver")
+
+# Background writer, started by setup_logging()
+_listener = None
+
+
+def setup_logging():
+    """Configure the event log level and access log target from config."""
+    global _listener
+
+    if _listener is not None:
+        return
+
+    handlers = []
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    console.addFilter(lambda record: record.name != access_logger.name)
+    handlers.append(console)
+
+    target = config.access_log()
+    if target == "-":
+        access_handler = logging.StreamHandler(sys.stdout)
+    elif target:
+        access_handler = logging.FileHandler(target, encoding='utf-8')
+    else:
+        access_handler = None
+
+    if access_handler is not None:
+        access_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        access_handler.addFilter(lambda record: record.name == access_logger.name)
+        handlers.append(access_handler)
+
+    # Every record goes through an unbounded in-memory queue to the listener thread
+    log_queue = queue.SimpleQueue()
+    event_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    event_logger.setLevel(config.log_level().upper())
+    event_logger.propagate = False
+
+    access_logger.setLevel(logging.INFO if access_handler is not None else logging.CRITICAL + 1)
+
+    # The event log level can be changed by reloading the config
+    config.on_change(lambda old, new: event_logger.setLevel(new.log_level.upper()))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the background writer."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def log_access(method, path, status, size, link_id, duration):
+    """Record one handled request in the access log."""
+    if access_logger.isEnabledFor(logging.INFO):
+        access_logger.info(
+            "method=%s path=%s status=%d bytes=%d link=%s duration_ms=%.2f",
+            method, path, status, size, link_id or "-", duration * 1000
+        )
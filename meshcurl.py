@@ -4,131 +4,598 @@ MeshCurl - HTTP client for Reticulum networks, like curl over mesh.
 """
 
 import RNS
+import os
 import sys
+import json
 import time
 import argparse
 
+from client import connect, find_path, establish_link, MeshSession, parse_response_head, output_path
+from client import parse_manifest, plan_sync, write_blob, remove_stale, load_state, save_state, state_entries, blob_path
+from client import load_mix, mix_entry, run_bench, format_report
+from http.manifest import MANIFEST_PATH
+from http.assets import asset_paths, split_bundle
+from http.encoding import accept_encoding_header, decompress
+
+# Written next to an --output file: the validators of the response it came from, for --continue
+VALIDATOR_SUFFIX = ".rserver-resume.json"
+
+# Bytes requested at a time by an --output download; each chunk is on disk before the next is asked for
+DOWNLOAD_CHUNK_BYTES = 256 * 1024
+
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        bench_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(description="MeshCurl - HTTP client for Reticulum networks")
     parser.add_argument("destination", help="Server destination hash")
     parser.add_argument("-X", "--request", default="GET", help="HTTP method (default: GET)")
-    parser.add_argument("path", nargs="?", default="/", help="Path to request (default: /)")
+    parser.add_argument("paths", nargs="*", default=["/"], help="Paths to request over one Link (default: /)")
     parser.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
-    
+    parser.add_argument("-t", "--timeout", type=float, default=60, help="Seconds to wait for each response (default: 60)")
+    parser.add_argument("-o", "--output", help="Write the response body to a file instead of printing it (one path)")
+    parser.add_argument("-d", "--output-dir", help="Write each response body to a file under this directory")
+    parser.add_argument("-C", "--continue", dest="resume", action="store_true", help="Resume a partial --output file with a Range request")
+    parser.add_argument("-P", "--parallel", type=int, default=4, help="Requests in flight at once (default: 4)")
+    parser.add_argument("-m", "--mirror", action="store_true", help="Also fetch the assets the pages reference (writes to --output-dir, default: mirror)")
+    parser.add_argument("-s", "--sync", action="store_true", help="Make --output-dir (default: mirror) match the whole site, fetching only changed files")
+
     args = parser.parse_args()
-    
+
     print("MeshCurl - HTTP over Reticulum")
     print("=" * 30)
-    
+
     destination_hash = args.destination
     method = args.request.upper()
-    path = args.path if args.path.startswith('/') else '/' + args.path
-    
+    paths = [path if path.startswith('/') else '/' + path for path in args.paths]
+
+    if args.resume and (not args.output or method != "GET"):
+        print("✗ --continue requires --output and a GET")
+        sys.exit(1)
+    if args.output and len(paths) > 1:
+        print("✗ --output takes a single path; use --output-dir for several")
+        sys.exit(1)
+    if (args.mirror or args.sync) and not args.output_dir:
+        args.output_dir = "mirror"
+    if args.sync and (args.output or args.mirror or method != "GET"):
+        print("✗ --sync can't be combined with --output, --mirror or -X")
+        sys.exit(1)
+
+    # Resume from the end of an existing partial download, if it can be checked against the server's copy
+    resume_from = 0
+    if_range = None
+    if args.resume and os.path.exists(args.output):
+        if_range = load_validator(args.output)
+        if if_range is None:
+            print(f"✗ No saved validator for {args.output}, downloading it again in full")
+        else:
+            resume_from = os.path.getsize(args.output)
+
     try:
-        # Initialize Reticulum
-        print("Initializing Reticulum...")
-        RNS.Reticulum()
-        print("✓ Reticulum initialized")
-        
         # Convert destination hash string to bytes
         try:
             dest_hash = bytes.fromhex(destination_hash)
         except ValueError:
             print("✗ Invalid destination hash format")
             sys.exit(1)
-            
-        # Create identity for client
-        identity = RNS.Identity()
-        print(f"✓ Client identity: {RNS.prettyhexrep(identity.hash)}")
-        
-        # Request path to destination
+
+        # Initialize Reticulum
+        print("Initializing Reticulum...")
+        started = time.monotonic()
+        RNS.Reticulum()
+        print("✓ Reticulum initialized")
+
+        # Find a path and open one Link that every request shares
         print(f"Looking for destination: {destination_hash}")
-        if not RNS.Transport.has_path(dest_hash):
-            print("✓ Requesting path to destination...")
-            RNS.Transport.request_path(dest_hash)
-            
-            # Wait for path
-            print("Waiting for path...")
-            for i in range(10):
-                time.sleep(1)
-                if RNS.Transport.has_path(dest_hash):
-                    break
-            else:
-                print("✗ Could not find path to destination")
-                sys.exit(1)
-                
-        print("✓ Path to destination found")
-        
-        # Create Link to destination
-        print("Establishing Link...")
-        # Recall the server identity from the destination hash
-        server_identity = RNS.Identity.recall(dest_hash)
-        if server_identity is None:
-            print("✗ Could not recall server identity")
-            sys.exit(1)
-            
-        # Create destination object for linking
-        server_destination = RNS.Destination(
-            server_identity,
-            RNS.Destination.OUT,
-            RNS.Destination.SINGLE,
-            "rserver", "web"
-        )
-        
-        link = RNS.Link(server_destination)
-        
-        # Wait for Link establishment
-        print("Waiting for Link establishment...")
-        for i in range(10):
-            time.sleep(1)
-            if link.status == RNS.Link.ACTIVE:
-                break
-        else:
-            print("✗ Link establishment failed")
+        try:
+            session, timings = connect(dest_hash, timeout=args.timeout)
+        except ConnectionError as e:
+            print(f"✗ {e}")
             sys.exit(1)
-            
-        print("✓ Link established!")
-        
-        # Set up callback to receive responses
-        def client_packet_received(data, packet):
-            print(f"✓ Received HTTP response ({len(data)} bytes):")
-            try:
-                response_text = data.decode('utf-8')
-                print(response_text)
-            except UnicodeDecodeError:
-                print(f"Binary data: {data}")
-            
-        link.set_packet_callback(client_packet_received)
-        
-        # Send HTTP request like curl
-        http_request = f"{method} {path} HTTP/1.1\r\nHost: {destination_hash}\r\nUser-Agent: MeshCurl/1.0\r\nAccept: text/html,*/*\r\n\r\n"
-        test_message = http_request.encode('utf-8')
-        
+
+        headers = {
+            "Host": destination_hash,
+            "User-Agent": "MeshCurl/1.0",
+            "Accept": "text/html,*/*",
+            "Accept-Encoding": accept_encoding_header(),
+        }
+        if args.mirror:
+            # Pages come back with the assets they reference in one response
+            headers["Prefer"] = "bundle"
+        if args.output and method == "GET":
+            # Downloads are resumable: If-Range is checked against the identity representation's ETag
+            headers["Accept-Encoding"] = "identity"
+
         if args.verbose:
-            print(f"Sending HTTP request ({len(test_message)} bytes):")
-            print(http_request)
+            print("Request headers:")
+            for key, value in headers.items():
+                print(f"  {key}: {value}")
+
+        fetch_started = time.monotonic()
+        if args.sync:
+            results = sync_site(session, headers, args)
+        elif args.output and method == "GET":
+            results = download(session, paths[0], headers, args.output, resume_from, if_range, args)
         else:
-            print(f"Requesting: {method} {path}")
-        packet = RNS.Packet(link, test_message)
-        packet.send()
-        
-        # Wait for response
-        print("Waiting for response...")
-        time.sleep(2)
-        
+            results = fetch_paths(session, paths, headers, method, args)
+
+        timings["fetch"] = time.monotonic() - fetch_started
+        timings["total"] = time.monotonic() - started
+
         # Close link
-        link.teardown()
+        session.close()
         print("✓ Link closed")
-        
+
+        print_timing(timings, results)
+
+        if any(pending.error is not None for pending in results):
+            sys.exit(1)
+
     except KeyboardInterrupt:
         print("\nTest client interrupted")
         sys.exit(0)
-        
+
     except Exception as e:
         print(f"✗ Error: {e}")
         sys.exit(1)
 
 
+def bench_main(argv):
+    """meshcurl.py bench: load a server with many concurrent Links replaying a request mix."""
+    parser = argparse.ArgumentParser(prog="meshcurl.py bench", description="MeshCurl bench - load an RServer over many Links")
+    parser.add_argument("destination", help="Server destination hash")
+    parser.add_argument("paths", nargs="*", help="Paths to request round-robin, if there is no --mix (default: /)")
+    parser.add_argument("-f", "--mix", help="Request mix file: one \"/path\", \"METHOD /path\" or JSON object per line")
+    parser.add_argument("-c", "--clients", type=int, default=4, help="Concurrent Links (default: 4)")
+    parser.add_argument("-n", "--requests", type=int, help="Requests to send in total (default: the mix once, unless --duration)")
+    parser.add_argument("-D", "--duration", type=float, help="Send requests for this many seconds")
+    parser.add_argument("-P", "--parallel", type=int, default=1, help="Requests in flight at once on each Link (default: 1)")
+    parser.add_argument("-t", "--timeout", type=float, default=60, help="Seconds to wait for the path, each Link and each response (default: 60)")
+    parser.add_argument("--app", default="rserver", help="Destination app name (default: rserver)")
+    parser.add_argument("--aspect", default="web", help="Destination aspect (default: web)")
+    parser.add_argument("--rnsconfig", help="Reticulum config directory (default: Reticulum's own)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    args = parser.parse_args(argv)
+
+    print("MeshCurl bench - HTTP load over Reticulum")
+    print("=" * 41)
+
+    if args.clients < 1 or args.parallel < 1:
+        print("✗ --clients and --parallel must be at least 1")
+        sys.exit(1)
+
+    try:
+        if args.mix:
+            mix = load_mix(args.mix)
+        else:
+            mix = [mix_entry("GET", path) for path in args.paths or ["/"]]
+    except (OSError, ValueError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    try:
+        dest_hash = bytes.fromhex(args.destination)
+    except ValueError:
+        print("✗ Invalid destination hash format")
+        sys.exit(1)
+
+    try:
+        # With rserver on the same machine, this joins its shared instance: no radio or network needed
+        print("Initializing Reticulum...")
+        RNS.Reticulum(configdir=args.rnsconfig)
+        print("✓ Reticulum initialized")
+
+        if not find_path(dest_hash, args.app, args.aspect, args.timeout):
+            print("✗ Could not find path to destination")
+            sys.exit(1)
+        server_identity = RNS.Identity.recall(dest_hash)
+        if server_identity is None:
+            print("✗ Could not recall server identity")
+            sys.exit(1)
+        print("✓ Path to destination found")
+
+        def open_session():
+            destination = RNS.Destination(server_identity, RNS.Destination.OUT, RNS.Destination.SINGLE, args.app, args.aspect)
+            link = establish_link(destination, args.timeout)
+            if link is None:
+                raise ConnectionError("Link establishment failed")
+            return MeshSession(link)
+
+        headers = {
+            "Host": args.destination,
+            "User-Agent": "MeshCurl/1.0 (bench)",
+            "Accept-Encoding": accept_encoding_header(),
+        }
+
+        amount = f"for {args.duration}s" if args.duration and not args.requests else f"{args.requests or len(mix)} requests"
+        print(f"✓ Sending {amount} from {args.clients} Links ({args.parallel} in flight each, {len(mix)} in the mix)")
+        report = run_bench(open_session, mix, args.clients, args.requests, args.duration, args.parallel, args.timeout, headers)
+
+    except KeyboardInterrupt:
+        print("\nBench interrupted")
+        sys.exit(0)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print("\nResults:")
+        print(format_report(report))
+
+    if report["requests"] == 0 or report["failed"]:
+        sys.exit(1)
+
+
+def fetch_paths(session, paths, headers, method, args):
+    """Fetch everything over the Link, in parallel, handling responses as they arrive."""
+    requested = set(paths)
+    results = []
+
+    for pending in session.fetch_all(paths, headers, args.parallel, args.timeout, method):
+        results.append(pending)
+
+        if pending.error is not None:
+            print(f"✗ {pending.path}: {pending.error}")
+            continue
+
+        data = pending.response
+        if args.verbose or len(paths) > 1:
+            status_code, _ = parse_response_head(data)
+            print(f"✓ {status_code} {pending.path} ({len(data)} bytes, {pending.elapsed:.2f}s)")
+
+        if args.output:
+            write_response(data, args.output, args.verbose)
+        elif args.output_dir:
+            status_code, response_headers = parse_response_head(data)
+            content_type = response_headers.get("content-type", "")
+            if status_code == 200 and content_type.startswith("multipart/mixed"):
+                saved = save_bundle(data, args.output_dir, pending.path, args.verbose)
+            else:
+                body = save_response(data, args.output_dir, pending.path, args.verbose)
+                saved = [] if body is None else [(pending.path, body, content_type)]
+
+            if args.mirror:
+                # Queue the assets that weren't bundled; fetch_all picks up paths added while it runs
+                requested.update(saved_path for saved_path, _, _ in saved)
+                for saved_path, body, saved_type in saved:
+                    for asset in asset_paths(body, saved_type, saved_path):
+                        if asset not in requested:
+                            requested.add(asset)
+                            paths.append(asset)
+        else:
+            print_response(data)
+
+    return results
+
+
+def sync_site(session, headers, args):
+    """Make args.output_dir match the site: fetch the manifest, then only the blobs that changed.
+
+    A manifest that hasn't changed since the last sync costs a 304, after which
+    only local files that were modified or deleted are fetched again.
+    """
+    output_dir = args.output_dir
+    state = load_state(output_dir)
+
+    manifest_headers = dict(headers)
+    if state["etag"]:
+        manifest_headers["If-None-Match"] = state["etag"]
+
+    pending = session.request("GET", MANIFEST_PATH, manifest_headers)
+    if not pending.wait(args.timeout):
+        session.cancel(pending, f"Timed out after {args.timeout}s")
+    if pending.error is not None:
+        print(f"✗ {MANIFEST_PATH}: {pending.error}")
+        return [pending]
+
+    data = decode_response(pending.response, args.verbose)
+    header_bytes, _, body = data.partition(b"\r\n\r\n")
+    status_code, response_headers = parse_response_head(header_bytes)
+
+    if status_code == 304:
+        print("✓ Manifest unchanged since the last sync")
+        entries = state_entries(state)
+    elif status_code == 200:
+        entries = parse_manifest(body)
+        print(f"✓ Manifest lists {len(entries)} files ({len(body)} bytes)")
+    else:
+        status_line = header_bytes.split(b"\r\n", 1)[0].decode('utf-8', 'replace')
+        pending.error = f"Manifest not available: {status_line}"
+        print(f"✗ {pending.error}")
+        return [pending]
+
+    fetch, current, stale = plan_sync(entries, output_dir, state)
+    print(f"✓ {len(current)} files current, {sum(len(paths) for paths in fetch.values())} to fetch ({len(fetch)} blobs)")
+
+    results = [pending]
+    digests = {blob_path(digest): digest for digest in fetch}
+    fetched_bytes = 0
+
+    for pending in session.fetch_all(list(digests), headers, args.parallel, args.timeout):
+        results.append(pending)
+        digest = digests[pending.path]
+
+        if pending.error is not None:
+            print(f"✗ {pending.path}: {pending.error}")
+            continue
+
+        blob_header_bytes, _, blob = decode_response(pending.response, args.verbose).partition(b"\r\n\r\n")
+        blob_status, _ = parse_response_head(blob_header_bytes)
+        try:
+            if blob_status != 200:
+                raise ValueError(f"HTTP {blob_status}")
+            current.update(write_blob(blob, digest, fetch[digest], output_dir))
+        except (ValueError, OSError) as e:
+            pending.error = str(e)
+            print(f"✗ {', '.join(fetch[digest])}: {e}")
+            continue
+
+        fetched_bytes += len(blob)
+        for path in fetch[digest]:
+            print(f"✓ {path} ({len(blob)} bytes)")
+
+    removed = remove_stale(output_dir, stale)
+
+    # Paths whose blob failed keep their old record (if any), so the next sync retries them
+    failed = {path for pending in results[1:] if pending.error is not None for path in fetch[digests[pending.path]]}
+    for path in failed:
+        if path in state["files"]:
+            current[path] = state["files"][path]
+
+    etag = response_headers.get("etag") if status_code == 200 else state["etag"]
+    save_state(output_dir, {"etag": None if failed else etag, "files": current})
+    print(f"✓ Synced {output_dir}: {fetched_bytes} bytes fetched, {removed} files removed")
+    return results
+
+
+def print_response(data):
+    """Print a received HTTP response."""
+    print(f"✓ Received HTTP response ({len(data)} bytes):")
+    data = decode_response(data)
+    try:
+        response_text = data.decode('utf-8')
+        print(response_text)
+    except UnicodeDecodeError:
+        print(f"Binary data: {data}")
+
+
+def write_response(data, output, verbose=False):
+    """Write a response body to a file."""
+    data = decode_response(data)
+    header_bytes, _, body = data.partition(b"\r\n\r\n")
+    status_line = header_bytes.split(b"\r\n", 1)[0].decode('utf-8', 'replace')
+    status_code, _ = parse_response_head(header_bytes)
+
+    if verbose:
+        print(header_bytes.decode('utf-8', 'replace'))
+
+    if status_code == 200:
+        with open(output, 'wb') as f:
+            f.write(body)
+        print(f"✓ Wrote {len(body)} bytes to {output}")
+    else:
+        print(f"✗ {status_line}")
+
+
+def download(session, path, headers, output, resume_from, if_range, args):
+    """Download a file in Range chunks, writing each one as it arrives.
+
+    A dropped Link leaves the chunks received so far in output, with the
+    validators of the response they came from saved next to it (before the
+    first byte is written), so --continue can pick up from there. Later
+    chunks send those validators as If-Range: if the file changes on the
+    server part way through, the whole new file comes back as a 200 and
+    replaces the partial copy.
+
+    Returns:
+        list: The PendingRequest of each chunk
+    """
+    results = []
+    offset = resume_from
+    if resume_from:
+        print(f"✓ Resuming {output} from byte {resume_from}")
+
+    while True:
+        chunk_headers = {**headers, "Range": f"bytes={offset}-{offset + DOWNLOAD_CHUNK_BYTES - 1}"}
+        if if_range is not None:
+            chunk_headers["If-Range"] = if_range
+
+        pending = session.request("GET", path, chunk_headers)
+        if not pending.wait(args.timeout):
+            session.cancel(pending, f"Timed out after {args.timeout}s")
+        results.append(pending)
+        if pending.error is not None:
+            print(f"✗ {path}: {pending.error}")
+            if offset:
+                print(f"✗ {output} has {offset} bytes, resume it with --continue")
+            return results
+
+        header_bytes, _, body = decode_response(pending.response, args.verbose).partition(b"\r\n\r\n")
+        status_code, response_headers = parse_response_head(header_bytes)
+        if args.verbose:
+            print(header_bytes.decode('utf-8', 'replace'))
+
+        if status_code == 416 and response_headers.get("content-range") == f"bytes */{offset}":
+            if not offset:
+                open(output, 'wb').close()
+            print(f"✓ {output} is already complete" if resume_from else f"✓ Wrote 0 bytes to {output}")
+            return results
+
+        content_range = parse_content_range(response_headers.get("content-range", "")) if status_code == 206 else None
+        if status_code == 206 and (content_range is None or content_range[0] != offset):
+            pending.error = f"Unexpected Content-Range: {response_headers.get('content-range', 'none')}"
+            print(f"✗ {output}: {pending.error}")
+            return results
+        if status_code not in (200, 206):
+            pending.error = header_bytes.split(b"\r\n", 1)[0].decode('utf-8', 'replace')
+            print(f"✗ {pending.error}")
+            return results
+
+        # A 200 is the whole file: the server ignored the Range, or the file changed since If-Range's copy
+        if status_code == 200:
+            if offset:
+                print(f"✓ {output} changed on the server, downloading it again")
+            offset = 0
+
+        validator = if_range_value(response_headers.get("etag"), response_headers.get("last-modified"))
+        if validator != if_range:
+            save_validator(output, response_headers)
+            if_range = validator
+
+        with open(output, 'ab' if offset else 'wb') as f:
+            f.write(body)
+        offset += len(body)
+
+        if status_code == 200 or offset >= content_range[2]:
+            if resume_from and status_code == 206:
+                print(f"✓ Appended {offset - resume_from} bytes to {output}")
+            else:
+                print(f"✓ Wrote {offset} bytes to {output}")
+            return results
+        if args.verbose:
+            print(f"✓ {offset}/{content_range[2]} bytes of {output}")
+
+
+def parse_content_range(value):
+    """Parse "bytes first-last/size".
+
+    Returns:
+        tuple: (first, last, size), or None if the value isn't a satisfied byte range
+    """
+    unit, _, spec = value.partition(" ")
+    span, _, size = spec.partition("/")
+    first, _, last = span.partition("-")
+    if unit != "bytes" or not (first.isdigit() and last.isdigit() and size.isdigit()):
+        return None
+    return int(first), int(last), int(size)
+
+
+def if_range_value(etag, last_modified):
+    """Pick the If-Range validator: a strong ETag, else Last-Modified (None if there is neither)."""
+    if etag and not etag.startswith("W/"):
+        return etag
+    return last_modified
+
+
+def load_validator(output):
+    """Get the If-Range value for resuming output from the validators saved with it (None if unknown)."""
+    try:
+        with open(output + VALIDATOR_SUFFIX, encoding='utf-8') as f:
+            validators = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return if_range_value(validators.get("etag"), validators.get("last_modified"))
+
+
+def save_validator(output, response_headers):
+    """Remember the validators of the response output is being written from."""
+    validators = {"etag": response_headers.get("etag"), "last_modified": response_headers.get("last-modified")}
+    with open(output + VALIDATOR_SUFFIX, 'w', encoding='utf-8') as f:
+        json.dump(validators, f)
+
+
+def save_response(data, output_dir, path, verbose=False):
+    """Write a successful response body under output_dir at the file matching its path.
+
+    Returns:
+        bytes: The decoded body, or None if the response was not a 200
+    """
+    data = decode_response(data, verbose)
+    header_bytes, _, body = data.partition(b"\r\n\r\n")
+    status_code, _ = parse_response_head(header_bytes)
+
+    if status_code != 200:
+        status_line = header_bytes.split(b"\r\n", 1)[0].decode('utf-8', 'replace')
+        print(f"✗ {path}: {status_line}")
+        return None
+
+    try:
+        file_path = output_path(output_dir, path)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return None
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'wb') as f:
+        f.write(body)
+    if verbose:
+        print(f"✓ Wrote {len(body)} bytes to {file_path}")
+    return body
+
+
+def save_bundle(data, output_dir, path, verbose=False):
+    """Write each file in a page bundle under output_dir; the first part is the page itself.
+
+    Returns:
+        list: (path, body, content type) of each file written
+    """
+    data = decode_response(data, verbose)
+    header_bytes, _, body = data.partition(b"\r\n\r\n")
+    _, response_headers = parse_response_head(header_bytes)
+
+    try:
+        parts = split_bundle(body, response_headers["content-type"])
+    except (KeyError, ValueError) as e:
+        print(f"✗ {path}: invalid bundle: {e}")
+        return []
+
+    saved = []
+    for index, (part_headers, content) in enumerate(parts):
+        part_path = path if index == 0 else part_headers.get("content-location", "")
+        try:
+            file_path = output_path(output_dir, part_path)
+        except ValueError as e:
+            print(f"✗ {e}")
+            continue
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(content)
+        if verbose:
+            print(f"✓ Wrote {len(content)} bytes to {file_path}")
+        saved.append((part_path, content, part_headers.get("content-type", "")))
+
+    print(f"✓ {path}: bundle of {len(saved)} files")
+    return saved
+
+
+def decode_response(data, verbose=True):
+    """Undo any Content-Encoding on a response body, leaving the headers as sent."""
+    header_bytes, separator, body = data.partition(b"\r\n\r\n")
+    if not separator:
+        return data
+
+    for line in header_bytes.split(b"\r\n")[1:]:
+        key, _, value = line.partition(b":")
+        if key.strip().lower() == b"content-encoding":
+            encoding = value.strip().decode('ascii')
+            try:
+                body = decompress(body, encoding)
+                if verbose:
+                    print(f"✓ Decoded {encoding} body ({len(body)} bytes)")
+            except Exception as e:
+                print(f"✗ Could not decode {encoding} body: {e}")
+            break
+
+    return header_bytes + separator + body
+
+
+def print_timing(timings, results):
+    """Print where the time went: finding the path, opening the Link and fetching."""
+    completed = [pending for pending in results if pending.error is None]
+    received = sum(len(pending.response) for pending in completed)
+    first_bytes = [pending.time_to_first_byte for pending in completed]
+
+    print("\nTiming:")
+    print(f"  Path lookup         {timings['path']:8.3f}s")
+    print(f"  Link setup          {timings['link']:8.3f}s")
+    if first_bytes:
+        print(f"  Time to first byte  {min(first_bytes):8.3f}s")
+    print(f"  Fetch               {timings['fetch']:8.3f}s  ({len(completed)}/{len(results)} responses, {received} bytes)")
+    print(f"  Total               {timings['total']:8.3f}s")
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,183 @@
+"""
+RServer metrics: counters, per-stage latency histograms, gauges and an opt-in sampling profiler.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import concurrent.futures.thread
+from collections import Counter
+from contextlib import contextmanager
+
+from log import event_logger
+
+# Latency buckets are powers of two in microseconds (1 µs .. ~67 s)
+HISTOGRAM_BUCKETS = 27
+
+_lock = threading.Lock()
+_counters = Counter()
+_histograms = {}
+_gauges = {}
+_started = time.time()
+
+# Sampling profiler state
+_profile_samples = Counter()
+_profiler = None
+
+# Where idle worker threads wait for work; samples there are not hot path time
+IDLE_FILES = {threading.__file__, concurrent.futures.thread.__file__}
+
+
+class Histogram:
+    """Log-bucketed latency histogram."""
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        bucket = min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)
+        self.buckets[bucket] += 1
+
+    def percentile(self, fraction):
+        """Estimate a percentile (upper bound of the bucket it falls in), in seconds."""
+        if self.count == 0:
+            return 0.0
+
+        target = fraction * self.count
+        seen = 0
+        for bucket, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p90_ms": round(self.percentile(0.90) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+def increment(name, amount=1):
+    """Add to a counter."""
+    with _lock:
+        _counters[name] += amount
+
+
+def observe(stage, seconds):
+    """Record how long a stage (parse, resolve, read, build, send, ...) took."""
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = Histogram()
+        histogram.observe(seconds)
+
+
+@contextmanager
+def timed(stage):
+    """Time the enclosed block into a stage histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def register_gauge(name, read):
+    """Register a callable whose current value is included in every snapshot."""
+    with _lock:
+        _gauges[name] = read
+
+
+def snapshot():
+    """Get all metrics as a JSON-serializable dict."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {stage: histogram.summary() for stage, histogram in _histograms.items()}
+        gauges = dict(_gauges)
+        profile = _profile_samples.most_common(20)
+
+    stats = {
+        "uptime_s": round(time.time() - _started, 1),
+        "counters": counters,
+        "latency": histograms,
+    }
+
+    for name, read in gauges.items():
+        try:
+            stats[name] = read()
+        except Exception as e:
+            stats[name] = {"error": str(e)}
+
+    if profile:
+        stats["profile"] = [{"location": location, "samples": count} for location, count in profile]
+
+    return stats
+
+
+def write_stats_file(path):
+    """Write a snapshot to path atomically, so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot(), f, indent=2)
+    os.replace(temp_path, path)
+
+
+def start_stats_writer(path, interval):
+    """Rewrite the stats file every interval seconds on a background thread."""
+
+    def write_loop():
+        while True:
+            time.sleep(interval)
+            try:
+                write_stats_file(path)
+            except OSError as e:
+                event_logger.warning(f"✗ Could not write stats file {path}: {e}")
+
+    threading.Thread(target=write_loop, name="rserver-stats", daemon=True).start()
+
+
+def start_profiler(interval, thread_prefix="rserver-worker"):
+    """Sample the innermost frame of worker threads every interval seconds (opt-in).
+
+    Sample counts per file:line:function show up under "profile" in snapshots.
+    """
+    global _profiler
+
+    if _profiler is not None:
+        return
+
+    def sample_loop():
+        while True:
+            time.sleep(interval)
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            samples = []
+            for ident, frame in sys._current_frames().items():
+                code = frame.f_code
+                if names.get(ident, "").startswith(thread_prefix) and code.co_filename not in IDLE_FILES:
+                    samples.append(f"{os.path.basename(code.co_filename)}:{frame.f_lineno}:{code.co_name}")
+            if samples:
+                with _lock:
+                    _profile_samples.update(samples)
+
+    _profiler = threading.Thread(target=sample_loop, name="rserver-profiler", daemon=True)
+    _profiler.start()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Optimize - minify and precompress the HTML, CSS, JS and SVG of every RServer site.
+"""
+
+import sys
+import argparse
+
+import config
+from http import optimize_sites, format_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimize - minify and precompress RServer sites")
+    parser.add_argument("-r", "--rebuild", action="store_true", help="Rebuild every file, not just those that changed")
+
+    args = parser.parse_args()
+
+    print("Optimize - RServer asset optimization")
+    print("=" * 37)
+
+    try:
+        settings = config.current()
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    public_dirs = [site.public_dir for site in config.sites()]
+    for public_dir in public_dirs:
+        print(f"✓ Public directory: {public_dir}")
+
+    try:
+        report = optimize_sites(public_dirs, settings.optimize_cache_dir, args.rebuild)
+    except OSError as e:
+        print(f"✗ Error writing {settings.optimize_cache_dir}: {e}")
+        sys.exit(1)
+
+    print(f"✓ {format_report(report)}")
+    if report["removed"]:
+        print(f"✓ Removed {report['removed']} unused files from {settings.optimize_cache_dir}")
+
+    if not settings.optimize_enabled:
+        print("✗ [optimize] enabled is false, so RServer still serves the original files")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,4 +4,5 @@ Reticulum networking package for RServer.
 
 from .identity import get_or_create_identity
 from .destination import create_destination
-from .link import start_link_server
\ No newline at end of file
+from .link import start_link_server, serve_destination, stop_link_server
+from .announce import start_announcing, stop_announcing
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Reticulum announce scheduling for RServer.
+Announces the server at startup and then periodically, with jitter and backoff.
+"""
+
+import RNS
+import time
+import random
+import threading
+
+import config
+import metrics
+from log import event_logger
+
+# Running schedulers, one per site, keyed by the site's identity path
+_schedulers = {}
+
+# First wait when interfaces are busy; doubles until it reaches the announce interval
+MIN_BACKOFF = 5
+
+
+def start_announcing(destination, settings=None):
+    """Announce a site's destination now and on its interval, with its server name as app data."""
+    settings = settings or config.current()
+    scheduler = AnnounceScheduler(
+        destination,
+        settings.announce_interval,
+        settings.announce_jitter,
+        settings.server_name.encode('utf-8')
+    )
+
+    if not _schedulers:
+        metrics.register_gauge("announce", lambda: {"sent": sum(s.announces for s in list(_schedulers.values()))})
+        config.on_change(apply_config_change)
+    _schedulers[settings.identity_path] = scheduler
+    scheduler.start()
+    return scheduler
+
+
+def stop_announcing():
+    """Stop the periodic announces."""
+    for scheduler in list(_schedulers.values()):
+        scheduler.stop()
+
+
+def apply_config_change(old, new):
+    """Use each site's new announce interval, jitter or server name from its next announce on."""
+    for site in config.sites():
+        scheduler = _schedulers.get(site.identity_path)
+        if scheduler is None:
+            continue
+
+        scheduler.interval = site.announce_interval
+        scheduler.jitter = site.announce_jitter
+        app_data = site.server_name.encode('utf-8')
+        if app_data != scheduler.app_data:
+            scheduler.app_data = app_data
+            scheduler.destination.set_default_app_data(app_data)
+
+
+class AnnounceScheduler:
+    """Announces a destination at startup and then every interval seconds.
+
+    Each wait is randomized by +/- jitter (a fraction of the interval) so that
+    servers started together don't keep announcing in sync. When an interface
+    still has announces queued or is inside its announce rate limit, the
+    announce is postponed with exponential backoff rather than adding to the
+    queue. The app data (the server name) is also set as the destination's
+    default, so path responses carry it too.
+    """
+
+    def __init__(self, destination, interval, jitter=0.1, app_data=None):
+        self.destination = destination
+        self.interval = interval
+        self.jitter = jitter
+        self.app_data = app_data
+        self.announces = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+        if app_data is not None:
+            # Path responses for this destination are announces with the default app data
+            destination.set_default_app_data(app_data)
+
+    def start(self):
+        """Announce now, then keep announcing on a background thread."""
+        self.announce()
+
+        if self.interval and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rserver-announce", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def announce(self):
+        """Send one announce."""
+        self.destination.announce(app_data=self.app_data)
+        self.announces += 1
+        metrics.increment("announces")
+        event_logger.debug(f"✓ Announced {RNS.prettyhexrep(self.destination.hash)}")
+
+    def next_delay(self):
+        """Seconds until the next announce, jittered around the interval."""
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _run(self):
+        while not self._stop.wait(self.next_delay()):
+            backoff = MIN_BACKOFF
+            while backoff < self.interval and busy_interfaces():
+                metrics.increment("announces_postponed")
+                event_logger.debug(f"✓ Interfaces busy, postponing announce by {backoff}s")
+                if self._stop.wait(backoff):
+                    return
+                backoff *= 2
+
+            try:
+                self.announce()
+            except Exception as e:
+                event_logger.warning(f"✗ Announce failed: {e}")
+
+
+def busy_interfaces():
+    """Get the interfaces that have announces queued or are still rate limited."""
+    now = time.time()
+    busy = []
+    for interface in getattr(RNS.Transport, "interfaces", []):
+        if getattr(interface, "announce_queue", None) or getattr(interface, "announce_allowed_at", 0) > now:
+            busy.append(interface)
+    return busy
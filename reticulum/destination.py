@@ -6,10 +6,11 @@ import RNS
 import config
 
 
-def create_destination(identity):
-    """Create a Reticulum destination for the web server."""
+def create_destination(identity, settings=None):
+    """Create a Reticulum destination for the web server (or one of its sites)."""
 
-    app_name, aspect = config.app_context()
+    settings = settings or config.current()
+    app_name, aspect = settings.app_name, settings.aspect
 
     destination = RNS.Destination(
         identity,
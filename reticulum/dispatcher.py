@@ -0,0 +1,283 @@
+"""
+Request dispatching for RServer.
+Runs request handling on a bounded worker pool instead of the Reticulum callback thread.
+"""
+
+import RNS
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from log import event_logger
+from .transfer import send_response
+from .scheduler import TokenBucket
+
+
+class LinkQueue:
+    """A Link's session, queued packets and independent tasks."""
+
+    __slots__ = ("session", "framer", "data", "queued", "tasks", "parsing", "running", "started", "limited_at", "accepting")
+
+    def __init__(self, session, request_rate=0, request_burst=1):
+        self.session = session
+        # Finds where requests start in the Link's data; without one, each packet is a request
+        self.framer = getattr(session, "framer", None)
+        # (data, number of requests it starts)
+        self.data = deque()
+        self.queued = 0
+        self.tasks = deque()
+        self.parsing = False
+        self.running = 0
+        # Request rate limit, counted in requests started
+        self.started = TokenBucket(request_rate, request_burst)
+        self.limited_at = None
+        # Whether the request the next continuing data belongs to was accepted
+        self.accepting = True
+
+    def split(self, data):
+        """Split a packet into (starts_request, bytes) segments."""
+        return self.framer.split(data) if self.framer is not None else [(True, data)]
+
+    def load(self):
+        """Number of packets and tasks queued or being handled."""
+        return len(self.data) + len(self.tasks) + self.running + self.parsing
+
+    def requests(self):
+        """Number of requests queued or being handled; a partly received request counts once."""
+        return self.queued + len(self.tasks) + self.running
+
+
+class Dispatcher:
+    """Queues requests per Link and handles them on a shared thread pool.
+
+    Each Link's packets are passed to the data handler in arrival order by at most
+    one worker at a time. The data handler returns a list whose items are either
+    responses, sent in order straight away, or callables returning a response (or
+    None to send nothing). Callables are independent requests: up to
+    max_parallel_per_link of them run at once per Link and their responses are
+    sent as each completes, so a single busy client can't occupy the whole pool
+    but a slow request doesn't hold up the others on its Link.
+
+    When a Link has max_queue_per_link requests queued or running, the busy
+    handler's response is sent straight away instead. A Link sending requests
+    faster than request_rate (after a burst of request_burst) has them dropped
+    before they are even queued; the limited handler's response is sent at most
+    once a second while it keeps at it. Limits apply to whole requests: a
+    request taking several packets costs one token, and the rest of a request
+    that was accepted is never dropped, while the rest of one that was turned
+    away is dropped with it. A session with a framer (see RequestFramer) tells
+    where requests start.
+
+    Responses go through the transmit scheduler, if one is given, which decides
+    when each is actually sent. If a session factory is given, each Link gets
+    its own session object (e.g. an incremental request parser), created with
+    the Link's id and the site it arrived on, and passed to the data handler
+    with its data.
+    """
+
+    def __init__(self, data_handler, busy_handler, workers, max_queue_per_link, session_factory=None, max_parallel_per_link=1,
+                 scheduler=None, limited_handler=None, request_rate=0, request_burst=1):
+        self.data_handler = data_handler
+        self.busy_handler = busy_handler
+        self.limited_handler = limited_handler or busy_handler
+        self.max_queue_per_link = max_queue_per_link
+        self.max_parallel_per_link = max_parallel_per_link
+        self.session_factory = session_factory
+        self.scheduler = scheduler
+        # Told about every response sent, for per-Link stats
+        self.registry = None
+        self.request_rate = request_rate
+        self.request_burst = request_burst
+        self.rejected = 0
+        self.rate_limited = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rserver-worker")
+        self._links = {}
+        self._lock = threading.Lock()
+
+    def submit(self, link, data, site=None):
+        """Queue a packet from a Link, shedding load if the Link has too much queued or sends too fast.
+
+        site identifies which of the server's destinations the Link arrived on.
+        """
+        replies = []
+
+        with self._lock:
+            queue = self._links.get(link)
+            if queue is None:
+                queue = self._links[link] = LinkQueue(self._new_session(link, site), self.request_rate, self.request_burst)
+
+            now = time.monotonic()
+            accepted = []
+            started = 0
+            for starts_request, segment in queue.split(data):
+                if not starts_request:
+                    # The rest of a request goes wherever its start went
+                    if queue.accepting:
+                        accepted.append(segment)
+                    continue
+
+                queue.accepting = False
+                if not queue.started.try_take(1, now):
+                    self.rate_limited += 1
+                    metrics.increment("requests_rate_limited")
+                    # Tell a flooding client once a second; drop everything else unanswered
+                    if queue.limited_at is None or now - queue.limited_at >= 1:
+                        queue.limited_at = now
+                        replies.append((self.limited_handler, segment))
+                elif queue.requests() + started >= self.max_queue_per_link:
+                    self.rejected += 1
+                    metrics.increment("requests_shed")
+                    replies.append((self.busy_handler, segment))
+                else:
+                    queue.accepting = True
+                    accepted.append(segment)
+                    started += 1
+
+            if accepted:
+                queue.data.append((accepted[0] if len(accepted) == 1 else b"".join(accepted), started))
+                queue.queued += started
+                self._schedule(link, queue)
+
+        for reply, segment in replies:
+            # Answer from the callback thread; these responses are small and prebuilt
+            send_response(link, reply(segment))
+
+    def discard(self, link):
+        """Drop any queued requests and session state for a Link that has closed."""
+        with self._lock:
+            queue = self._links.pop(link, None)
+            if queue is not None:
+                queue.data.clear()
+                queue.queued = 0
+                queue.tasks.clear()
+        if self.scheduler is not None:
+            self.scheduler.discard(link)
+
+    def stats(self):
+        """Get queue depth and load shedding counters."""
+        with self._lock:
+            return {
+                "links": len(self._links),
+                "queued_requests": sum(queue.queued + len(queue.tasks) for queue in self._links.values()),
+                "running_requests": sum(queue.running for queue in self._links.values()),
+                "shed": self.rejected,
+                "rate_limited": self.rate_limited,
+            }
+
+    def load(self, link):
+        """Get the number of a Link's packets and requests queued or being handled."""
+        with self._lock:
+            queue = self._links.get(link)
+            return 0 if queue is None else queue.load()
+
+    def pending(self):
+        """Get the number of queued requests across all Links."""
+        with self._lock:
+            return sum(queue.queued + len(queue.tasks) for queue in self._links.values())
+
+    def shutdown(self):
+        """Stop accepting work and wait for running requests to finish."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _schedule(self, link, queue):
+        """Start workers for a Link's queued work; called with the lock held."""
+        if self._links.get(link) is not queue:
+            return
+
+        if queue.data and not queue.parsing:
+            queue.parsing = True
+            self._executor.submit(self._drain, link, queue)
+
+        while queue.tasks and queue.running < self.max_parallel_per_link:
+            queue.running += 1
+            self._executor.submit(self._run, link, queue, queue.tasks.popleft())
+
+    def _drain(self, link, queue):
+        """Hand a Link's queued packets to the data handler until none are left."""
+        while True:
+            with self._lock:
+                if not queue.data:
+                    queue.parsing = False
+                    return
+                data, started = queue.data.popleft()
+                queue.queued -= started
+
+            try:
+                items = self.data_handler(data, queue.session)
+            except Exception as e:
+                event_logger.error(f"✗ Worker error: {e}")
+                continue
+
+            tasks = []
+            for item in items:
+                if callable(item):
+                    tasks.append(item)
+                else:
+                    self._send(link, item)
+
+            if tasks:
+                with self._lock:
+                    queue.tasks.extend(tasks)
+                    self._schedule(link, queue)
+
+    def _run(self, link, queue, task):
+        """Run one independent request and send its response."""
+        try:
+            response = task()
+            if response is not None:
+                self._send(link, response)
+        except Exception as e:
+            event_logger.error(f"✗ Worker error: {e}")
+        finally:
+            with self._lock:
+                queue.running -= 1
+                self._schedule(link, queue)
+
+    def set_request_rate(self, rate, burst):
+        """Apply a new per-Link request rate limit to every Link."""
+        with self._lock:
+            self.request_rate = rate
+            self.request_burst = burst
+            for queue in self._links.values():
+                queue.started.configure(rate, burst)
+
+    def _send(self, link, response):
+        """Hand a response to the transmit scheduler, or send it now without one."""
+        if self.scheduler is not None:
+            self.scheduler.submit(link, response)
+        else:
+            self.transmit(link, response)
+
+    def transmit(self, link, response):
+        """Send a response if the Link is still open."""
+        if not is_link_open(link):
+            return
+        try:
+            start = time.perf_counter()
+            send_response(link, response)
+            metrics.observe("send", time.perf_counter() - start)
+            metrics.increment("bytes_sent", len(response))
+            if self.registry is not None:
+                self.registry.sent(link, len(response))
+        except Exception as e:
+            event_logger.error(f"✗ Send error: {e}")
+
+    def _new_session(self, link, site=None):
+        """Create a Link's session, if sessions are used."""
+        if self.session_factory is None:
+            return None
+        if site is None:
+            return self.session_factory(link_id(link))
+        return self.session_factory(link_id(link), site)
+
+
+def link_id(link):
+    """Get a Link's id as a short printable string for logs."""
+    return RNS.hexrep(link.link_id, delimit=False)
+
+
+def is_link_open(link):
+    """Check if a Link can still carry a response."""
+    return link.status != RNS.Link.CLOSED
@@ -7,10 +7,10 @@ import RNS
 import config
 
 
-def get_or_create_identity():
-    """Load existing identity or create a new one. Returns (identity, was_created)."""
+def get_or_create_identity(identity_file=None):
+    """Load existing identity (the configured one by default) or create a new one. Returns (identity, was_created)."""
 
-    identity_file = config.identity_path()
+    identity_file = identity_file or config.identity_path()
     
     if os.path.exists(identity_file):
         return load_identity(identity_file), False
@@ -31,6 +31,6 @@ def create_identity(identity_file):
     """Create a new identity and save it to file."""
 
     identity = RNS.Identity()
-    os.makedirs("config", exist_ok=True)
+    os.makedirs(os.path.dirname(identity_file) or ".", exist_ok=True)
     identity.to_file(identity_file)
     return identity
@@ -3,44 +3,132 @@ Reticulum Link management layer.
 Handles raw Link connections and data transfer.
 """
 
-import RNS
+import time
+import config
+import metrics
+from log import event_logger
+from .dispatcher import Dispatcher, link_id
+from .scheduler import TransmitScheduler
+from .registry import LinkRegistry
 
-# Global reference to data handler
-_data_handler = None
+# Global reference to the request dispatcher
+_dispatcher = None
 
+# Every open Link, with its stats; enforces the Link cap and idle timeout
+_registry = None
 
-def start_link_server(destination, data_handler):
-    """Start accepting Link connections on destination with data handler."""
-    global _data_handler
-    _data_handler = data_handler
+
+def start_link_server(destination, data_handler, busy_handler, session_factory=None, limited_handler=None, site=None):
+    """Start accepting Link connections on destination with data handler.
+    
+    Requests are handled on a worker pool; busy_handler builds the response
+    sent immediately when a Link has too many requests queued, limited_handler
+    the one for a Link over its request rate. Responses are sent through a
+    transmit scheduler that shares bandwidth fairly between Links. session_factory
+    creates the per-link state passed to data_handler alongside each packet.
+    Independent requests returned by data_handler may run concurrently, up to
+    the configured number per Link. Further sites' destinations are added with
+    serve_destination; every site shares the workers and transmit scheduler.
+    Open Links are tracked by a registry that caps how many there are and
+    closes idle ones once their responses in flight are sent.
+    """
+    global _dispatcher, _registry
+    _dispatcher = Dispatcher(
+        data_handler,
+        busy_handler,
+        config.worker_threads(),
+        config.worker_queue_per_link(),
+        session_factory,
+        config.worker_parallel_per_link(),
+        limited_handler=limited_handler,
+        request_rate=config.request_rate(),
+        request_burst=config.request_burst()
+    )
+    _dispatcher.scheduler = TransmitScheduler(_dispatcher.transmit, *config.transmit_limits())
+    _registry = LinkRegistry(*config.link_limits(), in_flight=in_flight)
+    _dispatcher.registry = _registry
+    metrics.register_gauge("dispatcher", _dispatcher.stats)
+    metrics.register_gauge("transmit", _dispatcher.scheduler.stats)
+    metrics.register_gauge("links", _registry.stats)
+    config.on_change(apply_config_change)
+    _registry.start()
     
-    destination.set_link_established_callback(on_link_established)
-    print(f"✓ Link server listening")
+    serve_destination(destination, site)
+    print(f"✓ Link server listening ({config.worker_threads()} workers)")
+
+
+def serve_destination(destination, site=None):
+    """Accept Links on a destination, handling their requests for site (its identity path)."""
+    destination.set_link_established_callback(lambda link: on_link_established(link, site))
+
+
+def stop_link_server():
+    """Stop handing requests to workers and wait for in-progress ones."""
+    if _registry is not None:
+        _registry.stop()
+    if _dispatcher is not None:
+        _dispatcher.shutdown()
+        _dispatcher.scheduler.stop()
 
 
-def on_link_established(link):
-    """Called when a Link connection is established."""
-    print(f"✓ Link established")
+def apply_config_change(old, new):
+    """Apply new per-Link queue, rate, bandwidth and lifecycle limits (the worker thread count needs a restart)."""
+    if _dispatcher is not None:
+        _dispatcher.max_queue_per_link = new.worker_queue_per_link
+        _dispatcher.max_parallel_per_link = new.worker_parallel_per_link
+        _dispatcher.set_request_rate(new.request_rate, new.request_burst)
+        _dispatcher.scheduler.configure(new.transmit_rate, new.transmit_burst, new.transmit_link_rate,
+                                        new.transmit_link_burst, new.transmit_small_bytes)
+    if _registry is not None:
+        _registry.configure(new.max_links, new.link_idle_timeout, new.link_drain_timeout)
+
+
+def in_flight(link):
+    """Count a Link's requests being handled, responses waiting to be sent and Resources being transferred."""
+    count = _dispatcher.load(link) + _dispatcher.scheduler.pending(link)
+    return count + len(getattr(link, "outgoing_resources", None) or ())
+
+
+def on_link_established(link, site=None):
+    """Called when a Link connection is established on a site's destination."""
+    metrics.increment("links_established")
+    if not _registry.admit(link, site):
+        # At the Link cap and every open Link is busy
+        metrics.increment("links_refused")
+        event_logger.debug(f"✗ Link refused, {_registry.max_links} Links busy: {link_id(link)}")
+        link.teardown()
+        return
+    event_logger.debug(f"✓ Link established: {link_id(link)}")
     
-    link.set_packet_callback(on_packet_received)
+    link.set_packet_callback(lambda data, packet: on_packet_received(data, packet, site))
     link.set_link_closed_callback(on_link_closed)
 
 
-def on_packet_received(data, packet):
+def on_packet_received(data, packet, site=None):
     """Handle incoming data from a Link."""
+    # A closing Link is only finishing what it already asked for
+    if not _registry.received(packet.link, len(data)):
+        metrics.increment("packets_dropped_closing")
+        return
+    
     try:
-        # Pass raw data to handler
-        response_data = _data_handler(data)
-        
-        # Send response back if provided
-        if response_data:
-            response_packet = RNS.Packet(packet.link, response_data)
-            response_packet.send()
+        # Queue for a worker so slow requests don't block the RNS callback thread
+        _dispatcher.submit(packet.link, data, site)
             
     except Exception as e:
-        print(f"✗ Link error: {e}")
+        event_logger.error(f"✗ Link error: {e}")
 
 
 def on_link_closed(link):
     """Called when a Link connection is closed."""
-    print("✓ Link closed")
+    metrics.increment("links_closed")
+    _dispatcher.discard(link)
+    record = _registry.remove(link)
+    if record is None:
+        event_logger.debug(f"✓ Link closed: {link_id(link)}")
+        return
+    stats = record.stats(time.monotonic())
+    event_logger.debug(
+        f"✓ Link closed: {stats['link']} after {stats['age_s']}s ({stats['packets']} packets, {stats['bytes_received']} bytes in, "
+        f"{stats['responses']} responses, {stats['bytes_sent']} bytes out, rtt {stats['rtt_ms']} ms)"
+    )
@@ -0,0 +1,238 @@
+"""
+Link lifecycle management for RServer.
+Tracks every open Link, caps how many there are, closes idle ones and keeps per-Link stats.
+"""
+
+import RNS
+import time
+import threading
+from collections import OrderedDict
+
+from log import event_logger
+from .dispatcher import link_id
+
+# Seconds between checks for idle Links and drained closing ones
+SWEEP_INTERVAL = 1.0
+
+
+class LinkRecord:
+    """What the registry knows about one open Link."""
+
+    __slots__ = ("link", "site", "opened_at", "last_active", "packets", "bytes_received",
+                 "responses", "bytes_sent", "closing_at", "close_reason")
+
+    def __init__(self, link, site, now):
+        self.link = link
+        self.site = site
+        self.opened_at = now
+        self.last_active = now
+        self.packets = 0
+        self.bytes_received = 0
+        self.responses = 0
+        self.bytes_sent = 0
+        self.closing_at = None
+        self.close_reason = None
+
+    def stats(self, now):
+        rtt = getattr(self.link, "rtt", None)
+        return {
+            "link": link_id(self.link),
+            "age_s": round(now - self.opened_at, 1),
+            "idle_s": round(now - self.last_active, 1),
+            "packets": self.packets,
+            "bytes_received": self.bytes_received,
+            "responses": self.responses,
+            "bytes_sent": self.bytes_sent,
+            "rtt_ms": round(rtt * 1000, 1) if rtt is not None else None,
+        }
+
+
+class LinkRegistry:
+    """Keeps open Links within max_links and closes the ones nobody uses.
+
+    Links are kept in least recently active order. When max_links are open, a
+    new Link is admitted by closing the least recently active idle one; if
+    every Link has requests in flight, the new Link is refused instead. A Link
+    with no activity for idle_timeout seconds is closed.
+
+    Closing drains a Link: it takes no more requests, and is torn down once the
+    responses it has in flight are sent. Only a Link that sends nothing for
+    drain_timeout seconds, with no Resource transfer going on, is torn down early.
+    in_flight(link) tells how many requests and responses a Link still has
+    being handled, queued or transferred.
+    """
+
+    def __init__(self, max_links, idle_timeout, drain_timeout, in_flight):
+        self.max_links = max_links
+        self.idle_timeout = idle_timeout
+        self.drain_timeout = drain_timeout
+        self.in_flight = in_flight
+        self.admitted = 0
+        self.refused = 0
+        self.evicted = 0
+        self.idle_closed = 0
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Check for idle and drained Links on a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rserver-links", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def configure(self, max_links, idle_timeout, drain_timeout):
+        """Apply new limits; a lower cap is enforced by closing idle Links at the next sweep."""
+        with self._lock:
+            self.max_links = max_links
+            self.idle_timeout = idle_timeout
+            self.drain_timeout = drain_timeout
+
+    def admit(self, link, site=None):
+        """Start tracking a newly established Link, making room for it if the cap is reached.
+
+        Returns:
+            bool: False if every open Link is busy, in which case the caller tears it down
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.max_links and self._open() >= self.max_links:
+                victim = self._least_recent_idle()
+                if victim is None:
+                    self.refused += 1
+                    return False
+                self.evicted += 1
+                self._close(victim, "evicted", now)
+
+            self._records[link] = LinkRecord(link, site, now)
+            self.admitted += 1
+
+        self._teardown_drained(now)
+        return True
+
+    def received(self, link, size):
+        """Record a packet from a Link.
+
+        Returns:
+            bool: False if the Link is closing (or unknown), so the packet should be dropped
+        """
+        with self._lock:
+            record = self._records.get(link)
+            if record is None or record.closing_at is not None:
+                return False
+            record.last_active = time.monotonic()
+            record.packets += 1
+            record.bytes_received += size
+            self._records.move_to_end(link)
+            return True
+
+    def sent(self, link, size):
+        """Record a response sent on a Link."""
+        with self._lock:
+            record = self._records.get(link)
+            if record is not None:
+                record.last_active = time.monotonic()
+                record.responses += 1
+                record.bytes_sent += size
+
+    def remove(self, link):
+        """Stop tracking a Link that has closed.
+
+        Returns:
+            LinkRecord: Its record, or None if it wasn't tracked
+        """
+        with self._lock:
+            return self._records.pop(link, None)
+
+    def sweep(self, now=None):
+        """Close idle Links and Links over the cap, and tear down closing Links that have drained."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.idle_timeout:
+                for record in list(self._records.values()):
+                    # A Link still handling or sending a response isn't idle, however long that takes
+                    if (record.closing_at is None and now - record.last_active >= self.idle_timeout
+                            and not self.in_flight(record.link)):
+                        self.idle_closed += 1
+                        self._close(record, "idle", now)
+
+            while self.max_links and self._open() > self.max_links:
+                victim = self._least_recent_idle()
+                if victim is None:
+                    break
+                self.evicted += 1
+                self._close(victim, "evicted", now)
+
+        self._teardown_drained(now)
+
+    def stats(self):
+        """Get Link counts, lifecycle counters and the busiest Links' stats."""
+        now = time.monotonic()
+        with self._lock:
+            records = list(self._records.values())
+            busiest = sorted(records, key=lambda record: record.bytes_sent, reverse=True)[:5]
+            return {
+                "active": sum(1 for record in records if record.closing_at is None),
+                "closing": sum(1 for record in records if record.closing_at is not None),
+                "max": self.max_links,
+                "admitted": self.admitted,
+                "refused": self.refused,
+                "evicted": self.evicted,
+                "idle_closed": self.idle_closed,
+                "busiest": [record.stats(now) for record in busiest],
+            }
+
+    def _open(self):
+        """Number of Links not already closing; called with the lock held."""
+        return sum(1 for record in self._records.values() if record.closing_at is None)
+
+    def _least_recent_idle(self):
+        """Find the least recently active Link with nothing in flight; called with the lock held."""
+        for record in self._records.values():
+            if record.closing_at is None and not self.in_flight(record.link):
+                return record
+        return None
+
+    def _close(self, record, reason, now):
+        """Mark a Link as closing; called with the lock held."""
+        record.closing_at = now
+        record.close_reason = reason
+
+    def _stuck(self, record, now):
+        """Check if a closing Link made no progress for drain_timeout; called with the lock held."""
+        if getattr(record.link, "outgoing_resources", None):
+            return False
+        return now - max(record.closing_at, record.last_active) >= self.drain_timeout
+
+    def _teardown_drained(self, now):
+        """Tear down closing Links that have nothing left in flight, or whose work in flight is stuck.
+
+        Work is stuck when nothing was sent on the Link for drain_timeout seconds
+        and no Resource is being transferred; a slow transfer is never cut off.
+        """
+        with self._lock:
+            drained = [
+                record for record in self._records.values()
+                if record.closing_at is not None and (not self.in_flight(record.link) or self._stuck(record, now))
+            ]
+
+        for record in drained:
+            event_logger.debug(f"✓ Closing {record.close_reason} Link: {link_id(record.link)}")
+            try:
+                record.link.teardown()
+            except Exception as e:
+                event_logger.warning(f"✗ Link teardown failed: {e}")
+            # Normally removed by the Link's closed callback; a Link that never reports it is dropped here
+            if record.link.status == RNS.Link.CLOSED:
+                self.remove(record.link)
+
+    def _run(self):
+        while not self._stop.wait(SWEEP_INTERVAL):
+            try:
+                self.sweep()
+            except Exception as e:
+                event_logger.error(f"✗ Link sweep failed: {e}")
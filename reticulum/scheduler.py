@@ -0,0 +1,222 @@
+"""
+Transmit scheduling for RServer.
+Shares the interface's bandwidth fairly between Links, with small responses first.
+"""
+
+import time
+import threading
+from collections import deque
+
+import metrics
+from log import event_logger
+
+
+class TokenBucket:
+    """A token bucket refilled at rate tokens per second, holding at most burst.
+
+    A rate of 0 means unlimited. charge() may take the bucket below zero, so a
+    response larger than the burst is still sent, and the debt is paid off
+    before the next one.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, amount=1, now=None):
+        """Take amount tokens if there are that many; False (taking none) if not."""
+        if not self.rate:
+            return True
+        self.refill(time.monotonic() if now is None else now)
+        if self.tokens < amount:
+            return False
+        self.tokens -= amount
+        return True
+
+    def wait_time(self, now):
+        """Seconds until the bucket is out of debt (0 if it is now)."""
+        if not self.rate:
+            return 0.0
+        self.refill(now)
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def charge(self, amount, now):
+        if self.rate:
+            self.refill(now)
+            self.tokens -= amount
+
+    def configure(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = min(self.tokens, burst)
+
+
+class LinkTransmitQueue:
+    """A Link's responses waiting to be sent, in order, with its own bucket."""
+
+    __slots__ = ("bucket", "responses", "last_finish")
+
+    def __init__(self, rate, burst):
+        self.bucket = TokenBucket(rate, burst)
+        # (start tag, finish tag, size, response)
+        self.responses = deque()
+        self.last_finish = 0.0
+
+
+class TransmitScheduler:
+    """Decides which Link's response goes out next, and when.
+
+    Links are served by start-time fair queuing: each response gets a finish tag
+    of its Link's previous tag plus its size, and the smallest tag goes first,
+    so every Link gets an equal share and small responses overtake bulk ones.
+    Each Link's responses stay in order.
+
+    Bytes are charged to a per-Link token bucket and a global one for the whole
+    interface. A response larger than small_bytes also waits for the global
+    bucket to be out of debt, so bulk transfers can't use more than the global
+    rate between them; small responses only wait for their own Link's bucket,
+    so interactive clients aren't held up behind someone else's download.
+
+    With no rates configured, responses are sent straight away by the caller.
+    """
+
+    def __init__(self, send, rate=0, burst=0, link_rate=0, link_burst=0, small_bytes=0):
+        self.send = send
+        self.link_rate = link_rate
+        self.link_burst = link_burst
+        self.small_bytes = small_bytes
+        self.sent = 0
+        # Times the transmit thread had to wait for tokens
+        self.throttled = 0
+        self._global = TokenBucket(rate, burst)
+        self._links = {}
+        self._virtual_time = 0.0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    @property
+    def unlimited(self):
+        return not self._global.rate and not self.link_rate
+
+    def submit(self, link, response):
+        """Send a response now if nothing limits it, or queue it for the transmit thread."""
+        if self.unlimited:
+            self.sent += 1
+            self.send(link, response)
+            return
+
+        size = len(response)
+        with self._condition:
+            queue = self._links.get(link)
+            if queue is None:
+                queue = self._links[link] = LinkTransmitQueue(self.link_rate, self.link_burst)
+
+            start = max(self._virtual_time, queue.last_finish)
+            queue.last_finish = start + size
+            queue.responses.append((start, queue.last_finish, size, response))
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rserver-transmit", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def discard(self, link):
+        """Drop the queued responses of a Link that has closed."""
+        with self._condition:
+            self._links.pop(link, None)
+
+    def pending(self, link):
+        """Get the number of a Link's responses waiting to be sent."""
+        with self._condition:
+            queue = self._links.get(link)
+            return 0 if queue is None else len(queue.responses)
+
+    def configure(self, rate, burst, link_rate, link_burst, small_bytes):
+        """Apply new limits; queued responses are sent under the new limits."""
+        with self._condition:
+            self._global.configure(rate, burst)
+            self.link_rate = link_rate
+            self.link_burst = link_burst
+            self.small_bytes = small_bytes
+            for queue in self._links.values():
+                queue.bucket.configure(link_rate, link_burst)
+            self._condition.notify()
+
+    def stop(self):
+        """Stop the transmit thread once the queued responses are sent."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "queued_responses": sum(len(queue.responses) for queue in self._links.values()),
+                "queued_bytes": sum(item[2] for queue in self._links.values() for item in queue.responses),
+                "sent": self.sent,
+                "throttled": self.throttled,
+            }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    link, response, wait = self._next(time.monotonic())
+                    if response is not None:
+                        break
+                    if self._stopped and wait is None:
+                        return
+                    self._condition.wait(wait)
+
+            try:
+                self.send(link, response)
+            except Exception as e:
+                event_logger.error(f"✗ Transmit error: {e}")
+
+    def _next(self, now):
+        """Take the next response that may be sent now; called with the lock held.
+
+        Returns:
+            tuple: (link, response, None), or (None, None, seconds until one may
+                be sent, or None if nothing is queued)
+        """
+        global_wait = self._global.wait_time(now)
+        best = None
+        wait = None
+
+        for link, queue in self._links.items():
+            if not queue.responses:
+                continue
+
+            start, finish, size, response = queue.responses[0]
+            link_wait = queue.bucket.wait_time(now)
+            if size > self.small_bytes:
+                link_wait = max(link_wait, global_wait)
+
+            if link_wait > 0:
+                wait = link_wait if wait is None else min(wait, link_wait)
+            elif best is None or finish < best[1][1]:
+                best = (link, queue.responses[0], queue)
+
+        if best is None:
+            if wait is not None:
+                self.throttled += 1
+            return None, None, wait
+
+        link, (start, finish, size, response), queue = best
+        queue.responses.popleft()
+        queue.bucket.charge(size, now)
+        self._global.charge(size, now)
+        self._virtual_time = start
+        self.sent += 1
+        metrics.increment("transmit_bytes", size)
+        return link, response, None
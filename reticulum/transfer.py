@@ -0,0 +1,119 @@
+"""
+Reticulum response transfer layer.
+Sends small responses as a single packet and larger ones as a Resource.
+"""
+
+import RNS
+import inspect
+
+import metrics
+from log import event_logger
+
+
+def send_response(link, response, progress_callback=None):
+    """Send a response back over a Link using the cheapest transfer that fits.
+
+    The response is bytes, or an object with len() and to_bytes() (such as an
+    HttpResponse) that is only flattened into one buffer here, right before sending.
+    """
+
+    # File bodies larger than a packet are never read into memory as a whole
+    if getattr(response, "body_file", None) is not None and len(response) > link_mdu(link):
+        send_file_response(link, response, progress_callback)
+        return
+
+    data = response.to_bytes() if hasattr(response, "to_bytes") else response
+
+    if fits_in_packet(link, data):
+        send_packet(link, data)
+    else:
+        send_resource(link, data, progress_callback)
+
+
+def fits_in_packet(link, data):
+    """Check if data fits in a single Link packet."""
+    return len(data) <= link_mdu(link)
+
+
+def link_mdu(link):
+    """Get the maximum data unit for a single packet on this Link."""
+    # Newer RNS versions discover a per-link MDU, older ones only have the class default
+    return getattr(link, "mdu", None) or RNS.Link.MDU
+
+
+def send_packet(link, data):
+    """Send data as a single packet."""
+    metrics.increment("packets_sent")
+    packet = RNS.Packet(link, data)
+    packet.send()
+
+
+def send_resource(link, data, progress_callback=None):
+    """Send data as a Resource (segmented, compressed and windowed by RNS)."""
+    event_logger.debug(f"✓ Sending response as resource ({len(data)} bytes)")
+    metrics.increment("resources_sent")
+
+    return RNS.Resource(
+        data,
+        link,
+        callback=on_resource_concluded,
+        progress_callback=progress_callback,
+        auto_compress=True
+    )
+
+
+def send_file_response(link, response, progress_callback=None):
+    """Send a response whose body is a file on disk as a Resource that RNS reads a segment at a time.
+
+    When RNS supports Resource metadata and the body is a whole file, the head
+    travels as metadata and RNS reads the file itself. Otherwise (ranges, or
+    older RNS) the response is first spooled to a temporary file from the
+    file's shared memory map. Either way memory use doesn't depend on file size.
+    """
+    event_logger.debug(f"✓ Streaming response from {response.body_file} ({len(response)} bytes)")
+    metrics.increment("resources_sent")
+
+    if resource_metadata_supported() and response.is_whole_file():
+        metrics.increment("resources_streamed")
+        data = open(response.body_file, 'rb')
+        extra = {"metadata": bytes(response.head)}
+    else:
+        metrics.increment("resources_spooled")
+        data = response.spool()
+        extra = {}
+
+    try:
+        return RNS.Resource(
+            data,
+            link,
+            callback=on_resource_concluded,
+            progress_callback=progress_callback,
+            auto_compress=True,
+            **extra
+        )
+    except Exception:
+        data.close()
+        raise
+
+
+_metadata_supported = None
+
+
+def resource_metadata_supported():
+    """Check if this RNS version's Resources can carry metadata next to the data."""
+    global _metadata_supported
+    if _metadata_supported is None:
+        try:
+            _metadata_supported = "metadata" in inspect.signature(RNS.Resource).parameters
+        except (TypeError, ValueError):
+            _metadata_supported = False
+    return _metadata_supported
+
+
+def on_resource_concluded(resource):
+    """Called when an outgoing Resource transfer finishes or fails."""
+    if resource.status == RNS.Resource.COMPLETE:
+        event_logger.debug(f"✓ Resource transfer complete ({resource.total_size} bytes)")
+    else:
+        metrics.increment("resources_failed")
+        event_logger.warning("✗ Resource transfer failed")
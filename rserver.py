@@ -3,13 +3,19 @@
 import RNS
 import sys
 import time
+import signal
 
 import config
+import metrics
+from log import setup_logging
 from content import ensure_public_directory
-from reticulum import get_or_create_identity, create_destination, start_link_server
-from http import http_handler
+from reticulum import get_or_create_identity, create_destination, start_link_server, serve_destination, stop_link_server, start_announcing, stop_announcing
+from http import http_handler, http_busy_handler, http_rate_limited_handler, new_http_session, file_cache, public_index, site_router
+from http import optimize_sites, format_report
 
 def main():
+    setup_logging()
+
     print("RServer - Reticulum Web Server")
     print("=" * 40)
     
@@ -24,27 +30,62 @@ def main():
         print(f"✓ Transport enabled: {RNS.Reticulum.transport_enabled()}")
         print(f"✓ Instance ready: {RNS.Reticulum.get_instance() is not None}")
 
-        # Load or create server identity
-        identity, was_created = get_or_create_identity()
-        print(f"✓ {'Created' if was_created else 'Loaded'} server identity: {RNS.prettyhexrep(identity.hash)}")
-        
-        # Create destination for this server
-        destination = create_destination(identity)
-        app_name, aspect = config.app_context()
+        # Each site is its own destination; all of them share the workers, caches and transmit scheduler
+        sites = []
+        for site in config.sites():
+            # Load or create the site's identity
+            identity, was_created = get_or_create_identity(site.identity_path)
+            print(f"✓ {'Created' if was_created else 'Loaded'} server identity: {RNS.prettyhexrep(identity.hash)}")
+            
+            # Create destination for this site
+            destination = create_destination(identity, site)
+            print(f"✓ Server destination: {RNS.prettyhexrep(destination.hash)}")
+            print(f"✓ App context: {site.app_name}.{site.aspect}")
+
+            # Ensure public directory exists with default content
+            print(f"✓ Public directory: {site.public_dir}")
+
+            created = ensure_public_directory(site)
+            if created:
+                print(f"✓ Created public directory: {site.public_dir}")
+                print(f"✓ Created default file: {site.default_file}")
+
+            # Index the public directory so requests never hit the filesystem to find files
+            print(f"✓ Indexed {public_index(site).file_count()} files")
+            print(f"✓ Compiled {site_router(site).count} routes")
+            sites.append((site, destination))
+
+        # Minify and precompress what changed since the last run; requests get the optimized copies
+        if config.optimize_enabled():
+            report = optimize_sites([site.public_dir for site, _ in sites], config.optimize_cache_dir())
+            print(f"✓ {format_report(report)}")
+
+        # Start Link server with HTTP handler, routing each Link to the site it arrived on
+        first_site, first_destination = sites[0]
+        start_link_server(first_destination, http_handler, http_busy_handler, new_http_session,
+                          http_rate_limited_handler, first_site.identity_path)
+        for site, destination in sites[1:]:
+            serve_destination(destination, site.identity_path)
 
-        print(f"✓ Server destination: {RNS.prettyhexrep(destination.hash)}")
-        print(f"✓ App context: {app_name}.{aspect}")
+        # Announce so clients can find a path without waiting
+        for site, destination in sites:
+            start_announcing(destination, site)
+            print(f"✓ Announced as \"{site.server_name}\" (every ~{site.announce_interval}s)")
 
-        # Ensure public directory exists with default content
-        print(f"✓ Public directory: {config.public_dir()}")
+        # Apply config changes without dropping Links: on SIGHUP or when the file changes
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda signum, frame: config.try_reload("SIGHUP"))
+        config.watch()
 
-        created = ensure_public_directory()
-        if created:
-            print(f"✓ Created public directory: {config.public_dir()}")
-            print(f"✓ Created default file: {config.default_file()}")
+        # Periodically dump metrics for offline inspection
+        if config.stats_file():
+            metrics.start_stats_writer(config.stats_file(), config.stats_interval())
+            print(f"✓ Writing stats to {config.stats_file()} every {config.stats_interval()}s")
 
-        # Start Link server with HTTP handler
-        start_link_server(destination, http_handler)
+        # Opt-in sampling profiler for the worker threads
+        if config.profiler_interval() > 0:
+            metrics.start_profiler(config.profiler_interval())
+            print(f"✓ Profiling workers every {config.profiler_interval()}s")
         
         print("\nRServer is running. Press Ctrl+C to exit.")
         
@@ -54,6 +95,12 @@ def main():
             
     except KeyboardInterrupt:
         print("\nShutting down RServer...")
+        stop_announcing()
+        stop_link_server()
+        if config.stats_file():
+            metrics.write_stats_file(config.stats_file())
+        stats = file_cache().stats()
+        print(f"✓ File cache: {stats['hits']} hits, {stats['misses']} misses, {stats['bytes']} bytes cached")
         RNS.exit()
         sys.exit(0)
         